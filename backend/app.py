@@ -1,16 +1,68 @@
-from flask import Flask, jsonify, request, redirect
+import time
+_import_started_at = time.perf_counter()
+
+from flask import Flask, jsonify, request, redirect, Response, stream_with_context
 from flask_cors import CORS
-from flask_jwt_extended import JWTManager, create_access_token, get_jwt_identity, get_jwt
+from flask_jwt_extended import JWTManager, create_access_token, get_jwt_identity, get_jwt, verify_jwt_in_request
 from flask_bcrypt import Bcrypt
 import os
 import sys
+import click
+from sqlalchemy.exc import IntegrityError
 from datetime import datetime, timedelta
 from auth import token_required, admin_required, manager_or_admin_required
 from data.mock_data import get_mock_users
 from src.connection_db import init_database_connection, get_database_info
-from src.init_db import init_database
+from src.init_db import init_database, init_database_on_first_request, get_applied_versions
+from src.migrations import MIGRATIONS
+from src.partitions import (
+    PARTITION_MONTHS_AHEAD, is_partitioned, ensure_partitions, month_start, add_months,
+    archivable_months, archive_month, listing_windows
+)
 from src.date_utils import parse_datetime_string, datetime_to_string
 from src.models import init_models
+from src.pagination import (
+    parse_bool_arg, parse_time_entry_filters, apply_time_entry_filters, parse_page_size,
+    encode_cursor, decode_cursor, apply_keyset, time_entries_order, fetch_in_windows
+)
+from src.export import EXPORT_FORMATS, EXPORT_BATCH_SIZE, generate_export
+from src.serializers import (
+    json_response, user_columns, time_entry_columns, serialize_users, serialize_time_entries,
+    serialize_presence, time_entry_row_to_dict
+)
+from src.reports import (
+    BUCKETS, GROUP_BY, hours_summary_query, daily_hours_summary_query, summary_row_to_dict, collect_database_stats
+)
+from src.presence import (
+    presence, presence_columns, get_open_entry, add_open_entries, remove_open_entries, track_entry,
+    rebuild_presence
+)
+from src.daily_hours import (
+    daily_hours, DailyHoursChanges, delete_user_daily_hours, rebuild_daily_hours, verify_daily_hours
+)
+from src.stats_cache import StatsCache
+from src.user_cache import UserCache
+from src.bulk_import import IMPORT_FORMATS, ImportAborted, open_text_stream, iter_records, import_time_entries
+from src.batch_ops import BATCH_ACTIONS, target_users_select, batch_clock_in, batch_clock_out
+from src.password_hashing import PasswordHasher, PasswordHasherBusy
+from src.startup import StartupTimer
+from src.change_versions import bump_versions, get_versions, conditional_get
+from src.delta_sync import (
+    SYNC_MAX_CHANGES, TOMBSTONE_RETENTION_DAYS, encode_sync_token, decode_sync_token, sync_stamp, stamp_pending, stamp_entry,
+    record_tombstone, tombstone_user_entries, scoped_tombstones_query, serialize_tombstones, get_sync_horizon,
+    raise_sync_horizon, prune_tombstones
+)
+from src.db_pool import WAIT_BUCKETS, get_pool_stats
+from src.metrics import (
+    CONTENT_TYPE as METRICS_CONTENT_TYPE, RequestMetrics, pool_metrics, password_hashing_metrics, event_stream_metrics
+)
+from src.events import EventBroker, BrokerFull
+from src.event_relay import EventRelay, relay_supported
+from src.stream_tickets import SSE_TICKET_SECONDS, issue_ticket, redeem_ticket
+from src.concurrency import gevent_active
+
+startup = StartupTimer(_import_started_at)
+startup.mark('imports')
 
 app = Flask(__name__)
 
@@ -18,19 +70,53 @@ app = Flask(__name__)
 CORS(app, 
      origins=["https://time-tracer-bottega-front.onrender.com"],
      methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-     allow_headers=["Content-Type", "Authorization"],
+     allow_headers=["Content-Type", "Authorization", "If-None-Match", "Last-Event-ID"],
+     expose_headers=["ETag"],
      supports_credentials=True,
      max_age=3600)
 
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev-secret-key')
 app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(hours=24)
 
+app.config['BCRYPT_LOG_ROUNDS'] = int(os.getenv('BCRYPT_LOG_ROUNDS', '12'))
+
 jwt = JWTManager(app)
 bcrypt = Bcrypt(app)
 
-MOCK_USERS = get_mock_users()  
+# Shared off-thread pool for every bcrypt hash/verify
+password_hasher = PasswordHasher(bcrypt, app.config['BCRYPT_LOG_ROUNDS'])
+startup.mark('app_config')
 
+# Mock users are hashed lazily on first use (see data/mock_data.py)
 db, User, TimeEntry, DATABASE_TYPE, IS_PERSISTENT = init_database_connection(app)
+# Local SQLite mode: schema and mock users are created by init_database, not at import
+LOCAL_SQLITE = get_database_info()['LOCAL_SQLITE']
+if LOCAL_SQLITE:
+    init_database_on_first_request(app, db, User)
+startup.mark('database_setup')
+
+# Statistics shown on '/' - invalidated by every user/time entry write
+stats_cache = StatsCache()
+
+# id -> user and department -> member ids for permission checks and /api/auth/me,
+# checked against the 'users' change version (synced_user_cache)
+user_cache = UserCache()
+
+# Change events pushed to dashboards on /api/events
+event_broker = EventBroker()
+if db:
+    event_broker.track_commits(db.session)
+    if relay_supported(DATABASE_TYPE, get_database_info()['DATABASE_DRIVER']):
+        event_broker.relay = EventRelay(event_broker, db)
+
+        @app.before_request
+        def start_event_relay():
+            # Every worker listens (after the fork), to learn whether any worker has streams
+            event_broker.relay.start_listening(app)
+
+# Per-endpoint latency, response size and SQL statements, served on /metrics
+request_metrics = RequestMetrics()
+request_metrics.init_app(app, db)
 
 # =================== PUBLIC DOCUMENTATION ROUTES ===================
 
@@ -59,74 +145,25 @@ def home():
     # =================== DATABASE STATISTICS ===================
     if db:
         try:
-            # Verify connection
-            db.session.execute(db.text('SELECT 1'))
-            
-            # Get real-time statistics
-            admins = User.query.filter_by(role='admin').count()
-            managers = User.query.filter_by(role='manager').count()
-            workers = User.query.filter_by(role='worker').count()
-            total_users = admins + managers + workers
-            
-            total_entries = TimeEntry.query.count()
-            open_entries = TimeEntry.query.filter_by(check_out=None).count()
-            closed_entries = total_entries - open_entries
-            
-            total_hours_result = db.session.execute(
-                db.text("SELECT COALESCE(SUM(total_hours), 0) FROM time_entries WHERE total_hours IS NOT NULL")
-            ).scalar()
-            total_hours = float(total_hours_result) if total_hours_result else 0.0
-            
-            # Last database modification
-            last_changes = []
-            
-            last_user_change = db.session.execute(
-                db.text("SELECT MAX(created_at) FROM users")
-            ).scalar()
-            if last_user_change:
-                last_changes.append(last_user_change)
-            
-            last_entry_creation = db.session.execute(
-                db.text("SELECT MAX(created_at) FROM time_entries")
-            ).scalar()
-            if last_entry_creation:
-                last_changes.append(last_entry_creation)
-            
-            last_check_in = db.session.execute(
-                db.text("SELECT MAX(check_in) FROM time_entries WHERE check_in IS NOT NULL")
-            ).scalar()
-            if last_check_in:
-                last_changes.append(last_check_in)
-            
-            last_check_out = db.session.execute(
-                db.text("SELECT MAX(check_out) FROM time_entries WHERE check_out IS NOT NULL")
-            ).scalar()
-            if last_check_out:
-                last_changes.append(last_check_out)
-            
-            last_change = max(last_changes) if last_changes else None
+            # Aggregate queries (time entry totals from the daily rollup), served from a short TTL cache
+            stats, stats_age, from_cache = stats_cache.get(
+                lambda: collect_database_stats(db, User, TimeEntry, daily_hours)
+            )
             
             # Build database object with statistics
             response_data['database'] = {
                 'type': DATABASE_TYPE,
                 'persistent': IS_PERSISTENT,
                 'status': 'connected',
-                'users': {
-                    'total': total_users,
-                    'admin': admins,
-                    'manager': managers,
-                    'worker': workers
-                },
-                'time_entries': {
-                    'total': total_entries,
-                    'open': open_entries,
-                    'closed': closed_entries,
-                    'total_hours_worked': round(total_hours, 2)
-                }
+                'users': stats['users'],
+                'time_entries': stats['time_entries']
             }
             
-            if last_change:
-                response_data['database']['last_database_change'] = last_change.isoformat()
+            if stats['last_database_change']:
+                response_data['database']['last_database_change'] = stats['last_database_change']
+            
+            response_data['database']['stats_cached'] = from_cache
+            response_data['database']['stats_age_seconds'] = round(stats_age, 1)
             
         except Exception as e:
             print(f"Error getting statistics: {e}")
@@ -150,7 +187,8 @@ def home():
     response_data['endpoints']['public'] = [
         f"GET {base_url}/",
         f"GET {base_url}/api/health",
-        f"GET {base_url}/api/docs"
+        f"GET {base_url}/api/docs",
+        f"GET {base_url}/metrics"
     ]
     
     # Authentication endpoints (require POST)
@@ -165,8 +203,15 @@ def home():
         f"POST {base_url}/api/users (admin only)",
         f"PUT {base_url}/api/users/:id (admin only)",
         f"DELETE {base_url}/api/users/:id (admin only)",
+        f"POST {base_url}/api/time-entries/import?format=csv|ndjson (admin only)",
         f"GET {base_url}/api/time-entries",
+        f"GET {base_url}/api/time-entries/export?format=csv|ndjson",
+        f"GET {base_url}/api/time-entries/summary?group_by=user|department&bucket=day|week|month|total",
+        f"GET {base_url}/api/presence",
+        f"POST {base_url}/api/events/ticket",
+        f"GET {base_url}/api/events?ticket= (Server-Sent Events)",
         f"POST {base_url}/api/time-entries",
+        f"POST {base_url}/api/time-entries/batch (manager/admin)",
         f"PUT {base_url}/api/time-entries/:id (manager/admin)",
         f"DELETE {base_url}/api/time-entries/:id (manager/admin)"
     ]
@@ -180,7 +225,6 @@ def home():
     
     # Use json.dumps to preserve order
     import json
-    from flask import Response
     
     json_str = json.dumps(response_data, ensure_ascii=False, indent=2)
     return Response(json_str, mimetype='application/json')
@@ -189,6 +233,7 @@ def home():
 def health_check():
     """Simple health check for Render.com monitoring"""
     db_status = 'mock_data'
+    pool_stats = None
     
     if db:
         try:
@@ -196,14 +241,36 @@ def health_check():
             db_status = 'healthy'
         except Exception as e:
             db_status = f'error: {str(e)}'
+        pool_stats = get_pool_stats(db.engine)
     
     return jsonify({
         'status': 'healthy',
         'database': db_status,
         'database_type': DATABASE_TYPE,
-        'persistent': IS_PERSISTENT
+        'database_driver': get_database_info()['DATABASE_DRIVER'],
+        'database_pool': pool_stats,
+        'persistent': IS_PERSISTENT,
+        'password_hashing': password_hasher.stats(),
+        'user_cache': user_cache.stats(),
+        'event_streams': event_broker.stats(),
+        'query_diagnostics': app.extensions['query_diagnostics'].stats() if 'query_diagnostics' in app.extensions else None,
+        'startup': startup.report()
     })
 
+@app.route('/metrics')
+def metrics():
+    """Prometheus metrics (Bearer METRICS_TOKEN required when it is set)"""
+    token = os.getenv('METRICS_TOKEN')
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return jsonify({'message': 'Unauthorized'}), 401
+    
+    lines = request_metrics.render()
+    lines.extend(password_hashing_metrics(password_hasher.stats()))
+    lines.extend(event_stream_metrics(event_broker.stats()))
+    if db:
+        lines.extend(pool_metrics(get_pool_stats(db.engine), WAIT_BUCKETS))
+    return Response('\n'.join(lines) + '\n', content_type=METRICS_CONTENT_TYPE)
+
 @app.route('/api/docs')
 def api_documentation():
     """Complete API documentation"""
@@ -223,20 +290,28 @@ def api_documentation():
                 'GET /': 'API root with live statistics',
                 'GET /api/health': 'Health check',
                 'GET /api/docs': 'This documentation',
+                'GET /metrics': 'Prometheus metrics (Bearer METRICS_TOKEN if set)',
                 'POST /api/auth/login': 'User login'
             },
             'authenticated': {
                 'GET /api/auth/me': 'Current user',
                 'GET /api/users': 'List users (by role)',
-                'GET /api/time-entries': 'List entries (by role)',
+                'GET /api/time-entries': 'List entries (by role). Optional: limit, cursor, date_from, date_to, user_id, department (admin), open_only, include=user, since (sync_token of a previous response: only changes and deletions)',
+                'GET /api/time-entries/export': 'Stream entries as CSV or NDJSON (by role). Optional: format, date_from, date_to, user_id, department (admin), open_only',
+                'GET /api/time-entries/summary': 'Hours aggregated by user or department (by role). Optional: group_by, bucket, date_from, date_to, user_id, department (admin)',
+                'GET /api/presence': 'Users clocked in right now (by role). Optional: department (admin)',
+                'POST /api/events/ticket': 'One-use ticket for /api/events, valid for a few seconds',
+                'GET /api/events': 'Server-Sent Events: time_entry and user changes (by role), resync when the client should re-fetch. ?ticket= from /api/events/ticket, or the token in Authorization',
                 'POST /api/time-entries': 'Create entry'
             },
             'admin_only': {
                 'POST /api/users': 'Create user',
                 'PUT /api/users/:id': 'Update user',
-                'DELETE /api/users/:id': 'Delete user'
+                'DELETE /api/users/:id': 'Delete user',
+                'POST /api/time-entries/import': 'Bulk import entries from CSV or NDJSON (body or multipart "file"). Optional: format, dry_run'
             },
             'manager_admin': {
+                'POST /api/time-entries/batch': 'Clock in/out many users at once. Body: action (clock_in|clock_out), user_ids, department (admin), timestamp, notes',
                 'PUT /api/time-entries/:id': 'Update entry',
                 'DELETE /api/time-entries/:id': 'Delete entry'
             }
@@ -263,7 +338,12 @@ def login():
         try:
             user = User.query.filter_by(email=email).first()
             
-            if user and bcrypt.check_password_hash(user.users_password, password):
+            if user and password_hasher.verify(user.users_password, password):
+                # Upgrade hashes created with an older work factor
+                if password_hasher.needs_rehash(user.users_password):
+                    user.users_password = password_hasher.hash(password)
+                    db.session.commit()
+                
                 access_token = create_access_token(
                     identity=str(user.id),
                     additional_claims={
@@ -282,13 +362,21 @@ def login():
             else:
                 return jsonify({'message': 'Invalid credentials'}), 401
                 
+        except PasswordHasherBusy as e:
+            return jsonify({'message': 'Server busy, please retry', 'error': str(e)}), 503, {'Retry-After': '1'}
         except Exception as e:
+            db.session.rollback()
             print(f"Database error in login: {e}")
     
     # Mock fallback
-    user = next((u for u in MOCK_USERS if u['email'] == email), None)
+    user = next((u for u in get_mock_users() if u['email'] == email), None)
     
-    if user and bcrypt.check_password_hash(user['password'], password):
+    try:
+        password_ok = user is not None and password_hasher.verify(user['password'], password)
+    except PasswordHasherBusy as e:
+        return jsonify({'message': 'Server busy, please retry', 'error': str(e)}), 503, {'Retry-After': '1'}
+    
+    if password_ok:
         user_copy = user.copy()
         user_copy.pop('password')
         
@@ -310,6 +398,61 @@ def login():
 
     return jsonify({'message': 'Invalid credentials'}), 401
 
+def cached_user(user_id):
+    """User dict from the user cache, loaded by primary key on a miss"""
+    def load():
+        user = db.session.get(User, user_id)
+        return user.to_dict() if user else None
+    return user_cache.get_user(user_id, load)
+
+def synced_user_cache():
+    """
+    The user cache after dropping what another worker's user writes made
+    stale; the 'users' change version is read once per request
+    """
+    if 'user_cache.synced' not in request.environ:
+        user_cache.sync(get_versions(db, ['users'])[0])
+        request.environ['user_cache.synced'] = True
+    return user_cache
+
+def owner_departments(user_ids):
+    """{user id: department} for permission checks and event routing, from the synced user cache"""
+    def load(missing):
+        return {user.id: user.to_dict() for user in User.query.filter(User.id.in_(missing))}
+    users = synced_user_cache().get_users(user_ids, load)
+    return {user_id: user['department'] for user_id, user in users.items()}
+
+def department_member_ids(department):
+    """Ids of the users in a department, from the synced user cache"""
+    return synced_user_cache().get_department_ids(
+        department,
+        lambda: [r[0] for r in db.session.query(User.id).filter(User.department == department)]
+    )
+
+
+def publish_time_entry_events(action, entries):
+    """
+    Pushes committed time entry changes to /api/events subscribers.
+    `entries` are to_dict() dicts or time_entry_columns rows.
+    """
+    if not event_broker.active():
+        return
+    entries = [entry if isinstance(entry, dict) else time_entry_row_to_dict(entry) for entry in entries]
+    departments = owner_departments(entry['user_id'] for entry in entries)
+    events = []
+    for entry in entries:
+        department = departments.get(entry['user_id'])
+        events.append((
+            'time_entry', {'action': action, 'time_entry': entry},
+            (entry['user_id'],), (department,) if department else ()
+        ))
+    event_broker.publish_all(events)
+
+def publish_user_event(action, user, departments):
+    """Pushes a committed user change; `departments` are every department that should see it"""
+    if event_broker.active():
+        event_broker.publish('user', {'action': action, 'user': user}, user_ids=(user['id'],), departments=departments)
+
 @app.route('/api/auth/me', methods=['GET'])
 @token_required
 def get_current_user():
@@ -319,9 +462,9 @@ def get_current_user():
     
     if db:
         try:
-            user = User.query.get(int(user_id))
+            user = cached_user(int(user_id))
             if user:
-                return jsonify({'user': user.to_dict()}), 200
+                return jsonify({'user': user}), 200
         except Exception as e:
             print(f"Database error: {e}")
     
@@ -340,6 +483,7 @@ def get_current_user():
 # =================== USER MANAGEMENT ===================
 @app.route('/api/users', methods=['GET'])
 @token_required
+@conditional_get(lambda: db, 'users')
 def get_users():
     """Get a list of users based on role and department"""
     claims = get_jwt()
@@ -349,15 +493,17 @@ def get_users():
     
     if db:
         try:
-            if user_role == 'admin':
-                users = User.query.all()
-            elif user_role == 'manager':
-                users = User.query.filter_by(department=user_dept).all()
-            else:
-                users = User.query.filter_by(id=user_id).all()
+            # Plain column tuples instead of ORM objects (see src/serializers.py)
+            query = db.session.query(*user_columns(User))
+            if user_role == 'manager':
+                query = query.filter(User.department == user_dept)
+            elif user_role != 'admin':
+                query = query.filter(User.id == user_id)
             
-            return jsonify({
-                'users': [user.to_dict() for user in users],
+            users = serialize_users(query.all())
+            
+            return json_response({
+                'users': users,
                 'total': len(users),
                 'source': DATABASE_TYPE
             })
@@ -366,11 +512,11 @@ def get_users():
     
     # Mock fallback
     if user_role == 'admin':
-        filtered_users = MOCK_USERS
+        filtered_users = get_mock_users()
     elif user_role == 'manager':
-        filtered_users = [u for u in MOCK_USERS if u['department'] == user_dept]
+        filtered_users = [u for u in get_mock_users() if u['department'] == user_dept]
     else:
-        filtered_users = [u for u in MOCK_USERS if u['id'] == user_id]
+        filtered_users = [u for u in get_mock_users() if u['id'] == user_id]
     
     users_without_password = [{k: v for k, v in u.items() if k != 'password'} for u in filtered_users]
     
@@ -407,7 +553,7 @@ def create_user():
                 if existing:
                     return jsonify({'message': 'Email already registered'}), 400
                 
-                hashed_password = bcrypt.generate_password_hash(data['password']).decode('utf-8')
+                hashed_password = password_hasher.hash(data['password'])
                 
                 new_user = User(
                     name=data['name'],
@@ -419,24 +565,31 @@ def create_user():
                 )
                 
                 db.session.add(new_user)
+                bump_versions(db, 'users')
                 db.session.commit()
+                stats_cache.invalidate()
+                user_cache.invalidate(departments=[new_user.department])
+                publish_user_event('created', new_user.to_dict(), [new_user.department])
                 
                 return jsonify({
                     'message': 'User created successfully',
                     'user': new_user.to_dict()
                 }), 201
                 
+            except PasswordHasherBusy as e:
+                db.session.rollback()
+                return jsonify({'message': 'Server busy, please retry', 'error': str(e)}), 503, {'Retry-After': '1'}
             except Exception as e:
                 db.session.rollback()
                 return jsonify({'message': f'Database error: {str(e)}'}), 500
         
         # Mock fallback
-        if any(u['email'] == data['email'] for u in MOCK_USERS):
+        if any(u['email'] == data['email'] for u in get_mock_users()):
             return jsonify({'message': 'Email already registered'}), 400
         
-        hashed_password = bcrypt.generate_password_hash(data['password']).decode('utf-8')
+        hashed_password = password_hasher.hash(data['password'])
         new_user = {
-            'id': len(MOCK_USERS) + 1,
+            'id': len(get_mock_users()) + 1,
             'name': data['name'],
             'email': data['email'],
             'password': hashed_password,
@@ -445,7 +598,7 @@ def create_user():
             'status': 'active',
             'created_at': datetime.now().isoformat()
         }
-        MOCK_USERS.append(new_user)
+        get_mock_users().append(new_user)
         
         user_copy = new_user.copy()
         user_copy.pop('password')
@@ -455,6 +608,8 @@ def create_user():
             'user': user_copy
         }), 201
         
+    except PasswordHasherBusy as e:
+        return jsonify({'message': 'Server busy, please retry', 'error': str(e)}), 503, {'Retry-After': '1'}
     except Exception as e:
         return jsonify({'message': f'Server error: {str(e)}'}), 500
 
@@ -474,6 +629,7 @@ def update_user(user_id):
                 user = User.query.get(user_id)
                 if not user:
                     return jsonify({'message': 'User not found'}), 404
+                previous_department = user.department
                 
                 if 'name' in data:
                     user.name = data['name']
@@ -490,29 +646,43 @@ def update_user(user_id):
                     user.status = data['status']
                 
                 if 'password' in data and data['password']:
-                    hashed_password = bcrypt.generate_password_hash(data['password']).decode('utf-8')
+                    hashed_password = password_hasher.hash(data['password'])
                     user.users_password = hashed_password
                 
+                tables = ('users',)
+                if user.department != previous_department:
+                    # The user's entries change department scope without being written:
+                    # delta sync tokens issued before this are expired (src/delta_sync.py)
+                    tables = ('users', 'time_entries')
+                    raise_sync_horizon(db, bump_versions(db, *tables)['time_entries'])
+                else:
+                    bump_versions(db, *tables)
                 db.session.commit()
+                stats_cache.invalidate()
+                user_cache.invalidate(user_id, [previous_department, user.department])
+                publish_user_event('updated', user.to_dict(), {previous_department, user.department})
                 
                 return jsonify({
                     'message': 'User updated successfully',
                     'user': user.to_dict()
                 }), 200
                 
+            except PasswordHasherBusy as e:
+                db.session.rollback()
+                return jsonify({'message': 'Server busy, please retry', 'error': str(e)}), 503, {'Retry-After': '1'}
             except Exception as e:
                 db.session.rollback()
                 return jsonify({'message': f'Database error: {str(e)}'}), 500
         
         # Mock fallback
-        user = next((u for u in MOCK_USERS if u['id'] == user_id), None)
+        user = next((u for u in get_mock_users() if u['id'] == user_id), None)
         if not user:
             return jsonify({'message': 'User not found'}), 404
         
         if 'name' in data:
             user['name'] = data['name']
         if 'email' in data:
-            if any(u['email'] == data['email'] and u['id'] != user_id for u in MOCK_USERS):
+            if any(u['email'] == data['email'] and u['id'] != user_id for u in get_mock_users()):
                 return jsonify({'message': 'Email already in use'}), 400
             user['email'] = data['email']
         if 'role' in data:
@@ -522,7 +692,7 @@ def update_user(user_id):
         if 'status' in data:
             user['status'] = data['status']
         if 'password' in data and data['password']:
-            hashed_password = bcrypt.generate_password_hash(data['password']).decode('utf-8')
+            hashed_password = password_hasher.hash(data['password'])
             user['password'] = hashed_password
         
         user_copy = user.copy()
@@ -533,6 +703,8 @@ def update_user(user_id):
             'user': user_copy
         }), 200
         
+    except PasswordHasherBusy as e:
+        return jsonify({'message': 'Server busy, please retry', 'error': str(e)}), 503, {'Retry-After': '1'}
     except Exception as e:
         return jsonify({'message': f'Server error: {str(e)}'}), 500
 
@@ -551,9 +723,17 @@ def delete_user(user_id):
             if not user:
                 return jsonify({'message': 'User not found'}), 404
             
+            department = user.department
+            tombstone_user_entries(db, TimeEntry, user_id, department, sync_stamp())
             TimeEntry.query.filter_by(user_id=user_id).delete()
+            delete_user_daily_hours(db, user_id)
+            db.session.execute(db.delete(presence).where(presence.c.user_id == user_id))
             db.session.delete(user)
+            stamp_pending(db, 'users')
             db.session.commit()
+            stats_cache.invalidate()
+            user_cache.invalidate(user_id, [department])
+            publish_user_event('deleted', {'id': user_id}, [department])
             
             return jsonify({'message': 'User deleted successfully'}), 200
             
@@ -562,38 +742,134 @@ def delete_user(user_id):
             return jsonify({'message': f'Error: {str(e)}'}), 500
     
     # Mock fallback
-    user = next((u for u in MOCK_USERS if u['id'] == user_id), None)
+    user = next((u for u in get_mock_users() if u['id'] == user_id), None)
     if not user:
         return jsonify({'message': 'User not found'}), 404
     
-    MOCK_USERS.remove(user)
+    get_mock_users().remove(user)
     
     return jsonify({'message': 'User deleted (mock)'}), 200
 
 # =================== TIME ENTRIES ===================
+def scoped_time_entries_query(user_role, user_dept, user_id, department=None, with_owner=False):
+    """
+    Base time entry query restricted to what the caller's role can see.
+    Department scoping is a single JOIN on users (no ID list round trip).
+    `department` narrows admin queries; `with_owner` joins users so owner
+    columns can be selected from the same query.
+    """
+    query = TimeEntry.query
+    
+    if user_role == 'manager':
+        department = user_dept
+    elif user_role != 'admin':
+        query = query.filter(TimeEntry.user_id == user_id)
+        department = None
+    
+    if department or with_owner:
+        query = query.join(TimeEntry.user)
+    if department:
+        query = query.filter(User.department == department)
+    return query
+
 @app.route('/api/time-entries', methods=['GET'])
 @token_required
+@conditional_get(lambda: db, 'time_entries', 'users')
 def get_time_entries():
-    """Get time entries based on role and department"""
+    """
+    Get time entries based on role and department.
+    ?since=<sync_token> only returns what changed after that token (see src/delta_sync.py).
+    """
     claims = get_jwt()
     user_role = claims.get('role')
     user_dept = claims.get('department')
     user_id = int(get_jwt_identity())
     
+    # Pagination is opt-in (?limit= or ?cursor=) so existing clients keep the full list
+    paginate = 'limit' in request.args or 'cursor' in request.args
+    include_user = request.args.get('include') == 'user'
+    try:
+        filters = parse_time_entry_filters(request.args)
+        page_size = parse_page_size(request.args.get('limit')) if paginate else None
+        cursor = decode_cursor(request.args['cursor']) if request.args.get('cursor') else None
+        since = decode_sync_token(request.args['since']) if 'since' in request.args else None
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    if since is not None and (paginate or filters['open_only']):
+        return jsonify({'message': 'since cannot be combined with limit, cursor or open_only'}), 400
+    
     if db:
         try:
-            if user_role == 'admin':
-                entries = TimeEntry.query.order_by(TimeEntry.check_in.desc()).all()
-            elif user_role == 'manager':
-                dept_users = User.query.filter_by(department=user_dept).all()
-                user_ids = [u.id for u in dept_users]
-                entries = TimeEntry.query.filter(TimeEntry.user_id.in_(user_ids)).order_by(TimeEntry.check_in.desc()).all()
+            # Read before the rows: whatever commits meanwhile is sent again next time, never skipped
+            sync_version = get_versions(db, ['time_entries'])[0] if not cursor else None
+            # Older than the horizon (see src/delta_sync.py), or from another database
+            if since is not None and not get_sync_horizon(db) <= since <= sync_version:
+                return jsonify({'message': 'Sync token expired, fetch the full list again', 'resync': True}), 410
+            
+            query = scoped_time_entries_query(
+                user_role, user_dept, user_id,
+                department=filters['department'], with_owner=include_user
+            )
+            query = apply_time_entry_filters(query, TimeEntry, filters)
+            if cursor:
+                query = apply_keyset(query, TimeEntry, db, cursor)
+            if since is not None:
+                # Rows and tombstones stamped after the token, oldest change first
+                rows = query.filter(TimeEntry.change_version > since) \
+                    .with_entities(*time_entry_columns(TimeEntry, User if include_user else None)) \
+                    .order_by(TimeEntry.change_version, TimeEntry.id) \
+                    .limit(SYNC_MAX_CHANGES + 1).all()
+                tombstones = db.session.execute(
+                    scoped_tombstones_query(since, user_role, user_dept, user_id, filters)
+                    .limit(SYNC_MAX_CHANGES + 1)
+                ).all()
+                if len(rows) + len(tombstones) > SYNC_MAX_CHANGES:
+                    # Cheaper to start over than to page through the changes
+                    return jsonify({
+                        'message': 'Too many changes since this sync token, fetch the full list again',
+                        'resync': True
+                    }), 410
+                entries = serialize_time_entries(rows)
+                # An id reused by an older SQLite table outlives its tombstone
+                returned_ids = {entry['id'] for entry in entries}
+                tombstones = [row for row in tombstones if row[0] not in returned_ids]
+                return json_response({
+                    'time_entries': entries,
+                    'deleted': serialize_tombstones(tombstones),
+                    'total': len(entries),
+                    'next_cursor': None,
+                    'sync_token': encode_sync_token(sync_version),
+                    'source': DATABASE_TYPE
+                })
+            
+            query = query.with_entities(*time_entry_columns(TimeEntry, User if include_user else None)) \
+                .order_by(*time_entries_order(TimeEntry))
+            
+            next_cursor = None
+            if page_size:
+                # Month by month on a partitioned table; one user's entries are a short
+                # index range in every partition, so they are read in one query
+                windows = [(None, None)]
+                if user_role != 'worker' and filters['user_id'] is None:
+                    windows = listing_windows(
+                        db.session.connection(),
+                        newest=cursor[0] if cursor else filters['date_to'], oldest=filters['date_from']
+                    )
+                # Fetch one extra row to know whether another page exists
+                rows = fetch_in_windows(query, TimeEntry, page_size + 1, windows)
+                if len(rows) > page_size:
+                    rows = rows[:page_size]
+                    next_cursor = encode_cursor(rows[-1].date, rows[-1].check_in, rows[-1].id)
             else:
-                entries = TimeEntry.query.filter_by(user_id=user_id).order_by(TimeEntry.check_in.desc()).all()
+                rows = query.all()
             
-            return jsonify({
-                'time_entries': [entry.to_dict() for entry in entries],
+            entries = serialize_time_entries(rows)
+            return json_response({
+                'time_entries': entries,
                 'total': len(entries),
+                'next_cursor': next_cursor,
+                # Only on the first page: later pages must not move the client's token
+                'sync_token': encode_sync_token(sync_version) if sync_version is not None else None,
                 'source': DATABASE_TYPE
             })
         except Exception as e:
@@ -603,9 +879,270 @@ def get_time_entries():
     return jsonify({
         'time_entries': [],
         'total': 0,
+        'next_cursor': None,
+        'sync_token': None,
+        'source': 'mock'
+    })
+
+@app.route('/api/presence', methods=['GET'])
+@token_required
+@conditional_get(lambda: db, 'time_entries', 'users')
+def get_presence():
+    """Who is clocked in right now (admins: everyone or ?department=, managers: their department)"""
+    claims = get_jwt()
+    user_role = claims.get('role')
+    user_dept = claims.get('department')
+    user_id = int(get_jwt_identity())
+    
+    if db:
+        try:
+            query = db.session.query(*presence_columns(User)).join(User, User.id == presence.c.user_id)
+            if user_role == 'manager':
+                query = query.filter(User.department == user_dept)
+            elif user_role == 'admin':
+                if request.args.get('department'):
+                    query = query.filter(User.department == request.args['department'])
+            else:
+                query = query.filter(presence.c.user_id == user_id)
+            
+            clocked_in = serialize_presence(query.order_by(presence.c.check_in).all())
+            return json_response({
+                'clocked_in': clocked_in,
+                'total': len(clocked_in),
+                'source': DATABASE_TYPE
+            })
+        except Exception as e:
+            print(f"Database error: {e}")
+            return jsonify({'message': f'Database error: {str(e)}'}), 500
+    
+    return jsonify({
+        'clocked_in': [],
+        'total': 0,
+        'source': 'mock'
+    })
+
+def caller_scope():
+    """
+    {'user_id', 'role', 'department'} of the JWT caller, read from the
+    database like the permission checks; None if the user no longer exists
+    """
+    user_id = int(get_jwt_identity())
+    if not db:
+        claims = get_jwt()
+        return {'user_id': user_id, 'role': claims.get('role'), 'department': claims.get('department')}
+    user = db.session.get(User, user_id)
+    return {'user_id': user.id, 'role': user.role, 'department': user.department} if user else None
+
+@app.route('/api/events/ticket', methods=['POST'])
+@token_required
+def event_stream_ticket():
+    """One-use ticket that opens /api/events, so the JWT stays out of URLs (see src/stream_tickets.py)"""
+    try:
+        scope = caller_scope()
+        if scope is None:
+            return jsonify({'message': 'User not found'}), 404
+        ticket = issue_ticket(db, scope['user_id'], scope['role'], scope['department'])
+    except Exception as e:
+        if db:
+            db.session.rollback()
+        return jsonify({'message': f'Database error: {str(e)}'}), 500
+    return jsonify({'ticket': ticket, 'expires_in': SSE_TICKET_SECONDS}), 201
+
+def event_stream_scope():
+    """Scope of an /api/events caller: a ?ticket=, or a token in Authorization (non-browser clients)"""
+    ticket = request.args.get('ticket')
+    if not ticket:
+        try:
+            verify_jwt_in_request()
+        except Exception:
+            return None
+    try:
+        return redeem_ticket(db, ticket) if ticket else caller_scope()
+    except Exception as e:
+        if db:
+            db.session.rollback()
+        print(f"⚠️ Event stream authentication failed: {e}")
+        return None
+
+@app.route('/api/events', methods=['GET'])
+def event_stream():
+    """Server-Sent Events stream of time entry and user changes the caller can see"""
+    # A sync gunicorn worker would be held by one stream for its whole life.
+    # gthread and the async workers (gevent) set wsgi.multithread
+    if request.environ.get('SERVER_SOFTWARE', '').startswith('gunicorn') \
+            and not request.environ.get('wsgi.multithread') and not gevent_active():
+        return jsonify({'message': 'Event streams need a gevent or gthread gunicorn worker'}), 503
+    
+    scope = event_stream_scope()
+    if scope is None:
+        return jsonify({'message': 'Invalid, used or expired stream ticket'}), 401
+    if db:
+        event_broker.start_watchers(app, db)
+    try:
+        subscription, replay = event_broker.subscribe(
+            scope['role'], scope['department'], scope['user_id'],
+            # EventSource sends Last-Event-ID itself only when it reconnects with the same URL
+            last_event_id=request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+        )
+    except BrokerFull:
+        return jsonify({'message': 'Too many event streams, please retry'}), 503, {'Retry-After': '30'}
+    
+    # No stream_with_context: the stream needs neither the request nor a database session
+    return Response(event_broker.stream(subscription, replay), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+@app.route('/api/time-entries/export', methods=['GET'])
+@token_required
+def export_time_entries():
+    """Stream time entries as CSV or NDJSON (same scoping and filters as the list)"""
+    claims = get_jwt()
+    user_role = claims.get('role')
+    user_dept = claims.get('department')
+    user_id = int(get_jwt_identity())
+    
+    export_format = request.args.get('format', 'csv').lower()
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'message': 'Invalid format. Use csv or ndjson'}), 400
+    
+    try:
+        filters = parse_time_entry_filters(request.args)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    
+    if db:
+        try:
+            query = scoped_time_entries_query(user_role, user_dept, user_id, department=filters['department'])
+            query = apply_time_entry_filters(query, TimeEntry, filters)
+            # Plain column tuples streamed through a server-side cursor, batch by batch
+            rows = query.with_entities(*time_entry_columns(TimeEntry)) \
+                .order_by(*time_entries_order(TimeEntry)) \
+                .execution_options(stream_results=True) \
+                .yield_per(EXPORT_BATCH_SIZE)
+        except Exception as e:
+            print(f"Database error: {e}")
+            return jsonify({'message': f'Database error: {str(e)}'}), 500
+    else:
+        rows = []
+    
+    filename = f"time_entries_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{export_format}"
+    return Response(
+        stream_with_context(generate_export(export_format, rows, on_error=lambda e: db.session.rollback())),
+        mimetype=EXPORT_FORMATS[export_format],
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+
+@app.route('/api/time-entries/summary', methods=['GET'])
+@token_required
+@conditional_get(lambda: db, 'time_entries', 'users')
+def time_entries_summary():
+    """Hours worked grouped by user or department and by day/week/month"""
+    claims = get_jwt()
+    user_role = claims.get('role')
+    user_dept = claims.get('department')
+    user_id = int(get_jwt_identity())
+    
+    group_by = request.args.get('group_by', 'user').lower()
+    bucket = request.args.get('bucket', 'total').lower()
+    if group_by not in GROUP_BY:
+        return jsonify({'message': 'Invalid group_by. Use user or department'}), 400
+    if bucket not in BUCKETS:
+        return jsonify({'message': 'Invalid bucket. Use day, week, month or total'}), 400
+    
+    try:
+        filters = parse_time_entry_filters(request.args)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    
+    if db:
+        try:
+            # The daily rollup has every figure except which entries are open
+            if filters['open_only']:
+                source = TimeEntry
+                query = hours_summary_query(db, User, TimeEntry, group_by, bucket)
+            else:
+                source = daily_hours.c
+                query = daily_hours_summary_query(db, User, daily_hours, group_by, bucket)
+            if user_role == 'manager':
+                query = query.filter(User.department == user_dept)
+            elif user_role == 'admin':
+                if filters['department']:
+                    query = query.filter(User.department == filters['department'])
+            else:
+                query = query.filter(source.user_id == user_id)
+            query = apply_time_entry_filters(query, source, filters)
+            
+            rows = [summary_row_to_dict(row, group_by, bucket) for row in query.all()]
+            
+            return jsonify({
+                'summary': rows,
+                'group_by': group_by,
+                'bucket': bucket,
+                'total_hours': round(sum(r['total_hours'] for r in rows), 2),
+                'source': DATABASE_TYPE
+            })
+        except Exception as e:
+            print(f"Database error: {e}")
+            return jsonify({'message': f'Database error: {str(e)}'}), 500
+    
+    return jsonify({
+        'summary': [],
+        'group_by': group_by,
+        'bucket': bucket,
+        'total_hours': 0,
         'source': 'mock'
     })
 
+@app.route('/api/time-entries/import', methods=['POST'])
+@admin_required
+def import_time_entries_route():
+    """Bulk import time entries from CSV or NDJSON (admin only)"""
+    upload = request.files.get('file')
+    import_format = request.args.get('format')
+    if not import_format:
+        # Guess from the uploaded file name or the request Content-Type
+        hint = upload.filename if upload else request.mimetype
+        import_format = 'ndjson' if 'json' in (hint or '').lower() else 'csv'
+    import_format = import_format.lower()
+    if import_format not in IMPORT_FORMATS:
+        return jsonify({'message': 'Invalid format. Use csv or ndjson'}), 400
+    
+    if not db:
+        return jsonify({'message': 'Bulk import requires a database'}), 503
+    
+    stream = open_text_stream(upload.stream if upload else request.stream)
+    dry_run = parse_bool_arg(request.args.get('dry_run'))
+    
+    status = 200
+    message = 'Validation finished' if dry_run else 'Import finished'
+    try:
+        result = import_time_entries(db, User, TimeEntry, iter_records(stream, import_format), dry_run=dry_run)
+    except ImportAborted as e:
+        # Chunks committed before the failure stay: report them with the error
+        result = e.result
+        if isinstance(e.error, UnicodeDecodeError):
+            status, message = 400, 'File must be UTF-8 encoded'
+        else:
+            print(f"❌ Error in bulk import: {e.error}")
+            status, message = 500, f'Error: {str(e.error)}'
+    finally:
+        stats_cache.invalidate()
+    if result.inserted and not dry_run:
+        # Too many rows for one event each: subscribers re-fetch instead
+        event_broker.resync_all()
+    
+    response = result.to_dict()
+    response['dry_run'] = dry_run
+    response['message'] = message
+    return jsonify(response), status
+
+def open_entry_exists(open_entry):
+    return jsonify({
+        'message': f'An open entry already exists from {open_entry.date}. You must close it before opening a new one.',
+        'open_entry': open_entry.to_dict()
+    }), 400
+
 @app.route('/api/time-entries', methods=['POST'])
 @token_required
 def create_time_entry():
@@ -638,38 +1175,38 @@ def create_time_entry():
             if not check_in:
                 return jsonify({'message': 'Invalid check-in date/time format'}), 400
             
-            # Check if user has an open entry
-            if not check_out:
-                open_entry = TimeEntry.query.filter_by(
-                    user_id=target_user_id,
-                    check_out=None
-                ).first()
-                
-                if open_entry:
-                    return jsonify({
-                        'message': f'An open entry already exists from {open_entry.date}. You must close it before opening a new one.',
-                        'open_entry': open_entry.to_dict()
-                    }), 400
+            # One primary key lookup in the presence table for the user's open entry
+            open_entry = get_open_entry(db, target_user_id)
+            if not check_out and open_entry:
+                return open_entry_exists(db.session.get(TimeEntry, open_entry.entry_id))
 
             existing = None
             if 'entry_id' in data:
                 # If entry_id provided, update that specific entry
                 existing = TimeEntry.query.get(data['entry_id'])
-            else:
-                # If no entry_id, search for open entry on the same date
-                existing = TimeEntry.query.filter_by(
-                    user_id=target_user_id,
-                    date=entry_date,
-                    check_out=None
-                ).first()
+            elif open_entry and open_entry.date == entry_date:
+                # If no entry_id, the open entry on the same date is the one being closed
+                existing = db.session.get(TimeEntry, open_entry.entry_id)
             
+            changes = DailyHoursChanges()
+            # stamp_pending() gives the rows their version right before the commit (src/delta_sync.py)
+            stamp = sync_stamp()
             if existing:
                 # Update existing entry
+                was_open = existing.check_out is None
+                changes.remove_entry(existing)
                 existing.check_in = check_in
                 existing.check_out = check_out
                 existing.total_hours = data.get('total_hours')
                 existing.notes = data.get('notes')
+                stamp_entry(existing, stamp)
+                changes.add_entry(existing)
+                changes.apply(db)
+                track_entry(db, existing, was_open)
+                stamp_pending(db)
                 db.session.commit()
+                stats_cache.invalidate()
+                publish_time_entry_events('updated', [existing.to_dict()])
                 
                 return jsonify({
                     'message': 'Entry updated',
@@ -682,17 +1219,33 @@ def create_time_entry():
                     check_in=check_in,
                     check_out=check_out,
                     total_hours=data.get('total_hours'),
-                    notes=data.get('notes')
+                    notes=data.get('notes'),
+                    created_at=stamp['updated_at'],
+                    **stamp
                 )
                 
                 db.session.add(new_entry)
+                db.session.flush()
+                changes.add_entry(new_entry)
+                changes.apply(db)
+                track_entry(db, new_entry)
+                stamp_pending(db)
                 db.session.commit()
+                stats_cache.invalidate()
+                publish_time_entry_events('created', [new_entry.to_dict()])
                 
                 return jsonify({
                     'message': 'Entry created',
                     'time_entry': new_entry.to_dict()
                 }), 201
                 
+        except IntegrityError as e:
+            db.session.rollback()
+            open_entry = get_open_entry(db, target_user_id)
+            if open_entry:
+                # Another request opened an entry for this user first
+                return open_entry_exists(db.session.get(TimeEntry, open_entry.entry_id))
+            return jsonify({'message': f'Error: {str(e)}'}), 500
         except Exception as e:
             db.session.rollback()
             print(f"❌ Error in time entry: {e}")
@@ -700,6 +1253,81 @@ def create_time_entry():
             traceback.print_exc()
             return jsonify({'message': f'Error: {str(e)}'}), 500
    
+@app.route('/api/time-entries/batch', methods=['POST'])
+@manager_or_admin_required
+def batch_time_entries():
+    """Clock in or clock out many users in one statement (manager/admin only)"""
+    claims = get_jwt()
+    user_role = claims.get('role')
+    user_dept = claims.get('department')
+    user_id = int(get_jwt_identity())
+    data = request.get_json() or {}
+    
+    action = data.get('action')
+    if action not in BATCH_ACTIONS:
+        return jsonify({'message': 'Invalid action. Use clock_in or clock_out'}), 400
+    
+    user_ids = data.get('user_ids')
+    if user_ids is not None:
+        if not isinstance(user_ids, list) or not all(isinstance(i, int) for i in user_ids) or not user_ids:
+            return jsonify({'message': 'user_ids must be a non-empty list of integers'}), 400
+    
+    # Same rules as update_time_entry: managers only act on their own department
+    if user_role == 'manager':
+        department = user_dept
+    else:
+        department = data.get('department')
+        if not department and not user_ids:
+            return jsonify({'message': 'department or user_ids is required'}), 400
+    
+    if data.get('timestamp'):
+        timestamp = parse_datetime_string(data['timestamp'])
+        if not timestamp:
+            return jsonify({'message': 'Invalid timestamp format'}), 400
+    else:
+        timestamp = datetime.now().replace(microsecond=0)
+    
+    if not db:
+        return jsonify({'message': 'Batch operations require a database'}), 503
+    
+    try:
+        users_select = target_users_select(db, User, user_id, department=department, user_ids=user_ids)
+        operation = batch_clock_out if action == 'clock_out' else batch_clock_in
+        affected = operation(db, User, TimeEntry, users_select, timestamp, sync_stamp(), notes=data.get('notes'))
+        
+        if affected:
+            changes = DailyHoursChanges()
+            for row in affected:
+                if action == 'clock_out':
+                    changes.add(row.user_id, row.date, open_entries=-1, total_hours=row.total_hours)
+                else:
+                    changes.add(row.user_id, row.date, entries=1, open_entries=1)
+            changes.apply(db)
+            if action == 'clock_out':
+                remove_open_entries(db, [row.id for row in affected])
+            else:
+                add_open_entries(db, [
+                    {'user_id': row.user_id, 'entry_id': row.id, 'date': row.date, 'check_in': row.check_in}
+                    for row in affected
+                ])
+            stamp_pending(db)
+        db.session.commit()
+        stats_cache.invalidate()
+        if affected:
+            publish_time_entry_events('updated' if action == 'clock_out' else 'created', affected)
+        
+        return jsonify({
+            'message': f'{len(affected)} entries {"closed" if action == "clock_out" else "opened"}',
+            'action': action,
+            'timestamp': datetime_to_string(timestamp),
+            'affected': len(affected),
+            'entries': [{'id': row.id, 'user_id': row.user_id} for row in affected]
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': f'Error: {str(e)}'}), 500
+
 @app.route('/api/time-entries/<int:entry_id>', methods=['PUT'])
 @manager_or_admin_required
 def update_time_entry(entry_id):
@@ -716,15 +1344,17 @@ def update_time_entry(entry_id):
             if not entry:
                 return jsonify({'message': 'Entry not found'}), 404
             
-            entry_owner = User.query.get(entry.user_id)
-            
             # Validate permissions
             if user_role == 'manager':
                 if entry.user_id == user_id:
                     return jsonify({'message': 'You cannot edit your own entries'}), 403
-                if entry_owner.department != user_dept:
+                if entry.user_id not in department_member_ids(user_dept):
                     return jsonify({'message': 'You do not have permission'}), 403
             
+            was_open = entry.check_out is None
+            changes = DailyHoursChanges()
+            changes.remove_entry(entry)
+            
             # Update with correct date parsing
             if 'check_in' in data:
                 entry.check_in = parse_datetime_string(data['check_in'])
@@ -734,39 +1364,31 @@ def update_time_entry(entry_id):
                 entry.total_hours = data['total_hours']
             if 'notes' in data:
                 entry.notes = data['notes']
+            stamp_entry(entry, sync_stamp())
             
+            changes.add_entry(entry)
+            changes.apply(db)
+            track_entry(db, entry, was_open)
+            stamp_pending(db)
             db.session.commit()
+            stats_cache.invalidate()
+            publish_time_entry_events('updated', [entry.to_dict()])
             
             return jsonify({
                 'message': 'Entry updated',
                 'time_entry': entry.to_dict()
             }), 200
             
+        except IntegrityError:
+            # Reopening the entry while its owner has another open one (see src/presence.py)
+            db.session.rollback()
+            return jsonify({'message': 'The user already has an open entry. Close it before reopening this one.'}), 400
         except Exception as e:
             db.session.rollback()
             return jsonify({'message': f'Error: {str(e)}'}), 500
     
-    entry_owner = next((u for u in MOCK_USERS if u['id'] == entry['user_id']), None)
-    
-    if user_role == 'manager':
-        if entry['user_id'] == user_id:
-            return jsonify({'message': 'You cannot edit your own entries'}), 403
-        if entry_owner['department'] != user_dept:
-            return jsonify({'message': 'You do not have permission'}), 403
-    
-    if 'check_in' in data:
-        entry['check_in'] = data['check_in']
-    if 'check_out' in data:
-        entry['check_out'] = data['check_out']
-    if 'total_hours' in data:
-        entry['total_hours'] = data['total_hours']
-    if 'notes' in data:
-        entry['notes'] = data['notes']
-    
-    return jsonify({
-        'message': 'Entry updated (mock)',
-        'time_entry': entry
-    }), 200
+    # Mock mode has no time entries
+    return jsonify({'message': 'Entry not found'}), 404
 
 @app.route('/api/time-entries/<int:entry_id>', methods=['DELETE'])
 @manager_or_admin_required
@@ -783,16 +1405,25 @@ def delete_time_entry(entry_id):
             if not entry:
                 return jsonify({'message': 'Entry not found'}), 404
             
-            entry_owner = User.query.get(entry.user_id)
-            
+            owner_department = owner_departments([entry.user_id]).get(entry.user_id)
             if user_role == 'manager':
                 if entry.user_id == user_id:
                     return jsonify({'message': 'You cannot delete your own entries'}), 403
-                if entry_owner.department != user_dept:
+                if owner_department != user_dept:
                     return jsonify({'message': 'You do not have permission'}), 403
             
+            record_tombstone(db, entry, owner_department, sync_stamp())
             db.session.delete(entry)
+            changes = DailyHoursChanges()
+            changes.remove_entry(entry)
+            changes.apply(db)
+            if entry.check_out is None:
+                remove_open_entries(db, [entry.id])
+            deleted = {'id': entry.id, 'user_id': entry.user_id, 'date': entry.date.isoformat()}
+            stamp_pending(db)
             db.session.commit()
+            stats_cache.invalidate()
+            publish_time_entry_events('deleted', [deleted])
             
             return jsonify({'message': 'Entry deleted'}), 200
             
@@ -800,17 +1431,189 @@ def delete_time_entry(entry_id):
             db.session.rollback()
             return jsonify({'message': f'Error: {str(e)}'}), 500
     
-    if user_role == 'manager':
-        if entry['user_id'] == user_id:
-            return jsonify({'message': 'You cannot delete your own entries'}), 403
-        if entry_owner['department'] != user_dept:
-            return jsonify({'message': 'You do not have permission'}), 403
-    
-    return jsonify({'message': 'Entry deleted (mock)'}), 200
+    # Mock mode has no time entries
+    return jsonify({'message': 'Entry not found'}), 404
 
-init_database(app, db)
+startup.mark('routes')
+print(f"⏱️ App ready in {startup.summary()}")
+startup.finish()
+
+# =================== CLI ===================
+@app.cli.command('migrate')
+def migrate_command():
+    """Apply pending schema migrations (run once per deploy)"""
+    if not init_database(app, db, User if LOCAL_SQLITE else None):
+        sys.exit(1)
+
+@app.cli.command('migrations-status')
+def migrations_status_command():
+    """List schema migrations and whether they are applied"""
+    if not db:
+        print("⚠️ No database, using mock data")
+        return
+    with app.app_context():
+        applied = get_applied_versions(db)
+    for version, description, _ in MIGRATIONS:
+        print(f"{'✅' if version in applied else '⏳'} {version:>3}  {description}")
+
+@app.cli.command('maintain-partitions')
+@click.option('--months-ahead', default=PARTITION_MONTHS_AHEAD, show_default=True)
+def maintain_partitions_command(months_ahead):
+    """Create the monthly time_entries partitions for the coming months"""
+    if not db:
+        print("⚠️ No database, using mock data")
+        return
+    with app.app_context(), db.engine.begin() as conn:
+        if not is_partitioned(conn):
+            print("ℹ️ time_entries is not partitioned (PostgreSQL only), nothing to do")
+            return
+        current = month_start(datetime.now().date())
+        created = ensure_partitions(conn, current, add_months(current, months_ahead))
+    print(f"✅ Created partitions: {', '.join(created)}" if created else "✅ Partitions are up to date")
+
+@app.cli.command('archive-time-entries')
+@click.option('--keep-months', default=int(os.getenv('ARCHIVE_KEEP_MONTHS', '12')), show_default=True,
+              help='Months (besides the current one) kept in time_entries')
+@click.option('--dry-run', is_flag=True, help='Only list the months that would be archived')
+def archive_time_entries_command(keep_months, dry_run):
+    """Move closed months older than the kept window to time_entries_archive"""
+    if not db:
+        print("⚠️ No database, using mock data")
+        return
+    with app.app_context():
+        with db.engine.connect() as conn:
+            closed, open_months = archivable_months(conn, keep_months)
+            conn.rollback()
+            for month in open_months:
+                print(f"⏳ {month:%Y-%m} still has open entries, skipped")
+            total = 0
+            for month in closed:
+                if dry_run:
+                    print(f"📦 {month:%Y-%m} would be archived")
+                    continue
+                # One transaction per month: an interrupted run leaves whole months
+                with conn.begin():
+                    moved = archive_month(conn, month)
+                total += moved
+                print(f"📦 {month:%Y-%m}: {moved:,} entries archived")
+        if total:
+            # Archived rows leave no tombstones: older sync tokens must re-fetch
+            raise_sync_horizon(db, bump_versions(db, 'time_entries')['time_entries'])
+            db.session.commit()
+    print(f"✅ Archived {total:,} entries from {len(closed)} month(s)" if not dry_run else "✅ Dry run finished")
+
+@app.cli.command('rebuild-daily-hours')
+def rebuild_daily_hours_command():
+    """Recompute the daily_hours rollup from time_entries"""
+    if not db:
+        print("⚠️ No database, using mock data")
+        return
+    started = time.perf_counter()
+    with app.app_context():
+        try:
+            days = rebuild_daily_hours(db.session.connection(), TimeEntry.__table__)
+            bump_versions(db, 'time_entries')
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"❌ Rebuild failed: {e}")
+            sys.exit(1)
+    print(f"✅ daily_hours rebuilt: {days:,} days in {time.perf_counter() - started:.1f}s")
+
+@app.cli.command('rebuild-presence')
+def rebuild_presence_command():
+    """Recompute the presence table (who is clocked in) from time_entries"""
+    if not db:
+        print("⚠️ No database, using mock data")
+        return
+    with app.app_context():
+        try:
+            users = rebuild_presence(db.session.connection(), TimeEntry.__table__)
+            bump_versions(db, 'time_entries')
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"❌ Rebuild failed: {e}")
+            sys.exit(1)
+    print(f"✅ presence rebuilt: {users:,} users clocked in")
+
+@app.cli.command('verify-daily-hours')
+@click.option('--show', default=20, show_default=True, help='Mismatching days to print')
+def verify_daily_hours_command(show):
+    """Compare the daily_hours rollup with time_entries (exit code 1 on mismatch)"""
+    if not db:
+        print("⚠️ No database, using mock data")
+        return
+    with app.app_context():
+        checked, mismatches, samples = verify_daily_hours(db.session.connection(), TimeEntry.__table__, show)
+        db.session.rollback()
+    for sample in samples:
+        print(f"❌ user {sample['user_id']} {sample['date']}: "
+              f"expected {sample['expected']}, rollup {sample['rollup']}")
+    if mismatches:
+        print(f"❌ {mismatches:,} of the days differ from time_entries, run rebuild-daily-hours")
+        sys.exit(1)
+    print(f"✅ daily_hours matches time_entries ({checked:,} days)")
+
+@app.cli.command('prune-tombstones')
+@click.option('--days', default=TOMBSTONE_RETENTION_DAYS, show_default=True, help='Days tombstones are kept')
+def prune_tombstones_command(days):
+    """Delete old delta sync tombstones; clients with older sync tokens re-fetch the full list"""
+    if not db:
+        print("⚠️ No database, using mock data")
+        return
+    with app.app_context():
+        try:
+            pruned = prune_tombstones(db, days)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"❌ Pruning failed: {e}")
+            sys.exit(1)
+    print(f"✅ {pruned:,} tombstones older than {days} days deleted")
+
+@app.cli.command('generate-data')
+@click.option('--departments', default=10, show_default=True)
+@click.option('--users', default=1000, show_default=True)
+@click.option('--years', default=1.0, show_default=True, help='Years of shifts per user')
+@click.option('--seed', default=42, show_default=True)
+@click.option('--end', default=None, help='Last moment of the data (YYYY-MM-DDTHH:MM:SS, default now)')
+@click.option('--password', default='defaultpass', show_default=True, help='Password of every generated user')
+@click.option('--batch-size', default=10000, show_default=True)
+def generate_data_command(departments, users, years, seed, end, password, batch_size):
+    """Replace the synthetic dataset (users @synthetic.local) with a new one"""
+    if not db:
+        print("⚠️ No database, using mock data")
+        return
+    from data.synthetic import generate_dataset
+
+    end_at = parse_datetime_string(end) if end else None
+    if end and not end_at:
+        print("❌ --end must use the YYYY-MM-DDTHH:MM:SS format")
+        sys.exit(1)
+    started = time.perf_counter()
+    with app.app_context():
+        try:
+            user_count, entry_count = generate_dataset(
+                db, User, TimeEntry, departments, users, years, seed,
+                bcrypt.generate_password_hash(password).decode('utf-8'),
+                end=end_at, batch_size=batch_size
+            )
+            raise_sync_horizon(db, bump_versions(db, 'users', 'time_entries')['time_entries'])
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"❌ Data generation failed: {e}")
+            sys.exit(1)
+        if db.engine.dialect.name == 'postgresql':
+            with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+                conn.execute(db.text('ANALYZE users'))
+                conn.execute(db.text('ANALYZE time_entries'))
+    print(f"✅ Generated {user_count:,} users and {entry_count:,} time entries "
+          f"in {time.perf_counter() - started:.1f}s")
 
 if __name__ == '__main__':
+    init_database(app, db, User if LOCAL_SQLITE else None)
     port = int(os.environ.get('PORT', 5000))
     print(f"🚀 Starting TimeTracer with {DATABASE_TYPE}")
     app.run(host='0.0.0.0', port=port, debug=False)
\ No newline at end of file
@@ -0,0 +1,442 @@
+"""
+HTTP benchmark for the API: seeds a dataset, drives the endpoints with a
+mix of worker/manager/admin virtual users and reports p50/p95/p99 latency,
+throughput and SQL queries per request for every endpoint.
+
+By default the app is served in-process (werkzeug, threaded) on a temporary
+SQLite file, or on DATABASE_URL if set. Use --url to hit a running server
+instead (e.g. gunicorn); the dataset is then seeded through DATABASE_URL,
+which must point to the same database, and query counts are not available.
+
+Usage (from backend/):
+    python -m benchmarks.api --departments 5 --users 200 --entries 50000 \\
+        --concurrency 16 --duration 30 --output results.json
+"""
+import os
+import sys
+import json
+import math
+import time
+import random
+import argparse
+import tempfile
+import platform
+import threading
+import subprocess
+import http.client
+from urllib.parse import urlsplit
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BENCH_PASSWORD = 'bench-password'
+BENCH_EMAIL_DOMAIN = 'bench.local'
+QUERY_COUNT_HEADER = 'X-Bench-Queries'
+
+# Operations per role with their relative weights
+ROLE_OPERATIONS = {
+    'worker': [('login', 1), ('list_entries', 6), ('create_entry', 3)],
+    'manager': [('login', 1), ('list_users', 2), ('list_entries', 5), ('update_entry', 2)],
+    'admin': [('login', 1), ('home', 2), ('list_users', 2), ('list_entries', 2), ('delete_entry', 1)],
+}
+
+ENDPOINT_LABELS = {
+    'login': 'POST /api/auth/login',
+    'home': 'GET /',
+    'list_users': 'GET /api/users',
+    'list_entries': 'GET /api/time-entries',
+    'create_entry': 'POST /api/time-entries',
+    'update_entry': 'PUT /api/time-entries/<id>',
+    'delete_entry': 'DELETE /api/time-entries/<id>',
+}
+
+
+# =================== DATASET ===================
+def seed(app, db, User, TimeEntry, departments, users, entries, seed_value):
+    """
+    Replaces the previous benchmark dataset (users @bench.local) with a new
+    deterministic one. Returns {role: [(user_id, email), ...]}.
+    """
+    rng = random.Random(seed_value)
+    with app.app_context():
+        from src.daily_hours import daily_hours, rebuild_daily_hours
+        from src.presence import presence
+        from src.delta_sync import time_entry_tombstones
+        bench_users = db.select(User.id).where(User.email.like(f'%@{BENCH_EMAIL_DOMAIN}'))
+        db.session.execute(db.delete(daily_hours).where(daily_hours.c.user_id.in_(bench_users)))
+        db.session.execute(db.delete(presence).where(presence.c.user_id.in_(bench_users)))
+        db.session.execute(db.delete(time_entry_tombstones).where(time_entry_tombstones.c.user_id.in_(bench_users)))
+        db.session.execute(db.delete(TimeEntry).where(TimeEntry.user_id.in_(bench_users)))
+        db.session.execute(db.delete(User).where(User.email.like(f'%@{BENCH_EMAIL_DOMAIN}')))
+        db.session.commit()
+
+        from flask_bcrypt import generate_password_hash
+        password_hash = generate_password_hash(BENCH_PASSWORD, app.config['BCRYPT_LOG_ROUNDS']).decode('utf-8')
+        created_at = datetime(2024, 1, 1)
+        user_rows = []
+        for i in range(users):
+            # One manager per department, then an admin and every 50th user after it, the rest workers
+            role = 'manager' if i < departments else 'admin' if (i - departments) % 50 == 0 else 'worker'
+            user_rows.append({
+                'name': f'Bench User {i}', 'email': f'user{i}@{BENCH_EMAIL_DOMAIN}',
+                'users_password': password_hash, 'role': role,
+                'department': f'Department {i % departments}', 'status': 'active',
+                'created_at': created_at
+            })
+        db.session.execute(User.__table__.insert(), user_rows)
+        db.session.commit()
+
+        accounts = {'worker': [], 'manager': [], 'admin': []}
+        rows = db.session.execute(
+            db.select(User.id, User.email, User.role)
+            .where(User.email.like(f'%@{BENCH_EMAIL_DOMAIN}')).order_by(User.id)
+        ).all()
+        for user_id, email, role in rows:
+            accounts[role].append((user_id, email))
+        user_ids = [r[0] for r in rows]
+
+        start = datetime(2024, 1, 1, 7, 0, 0)
+        batch = []
+        for i in range(entries):
+            check_in = start + timedelta(minutes=rng.randrange(0, 365 * 24 * 60))
+            check_out = check_in + timedelta(minutes=rng.randrange(240, 600))
+            batch.append({
+                'user_id': rng.choice(user_ids), 'date': check_in.date(), 'check_in': check_in,
+                'check_out': check_out, 'total_hours': round((check_out - check_in).total_seconds() / 3600, 2),
+                'notes': None, 'created_at': check_in
+            })
+            if len(batch) >= 5000:
+                db.session.execute(TimeEntry.__table__.insert(), batch)
+                batch = []
+        if batch:
+            db.session.execute(TimeEntry.__table__.insert(), batch)
+        rebuild_daily_hours(db.session.connection(), TimeEntry.__table__, bench_users)
+        from src.change_versions import bump_versions
+        from src.delta_sync import raise_sync_horizon
+        raise_sync_horizon(db, bump_versions(db, 'users', 'time_entries')['time_entries'])
+        db.session.commit()
+    return accounts
+
+
+# =================== SERVER ===================
+def install_query_counter(app, db):
+    """Adds an X-Bench-Queries header with the number of SQL statements each request ran"""
+    from flask import g, has_request_context
+    from sqlalchemy import event
+
+    with app.app_context():
+        @event.listens_for(db.engine, 'before_cursor_execute')
+        def count_query(conn, cursor, statement, parameters, context, executemany):
+            if has_request_context():
+                g.bench_queries = g.get('bench_queries', 0) + 1
+
+    @app.after_request
+    def add_query_count(response):
+        response.headers[QUERY_COUNT_HEADER] = str(g.get('bench_queries', 0))
+        return response
+
+
+def start_server(app):
+    import logging
+    from werkzeug.serving import make_server
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_port}'
+
+
+# =================== CLIENT ===================
+class Recorder:
+    def __init__(self):
+        self.samples = {}
+        self.lock = threading.Lock()
+        self.enabled = False
+
+    def add(self, operation, elapsed, status, queries):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.samples.setdefault(operation, []).append((elapsed, status, queries))
+
+
+class VirtualUser:
+    """One client thread: logs in as `email` and runs weighted operations for its role"""
+    def __init__(self, base_url, role, user_id, email, rng, recorder, shared):
+        parts = urlsplit(base_url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.role = role
+        self.user_id = user_id
+        self.email = email
+        self.rng = rng
+        self.recorder = recorder
+        self.shared = shared
+        self.token = None
+        self.entry_ids = []
+        operations = ROLE_OPERATIONS[role]
+        self.names = [name for name, _ in operations]
+        self.weights = [weight for _, weight in operations]
+
+    def request(self, operation, method, path, body=None):
+        headers = {'Content-Type': 'application/json'}
+        if self.token:
+            headers['Authorization'] = f'Bearer {self.token}'
+        conn = http.client.HTTPConnection(self.host, self.port, timeout=60)
+        started = time.perf_counter()
+        try:
+            conn.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers)
+            response = conn.getresponse()
+            data = response.read()
+            status = response.status
+            queries = response.getheader(QUERY_COUNT_HEADER)
+        except (OSError, http.client.HTTPException):
+            data, status, queries = b'', 0, None
+        finally:
+            conn.close()
+        self.recorder.add(operation, time.perf_counter() - started, status,
+                          int(queries) if queries is not None else None)
+        return status, data
+
+    def login(self):
+        status, data = self.request('login', 'POST', '/api/auth/login',
+                                    {'email': self.email, 'password': BENCH_PASSWORD})
+        if status == 200:
+            self.token = json.loads(data)['access_token']
+
+    def list_entries(self):
+        query = '?limit=100' if self.role != 'worker' else ''
+        status, data = self.request('list_entries', 'GET', f'/api/time-entries{query}')
+        if status == 200:
+            entries = json.loads(data)['time_entries']
+            self.entry_ids = [e['id'] for e in entries if e['user_id'] != self.user_id]
+
+    def create_entry(self):
+        check_in = datetime(2025, 1, 1, 8) + timedelta(days=self.rng.randrange(0, 365), minutes=self.rng.randrange(0, 120))
+        status, data = self.request('create_entry', 'POST', '/api/time-entries', {
+            'date': check_in.date().isoformat(),
+            'check_in': check_in.isoformat(),
+            'check_out': (check_in + timedelta(hours=8)).isoformat(),
+            'total_hours': 8.0,
+            'notes': 'benchmark'
+        })
+        if status in (200, 201):
+            with self.shared['lock']:
+                self.shared['created'].append(json.loads(data)['time_entry']['id'])
+
+    def update_entry(self):
+        if not self.entry_ids:
+            return self.list_entries()
+        entry_id = self.rng.choice(self.entry_ids)
+        self.request('update_entry', 'PUT', f'/api/time-entries/{entry_id}',
+                     {'notes': f'reviewed {self.rng.randrange(1000)}'})
+
+    def delete_entry(self):
+        with self.shared['lock']:
+            entry_id = self.shared['created'].pop() if self.shared['created'] else None
+        if entry_id is None:
+            return self.list_entries()
+        self.request('delete_entry', 'DELETE', f'/api/time-entries/{entry_id}')
+
+    def home(self):
+        self.request('home', 'GET', '/')
+
+    def list_users(self):
+        self.request('list_users', 'GET', '/api/users')
+
+    def run(self, stop_event):
+        self.login()
+        while not stop_event.is_set():
+            getattr(self, self.rng.choices(self.names, self.weights)[0])()
+
+
+def split_concurrency(concurrency, role_mix):
+    """
+    Number of virtual users per role, proportional to the mix. Every role
+    with a positive weight gets at least one while there are users to spare,
+    so each endpoint is measured even at low concurrency.
+    """
+    roles = [r for r, weight in role_mix.items() if weight > 0]
+    total = sum(role_mix[r] for r in roles)
+    counts = {r: 0 for r in roles}
+    for r in roles[:concurrency]:
+        counts[r] = 1
+    remaining = concurrency - sum(counts.values())
+    shares = {r: max(0.0, role_mix[r] / total * concurrency - counts[r]) for r in roles}
+    for r in roles:
+        extra = min(remaining, int(shares[r]))
+        counts[r] += extra
+        remaining -= extra
+    for r in sorted(roles, key=lambda r: shares[r] - int(shares[r]), reverse=True)[:remaining]:
+        counts[r] += 1
+    return counts
+
+
+def build_virtual_users(base_url, accounts, concurrency, role_mix, seed_value, recorder):
+    shared = {'lock': threading.Lock(), 'created': []}
+    virtual_users = []
+    for role, count in split_concurrency(concurrency, role_mix).items():
+        pool = accounts[role]
+        if count and not pool:
+            # Running the role's scenarios as another role would report the wrong endpoints
+            raise SystemExit(f"❌ The dataset has no {role} accounts; reseed with more --users or drop {role} from --role-mix")
+        for i in range(count):
+            user_id, email = pool[i % len(pool)]
+            virtual_users.append(VirtualUser(base_url, role, user_id, email,
+                                             random.Random(seed_value * 1000 + len(virtual_users)),
+                                             recorder, shared))
+    return virtual_users
+
+
+# =================== REPORT ===================
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(samples, duration):
+    results = {}
+    for operation, values in sorted(samples.items()):
+        latencies = sorted(v[0] for v in values)
+        errors = sum(1 for v in values if v[1] == 0 or v[1] >= 500)
+        queries = [v[2] for v in values if v[2] is not None]
+        results[ENDPOINT_LABELS[operation]] = {
+            'requests': len(values),
+            'errors': errors,
+            'client_errors': sum(1 for v in values if 400 <= v[1] < 500),
+            'throughput_rps': round(len(values) / duration, 2),
+            'latency_ms': {
+                'mean': round(sum(latencies) / len(latencies) * 1000, 2),
+                'p50': round(percentile(latencies, 50) * 1000, 2),
+                'p95': round(percentile(latencies, 95) * 1000, 2),
+                'p99': round(percentile(latencies, 99) * 1000, 2),
+                'max': round(latencies[-1] * 1000, 2)
+            },
+            'queries_per_request': round(sum(queries) / len(queries), 2) if queries else None
+        }
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(report):
+    print(f"\n📊 {report['total']['requests']} requests in {report['duration_seconds']}s "
+          f"({report['total']['throughput_rps']} req/s, concurrency {report['config']['concurrency']})")
+    print(f"   {'endpoint':32} {'reqs':>7} {'err':>5} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'queries':>8}")
+    for label, stats in report['endpoints'].items():
+        latency = stats['latency_ms']
+        queries = stats['queries_per_request']
+        print(f"   {label:32} {stats['requests']:>7} {stats['errors']:>5} {stats['throughput_rps']:>8} "
+              f"{latency['p50']:>8} {latency['p95']:>8} {latency['p99']:>8} "
+              f"{'-' if queries is None else queries:>8}")
+    print("   (latencies in ms)")
+
+
+def parse_role_mix(value):
+    mix = {}
+    for part in value.split(','):
+        role, _, weight = part.partition('=')
+        if role not in ROLE_OPERATIONS:
+            raise argparse.ArgumentTypeError(f"Unknown role '{role}'")
+        mix[role] = float(weight)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--departments', type=int, default=5)
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--entries', type=int, default=20000)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=20, help='Measured seconds')
+    parser.add_argument('--warmup', type=float, default=3, help='Unmeasured seconds before the run')
+    parser.add_argument('--role-mix', type=parse_role_mix, default=parse_role_mix('worker=70,manager=25,admin=5'))
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--url', help='Benchmark a running server instead of an in-process one')
+    parser.add_argument('--no-seed', action='store_true', help='Reuse the dataset of a previous run')
+    parser.add_argument('--output', help='Write the results as JSON to this file')
+    args = parser.parse_args()
+    if not args.no_seed and args.users <= args.departments:
+        parser.error('--users must be greater than --departments (one manager per department, then admins and workers)')
+
+    if not args.url and not os.getenv('DATABASE_URL'):
+        os.environ.setdefault('SQLITE_PATH', os.path.join(tempfile.mkdtemp(prefix='timetracer-bench-'), 'bench.db'))
+    from app import app, db, User, TimeEntry
+    from src.init_db import run_migrations
+
+    with app.app_context():
+        run_migrations(db)
+    if args.no_seed:
+        with app.app_context():
+            accounts = {'worker': [], 'manager': [], 'admin': []}
+            for user_id, email, role in db.session.execute(
+                db.select(User.id, User.email, User.role).where(User.email.like(f'%@{BENCH_EMAIL_DOMAIN}'))
+            ):
+                accounts[role].append((user_id, email))
+    else:
+        started = time.perf_counter()
+        accounts = seed(app, db, User, TimeEntry, args.departments, args.users, args.entries, args.seed)
+        print(f"🌱 Seeded {args.users} users and {args.entries} entries in {time.perf_counter() - started:.1f}s")
+
+    server = None
+    base_url = args.url
+    if not base_url:
+        install_query_counter(app, db)
+        server, base_url = start_server(app)
+
+    recorder = Recorder()
+    virtual_users = build_virtual_users(base_url, accounts, args.concurrency, args.role_mix, args.seed, recorder)
+    stop_event = threading.Event()
+    threads = [threading.Thread(target=vu.run, args=(stop_event,), daemon=True) for vu in virtual_users]
+    for thread in threads:
+        thread.start()
+
+    time.sleep(args.warmup)
+    recorder.enabled = True
+    measured_from = time.perf_counter()
+    time.sleep(args.duration)
+    recorder.enabled = False
+    duration = time.perf_counter() - measured_from
+    stop_event.set()
+    for thread in threads:
+        thread.join(timeout=60)
+    if server:
+        server.shutdown()
+
+    endpoints = summarize(recorder.samples, duration)
+    total_requests = sum(e['requests'] for e in endpoints.values())
+    report = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'git_revision': git_revision(),
+        'python': platform.python_version(),
+        'database': app.DATABASE_TYPE if hasattr(app, 'DATABASE_TYPE') else None,
+        'target': args.url or 'in-process',
+        'config': {
+            'departments': args.departments, 'users': args.users, 'entries': args.entries,
+            'concurrency': args.concurrency, 'role_mix': args.role_mix, 'seed': args.seed,
+            'virtual_users': split_concurrency(args.concurrency, args.role_mix)
+        },
+        'duration_seconds': round(duration, 2),
+        'total': {
+            'requests': total_requests,
+            'errors': sum(e['errors'] for e in endpoints.values()),
+            'throughput_rps': round(total_requests / duration, 2)
+        },
+        'endpoints': endpoints
+    }
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+Compares the ORM to_dict() + jsonify path with the column projection
+serializer used by the list endpoints (src/serializers.py).
+
+Usage (from backend/):
+    python -m benchmarks.serialization --entries 50000
+"""
+import os
+import sys
+import time
+import argparse
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def seed(db, User, TimeEntry, entries):
+    db.session.execute(User.__table__.insert(), [
+        {'id': i, 'name': f'User {i}', 'email': f'user{i}@bench.local', 'users_password': 'x',
+         'role': 'worker', 'department': f'Dept {i % 10}', 'status': 'active', 'created_at': datetime.now()}
+        for i in range(1, 201)
+    ])
+    start = datetime(2020, 1, 1, 8, 0, 0)
+    rows = []
+    for i in range(entries):
+        check_in = start + timedelta(hours=i, microseconds=i)
+        rows.append({
+            'user_id': i % 200 + 1, 'date': check_in.date(), 'check_in': check_in,
+            'check_out': check_in + timedelta(hours=8), 'total_hours': 8.0,
+            'notes': 'Shift notes', 'created_at': check_in
+        })
+    db.session.execute(TimeEntry.__table__.insert(), rows)
+    db.session.commit()
+
+
+def timed(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        size = fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--entries', type=int, default=50000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    os.environ.setdefault('DATABASE_URL', 'sqlite://')
+    from flask import jsonify
+    from app import app, db, User, TimeEntry
+    from src.serializers import json_response, time_entry_columns, serialize_time_entries
+
+    with app.app_context():
+        db.create_all()
+        seed(db, User, TimeEntry, args.entries)
+
+    def orm_path():
+        with app.test_request_context():
+            entries = TimeEntry.query.order_by(TimeEntry.check_in.desc(), TimeEntry.id.desc()).all()
+            response = jsonify({'time_entries': [e.to_dict() for e in entries], 'total': len(entries)})
+            db.session.remove()
+            return len(response.data)
+
+    def projection_path():
+        with app.test_request_context():
+            rows = db.session.query(*time_entry_columns(TimeEntry)) \
+                .order_by(TimeEntry.check_in.desc(), TimeEntry.id.desc()).all()
+            entries = serialize_time_entries(rows)
+            response = json_response({'time_entries': entries, 'total': len(entries)})
+            db.session.remove()
+            return len(response.data)
+
+    orm_time, orm_size = timed(orm_path, args.repeat)
+    fast_time, fast_size = timed(projection_path, args.repeat)
+
+    print(f"\n📊 {args.entries} time entries (best of {args.repeat})")
+    print(f"   ORM + to_dict + jsonify : {orm_time * 1000:8.1f} ms  ({orm_size} bytes)")
+    print(f"   Projection + serializer : {fast_time * 1000:8.1f} ms  ({fast_size} bytes)")
+    print(f"   Speedup                 : {orm_time / fast_time:8.2f}x")
+
+
+if __name__ == '__main__':
+    main()
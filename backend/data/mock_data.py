@@ -3,38 +3,58 @@ from flask_bcrypt import Bcrypt
 
 bcrypt = Bcrypt()
 
-MOCK_USERS = [
-    {
-        'id': 1, 
-        'name': 'Admin TimeTracer', 
-        'email': 'admin@timetracer.com', 
-        'password': bcrypt.generate_password_hash(os.getenv('ADMIN_PASSWORD', 'defaultpass')).decode('utf-8'), 
-        'role': 'admin', 
-        'department': 'IT', 
-        'status': 'active', 
-        'created_at': '2025-01-01T00:00:00'
-    },
-    {
-        'id': 2, 
-        'name': 'Juan Manager', 
-        'email': 'juan@company.com', 
-        'password': bcrypt.generate_password_hash(os.getenv('MANAGER_PASSWORD', 'defaultpass')).decode('utf-8'), 
-        'role': 'manager', 
-        'department': 'Operations', 
-        'status': 'active', 
-        'created_at': '2025-01-01T00:00:00'
-    },
-    {
-        'id': 3, 
-        'name': 'María Worker', 
-        'email': 'maria@company.com', 
-        'password': bcrypt.generate_password_hash(os.getenv('WORKER_PASSWORD', 'defaultpass')).decode('utf-8'), 
-        'role': 'worker', 
-        'department': 'Operations', 
-        'status': 'active', 
-        'created_at': '2025-01-01T00:00:00'
-    },
-]
+MOCK_USERS = None
+
+
+def _password_hash(role):
+    """
+    Precomputed hash from <ROLE>_PASSWORD_HASH if provided (no bcrypt work at all),
+    otherwise hashes <ROLE>_PASSWORD.
+    """
+    precomputed = os.getenv(f'{role}_PASSWORD_HASH')
+    if precomputed:
+        return precomputed
+    return bcrypt.generate_password_hash(os.getenv(f'{role}_PASSWORD', 'defaultpass')).decode('utf-8')
+
+
+def _build_mock_users():
+    return [
+        {
+            'id': 1,
+            'name': 'Admin TimeTracer',
+            'email': 'admin@timetracer.com',
+            'password': _password_hash('ADMIN'),
+            'role': 'admin',
+            'department': 'IT',
+            'status': 'active',
+            'created_at': '2025-01-01T00:00:00'
+        },
+        {
+            'id': 2,
+            'name': 'Juan Manager',
+            'email': 'juan@company.com',
+            'password': _password_hash('MANAGER'),
+            'role': 'manager',
+            'department': 'Operations',
+            'status': 'active',
+            'created_at': '2025-01-01T00:00:00'
+        },
+        {
+            'id': 3,
+            'name': 'María Worker',
+            'email': 'maria@company.com',
+            'password': _password_hash('WORKER'),
+            'role': 'worker',
+            'department': 'Operations',
+            'status': 'active',
+            'created_at': '2025-01-01T00:00:00'
+        },
+    ]
+
 
 def get_mock_users():
-    return MOCK_USERS
\ No newline at end of file
+    """Mock users are built (and their passwords hashed) on first use, not at import"""
+    global MOCK_USERS
+    if MOCK_USERS is None:
+        MOCK_USERS = _build_mock_users()
+    return MOCK_USERS
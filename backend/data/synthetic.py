@@ -0,0 +1,222 @@
+"""
+Large synthetic dataset for load tests and index work (extends mock_data.py).
+
+Departments, users and years of shifts: day, early, evening and overnight
+patterns with start/end jitter, overtime, absences and notes. Shifts still
+running at the end of the range are left open, as are a few forgotten
+clock-outs. The same seed and end date always produce the same data.
+
+Rows are streamed in batches: COPY on PostgreSQL (psycopg, psycopg2 or
+pg8000), multi-row INSERTs elsewhere, so memory stays flat at any size.
+
+    flask --app app generate-data --users 5000 --years 3 --seed 42
+"""
+import io
+import csv
+import random
+from datetime import datetime, time, timedelta
+from src.daily_hours import daily_hours, rebuild_daily_hours
+from src.delta_sync import time_entry_tombstones
+from src.presence import presence, rebuild_presence
+
+SYNTHETIC_EMAIL_DOMAIN = 'synthetic.local'
+
+DEPARTMENT_NAMES = [
+    'Operations', 'Sales', 'IT', 'Finance', 'Human Resources', 'Logistics',
+    'Customer Support', 'Marketing', 'Legal', 'Maintenance', 'Production', 'Quality'
+]
+
+FIRST_NAMES = [
+    'Ana', 'Luis', 'María', 'Carlos', 'Lucía', 'Javier', 'Elena', 'Pablo', 'Sofía', 'Diego',
+    'Laura', 'Miguel', 'Carmen', 'Andrés', 'Paula', 'Jorge', 'Marta', 'Raúl', 'Sara', 'Iván'
+]
+LAST_NAMES = [
+    'García', 'Martínez', 'López', 'Sánchez', 'Pérez', 'Gómez', 'Martín', 'Jiménez', 'Ruiz',
+    'Hernández', 'Díaz', 'Moreno', 'Álvarez', 'Romero', 'Navarro', 'Torres', 'Domínguez', 'Vázquez'
+]
+
+# name, start time, hours, days of the week (0 = Monday), share of users
+SHIFT_PATTERNS = [
+    ('day', time(8, 0), 8, (0, 1, 2, 3, 4), 0.55),
+    ('early', time(6, 0), 8, (0, 1, 2, 3, 4), 0.10),
+    ('evening', time(14, 0), 8, (0, 1, 2, 3, 4, 5), 0.15),
+    ('night', time(22, 0), 8, (0, 1, 2, 3, 6), 0.10),
+    ('part_time', time(9, 0), 4, (0, 2, 4), 0.10),
+]
+
+NOTES = [
+    'Team meeting', 'Client visit', 'Training session', 'Inventory count',
+    'Covered a colleague', 'Remote work', 'On-call incident', 'Stayed late for deployment'
+]
+
+ABSENCE_RATE = 0.04
+OVERTIME_RATE = 0.06
+NOTES_RATE = 0.12
+OPEN_ENTRY_RATE = 0.05
+INACTIVE_RATE = 0.03
+
+USER_COLUMNS = ['name', 'email', 'users_password', 'role', 'department', 'status', 'created_at']
+TIME_ENTRY_COLUMNS = ['user_id', 'date', 'check_in', 'check_out', 'total_hours', 'notes', 'created_at']
+
+
+def generate_users(rng, departments, users, password_hash, created_at):
+    """One manager per department, one admin per 10 departments, the rest workers"""
+    names = DEPARTMENT_NAMES[:departments] + [
+        f'Department {i}' for i in range(len(DEPARTMENT_NAMES), departments)
+    ]
+    admins = max(1, departments // 10)
+    for i in range(users):
+        if i < admins:
+            role = 'admin'
+        elif i < admins + departments:
+            role = 'manager'
+        else:
+            role = 'worker'
+        yield {
+            'name': f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+            'email': f'user{i}@{SYNTHETIC_EMAIL_DOMAIN}',
+            'users_password': password_hash,
+            'role': role,
+            'department': names[(i - admins) % departments] if role != 'admin' else 'IT',
+            'status': 'inactive' if role == 'worker' and rng.random() < INACTIVE_RATE else 'active',
+            'created_at': created_at
+        }
+
+
+def _jitter(rng, minutes):
+    return timedelta(minutes=rng.gauss(0, minutes))
+
+
+def generate_time_entries(rng, user_ids, first_day, end):
+    """
+    Yields time entry rows user by user, up to the `end` datetime. Overnight
+    shifts end the next day; shifts running at `end` and some of the last
+    day's shifts are left open (check_out NULL).
+    """
+    patterns = [p[:4] for p in SHIFT_PATTERNS]
+    weights = [p[4] for p in SHIFT_PATTERNS]
+    last_day = end.date()
+    days = (last_day - first_day).days + 1
+
+    for user_id in user_ids:
+        _, start, hours, weekdays = rng.choices(patterns, weights)[0]
+        # Each user has a habitual arrival offset on top of the daily jitter
+        habit = timedelta(minutes=rng.randint(-20, 20))
+        for offset in range(days):
+            day = first_day + timedelta(days=offset)
+            if day.weekday() not in weekdays or rng.random() < ABSENCE_RATE:
+                continue
+            check_in = (datetime.combine(day, start) + habit + _jitter(rng, 8)).replace(microsecond=0)
+            if check_in > end:
+                continue
+            duration = timedelta(hours=hours) + _jitter(rng, 12)
+            if rng.random() < OVERTIME_RATE:
+                duration += timedelta(minutes=rng.randint(30, 180))
+            check_out = (check_in + duration).replace(microsecond=0)
+            notes = rng.choice(NOTES) if rng.random() < NOTES_RATE else None
+
+            if check_out > end or (day == last_day and rng.random() < OPEN_ENTRY_RATE):
+                check_out = None
+            yield {
+                'user_id': user_id,
+                'date': check_in.date(),
+                'check_in': check_in,
+                'check_out': check_out,
+                'total_hours': round((check_out - check_in).total_seconds() / 3600, 2) if check_out else None,
+                'notes': notes,
+                'created_at': check_out or check_in
+            }
+
+
+def _batches(rows, batch_size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _copy_batch(connection, table, columns, batch):
+    """COPY ... FROM STDIN (CSV) through whichever PostgreSQL driver is in use"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in batch:
+        writer.writerow(['' if row[c] is None else row[c] for c in columns])
+    buffer.seek(0)
+    sql = f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)"
+
+    driver = connection.dialect.driver
+    cursor = connection.connection.cursor()
+    try:
+        if driver == 'psycopg2':
+            cursor.copy_expert(sql, buffer)
+        elif driver == 'psycopg':
+            with cursor.copy(sql) as copy:
+                copy.write(buffer.getvalue())
+        elif driver == 'pg8000':
+            cursor.execute(sql, stream=buffer)
+        else:
+            return False
+    finally:
+        cursor.close()
+    return True
+
+
+def bulk_load(db, table, columns, rows, batch_size, progress=None):
+    """Loads `rows` in batches (COPY on PostgreSQL, multi-row INSERT otherwise). Returns the count."""
+    connection = db.session.connection()
+    use_copy = connection.dialect.name == 'postgresql'
+    total = 0
+    for batch in _batches(rows, batch_size):
+        if not (use_copy and _copy_batch(connection, table.name, columns, batch)):
+            db.session.execute(table.insert(), batch)
+        total += len(batch)
+        if progress:
+            progress(total)
+    return total
+
+
+def delete_synthetic_data(db, User, TimeEntry):
+    synthetic_users = db.select(User.id).where(User.email.like(f'%@{SYNTHETIC_EMAIL_DOMAIN}'))
+    db.session.execute(db.delete(daily_hours).where(daily_hours.c.user_id.in_(synthetic_users)))
+    db.session.execute(db.delete(presence).where(presence.c.user_id.in_(synthetic_users)))
+    # generate-data raises the sync horizon, so no client needs these deletes
+    db.session.execute(db.delete(time_entry_tombstones).where(time_entry_tombstones.c.user_id.in_(synthetic_users)))
+    db.session.execute(db.delete(TimeEntry).where(TimeEntry.user_id.in_(synthetic_users)))
+    db.session.execute(db.delete(User).where(User.email.like(f'%@{SYNTHETIC_EMAIL_DOMAIN}')))
+
+
+def generate_dataset(db, User, TimeEntry, departments, users, years, seed, password_hash,
+                     end=None, batch_size=10000):
+    """
+    Replaces any previous synthetic data (users @synthetic.local) and loads a
+    new dataset ending at `end` (default now). Returns (users, entries).
+    """
+    rng = random.Random(seed)
+    end = end or datetime.now().replace(microsecond=0)
+    first_day = end.date() - timedelta(days=int(365 * years) - 1)
+
+    delete_synthetic_data(db, User, TimeEntry)
+    user_rows = generate_users(rng, departments, users, password_hash,
+                               datetime.combine(first_day, time(0, 0)))
+    bulk_load(db, User.__table__, USER_COLUMNS, user_rows, batch_size)
+
+    user_ids = [row[0] for row in db.session.execute(
+        db.select(User.id).where(User.email.like(f'%@{SYNTHETIC_EMAIL_DOMAIN}')).order_by(User.id)
+    )]
+
+    def progress(count):
+        if count % (batch_size * 50) == 0:
+            print(f"📦 {count:,} time entries loaded")
+
+    entries = bulk_load(
+        db, TimeEntry.__table__, TIME_ENTRY_COLUMNS,
+        generate_time_entries(rng, user_ids, first_day, end), batch_size, progress
+    )
+    synthetic_users = db.select(User.id).where(User.email.like(f'%@{SYNTHETIC_EMAIL_DOMAIN}'))
+    rebuild_daily_hours(db.session.connection(), TimeEntry.__table__, synthetic_users)
+    rebuild_presence(db.session.connection(), TimeEntry.__table__, synthetic_users)
+    return len(user_ids), entries
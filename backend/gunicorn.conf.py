@@ -0,0 +1,45 @@
+"""
+Gunicorn settings (picked up automatically when gunicorn runs from backend/).
+
+GUNICORN_PRELOAD=true imports app.py once in the master and forks workers
+from it, so the import cost is paid once per deploy instead of once per worker.
+
+GUNICORN_WORKER_CLASS selects the concurrency model:
+  sync    - one request per worker (default)
+  gthread - GUNICORN_THREADS requests per worker
+  gevent  - up to GUNICORN_WORKER_CONNECTIONS requests per worker as greenlets;
+            requests waiting on PostgreSQL no longer block the worker
+"""
+import os
+import sys
+
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'sync')
+workers = int(os.getenv('WEB_CONCURRENCY', '1'))
+threads = int(os.getenv('GUNICORN_THREADS', '1'))
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', '1000'))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '30'))
+
+preload_app = os.getenv('GUNICORN_PRELOAD', 'false').lower() in ('1', 'true', 'yes', 'on')
+
+if worker_class == 'gevent':
+    # Patch before app.py (and its database driver) is imported, also with --preload
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from src.concurrency import patch_gevent
+    patch_gevent()
+
+# Imported after patch_gevent(): nothing that may open sockets or locks comes first
+from sqlalchemy.pool import StaticPool
+
+
+def post_fork(server, worker):
+    # With --preload the engine was created in the master: drop inherited
+    # pool state so each worker opens its own connections
+    app_module = sys.modules.get('app')
+    if app_module is None or not getattr(app_module, 'db', None):
+        return
+    with app_module.app.app_context():
+        engine = app_module.db.engine
+        # An in-memory SQLite database lives in its only connection: keep the forked copy
+        if isinstance(engine.pool, StaticPool):
+            return
+        engine.dispose(close=False)
@@ -0,0 +1,83 @@
+"""
+Set-based clock-in / clock-out for many users at once.
+
+Each operation is one UPDATE ... WHERE user_id IN (SELECT ...) or one
+INSERT ... SELECT, so closing a whole department costs a single statement
+instead of a GET/permission check/commit per entry.
+"""
+from src.presence import presence
+from src.serializers import time_entry_columns
+
+BATCH_ACTIONS = ('clock_in', 'clock_out')
+
+
+def hours_between(db, start_col, end_value):
+    """SQL expression for the hours between a datetime column and a value, rounded to 2 decimals"""
+    if db.engine.dialect.name == 'sqlite':
+        hours = (db.func.julianday(end_value) - db.func.julianday(start_col)) * 24
+        return db.func.round(hours, 2)
+    seconds = db.func.extract('epoch', db.cast(end_value, db.DateTime) - start_col)
+    return db.cast(db.func.round(db.cast(seconds / 3600, db.Numeric), 2), db.Float)
+
+
+def target_users_select(db, User, acting_user_id, department=None, user_ids=None):
+    """
+    SELECT users.id for the batch. The acting user is always excluded
+    (nobody closes or opens their own entry through a batch).
+    """
+    query = db.select(User.id).where(User.id != acting_user_id)
+    if department:
+        query = query.where(User.department == department)
+    if user_ids:
+        query = query.where(User.id.in_(user_ids))
+    return query
+
+
+def batch_clock_out(db, User, TimeEntry, users_select, timestamp, stamp, notes=None):
+    """
+    Closes every open entry of the selected users; returns the closed entries
+    (time_entry_columns rows). `stamp` comes from src.delta_sync.sync_stamp().
+    """
+    values = {
+        'check_out': timestamp,
+        'total_hours': hours_between(db, TimeEntry.check_in, timestamp),
+        **stamp
+    }
+    if notes:
+        values['notes'] = notes
+    statement = db.update(TimeEntry) \
+        .where(
+            TimeEntry.user_id.in_(users_select),
+            TimeEntry.check_out.is_(None),
+            TimeEntry.check_in <= timestamp
+        ) \
+        .values(**values) \
+        .returning(*time_entry_columns(TimeEntry)) \
+        .execution_options(synchronize_session=False)
+    return db.session.execute(statement).all()
+
+
+def batch_clock_in(db, User, TimeEntry, users_select, timestamp, stamp, notes=None):
+    """
+    Opens an entry for every selected active user without an open entry;
+    returns the new entries (time_entry_columns rows)
+    """
+    open_entry = db.select(presence.c.user_id).where(presence.c.user_id == User.id).exists()
+    source = db.select(
+        User.id,
+        db.literal(timestamp.date(), db.Date),
+        db.literal(timestamp, db.DateTime),
+        db.literal(notes, db.Text),
+        # A new entry is created and last updated at the same moment
+        db.literal(stamp['updated_at'], db.DateTime),
+        db.literal(stamp['updated_at'], db.DateTime),
+        db.literal(stamp['change_version'], db.BigInteger)
+    ).where(
+        User.id.in_(users_select),
+        User.status == 'active',
+        ~open_entry
+    )
+    statement = db.insert(TimeEntry) \
+        .from_select(['user_id', 'date', 'check_in', 'notes', 'created_at', 'updated_at', 'change_version'], source) \
+        .returning(*time_entry_columns(TimeEntry))
+    return db.session.execute(statement).all()
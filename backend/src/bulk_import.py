@@ -0,0 +1,211 @@
+"""
+Bulk import of time entries from CSV or NDJSON.
+
+The body is read line by line, validated in chunks and every valid chunk is
+written with a single multi-row INSERT and committed on its own, so memory
+stays flat and one bad row never discards the rest of the file.
+"""
+import io
+import csv
+import json
+from datetime import datetime
+from src.delta_sync import sync_stamp, stamp_pending
+from src.daily_hours import DailyHoursChanges
+from src.presence import presence, rebuild_presence
+
+IMPORT_CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+
+IMPORT_FORMATS = ('csv', 'ndjson')
+
+
+def open_text_stream(stream):
+    """Wraps a binary request/file stream so it can be read line by line as text"""
+    if isinstance(stream, io.RawIOBase):
+        stream = io.BufferedReader(stream)
+    return io.TextIOWrapper(stream, encoding='utf-8', newline='')
+
+
+def iter_records(text_stream, import_format):
+    """Yields (line_number, record_dict or None, error or None)"""
+    if import_format == 'csv':
+        reader = csv.DictReader(text_stream)
+        for record in reader:
+            yield reader.line_num, record, None
+        return
+
+    for line_number, line in enumerate(text_stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            yield line_number, None, 'Invalid JSON'
+            continue
+        if not isinstance(record, dict):
+            yield line_number, None, 'Each line must be a JSON object'
+            continue
+        yield line_number, record, None
+
+
+def _parse_datetime(value):
+    # Same inputs as parse_datetime_string, without printing on every bad row
+    if value.endswith('Z'):
+        value = value[:-1]
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        raise ValueError
+    return parsed
+
+
+def _blank(value):
+    return value is None or (isinstance(value, str) and value.strip() == '')
+
+
+def validate_record(record):
+    """Returns (row for INSERT, list of errors)"""
+    errors = []
+    row = {}
+
+    try:
+        row['user_id'] = int(record.get('user_id'))
+    except (TypeError, ValueError):
+        errors.append('user_id must be an integer')
+
+    try:
+        date_value = record.get('date')
+        row['date'] = datetime.strptime(str(date_value), '%Y-%m-%d').date()
+    except ValueError:
+        errors.append('date must use the YYYY-MM-DD format')
+
+    for field, required in (('check_in', True), ('check_out', False)):
+        value = record.get(field)
+        if _blank(value):
+            if required:
+                errors.append(f'{field} is required')
+            row[field] = None
+            continue
+        try:
+            row[field] = _parse_datetime(str(value))
+        except ValueError:
+            errors.append(f'{field} must be an ISO date/time (YYYY-MM-DDTHH:MM:SS[.fff])')
+
+    if row.get('check_in') and row.get('check_out') and row['check_out'] < row['check_in']:
+        errors.append('check_out is before check_in')
+
+    total_hours = record.get('total_hours')
+    if _blank(total_hours):
+        if row.get('check_in') and row.get('check_out'):
+            row['total_hours'] = round((row['check_out'] - row['check_in']).total_seconds() / 3600, 2)
+        else:
+            row['total_hours'] = None
+    else:
+        try:
+            row['total_hours'] = float(total_hours)
+        except (TypeError, ValueError):
+            errors.append('total_hours must be a number')
+
+    notes = record.get('notes')
+    row['notes'] = None if _blank(notes) else str(notes)
+
+    return row, errors
+
+
+class ImportAborted(Exception):
+    """The import stopped partway; `result` counts the chunks committed before `error`"""
+    def __init__(self, result, error):
+        super().__init__(str(error))
+        self.result = result
+        self.error = error
+
+
+class ImportResult:
+    def __init__(self):
+        self.inserted = 0
+        self.rejected = 0
+        self.errors = []
+
+    def reject(self, line_number, errors):
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line_number, 'errors': errors})
+
+    def to_dict(self):
+        return {
+            'inserted': self.inserted,
+            'rejected': self.rejected,
+            'errors': sorted(self.errors, key=lambda e: e['line']),
+            'errors_truncated': self.rejected > len(self.errors)
+        }
+
+
+def import_time_entries(db, User, TimeEntry, records, dry_run=False, chunk_size=IMPORT_CHUNK_SIZE):
+    """
+    Validates and inserts the records yielded by iter_records().
+    Unknown users and a second open entry for the same user are rejected per row.
+    Raises ImportAborted if reading or writing fails after some chunks were committed.
+    """
+    result = ImportResult()
+    open_users = set()
+    chunk = []
+
+    def flush():
+        user_ids = {row['user_id'] for _, row in chunk}
+        known = {r[0] for r in db.session.query(User.id).filter(User.id.in_(user_ids))}
+        # Users that already have an open entry in the database
+        open_users.update(
+            r[0] for r in db.session.query(presence.c.user_id).filter(presence.c.user_id.in_(user_ids))
+        )
+
+        rows = []
+        for line_number, row in chunk:
+            if row['user_id'] not in known:
+                result.reject(line_number, [f"User {row['user_id']} does not exist"])
+                continue
+            if row['check_out'] is None:
+                if row['user_id'] in open_users:
+                    result.reject(line_number, [f"User {row['user_id']} already has an open entry"])
+                    continue
+                open_users.add(row['user_id'])
+            rows.append(row)
+
+        if rows and not dry_run:
+            stamp = sync_stamp()
+            for row in rows:
+                row.update(stamp, created_at=stamp['updated_at'])
+            # One multi-row INSERT ... VALUES (...), (...) per chunk
+            db.session.execute(TimeEntry.__table__.insert().values(rows))
+            changes = DailyHoursChanges()
+            for row in rows:
+                changes.add_entry(row)
+            changes.apply(db)
+            opened = {row['user_id'] for row in rows if row['check_out'] is None}
+            if opened:
+                # The new open entries' ids are only known after the INSERT
+                rebuild_presence(db.session.connection(), TimeEntry.__table__, list(opened))
+            stamp_pending(db)
+            db.session.commit()
+        result.inserted += len(rows)
+        chunk.clear()
+
+    try:
+        for line_number, record, error in records:
+            if error:
+                result.reject(line_number, [error])
+                continue
+            row, errors = validate_record(record)
+            if errors:
+                result.reject(line_number, errors)
+                continue
+            chunk.append((line_number, row))
+            if len(chunk) >= chunk_size:
+                flush()
+        if chunk:
+            flush()
+    except Exception as e:
+        db.session.rollback()
+        raise ImportAborted(result, e) from e
+    if dry_run:
+        db.session.rollback()
+    return result
@@ -0,0 +1,96 @@
+"""
+Per-table change versions used to answer conditional GETs.
+
+Write handlers call bump_versions() inside their transaction, so the
+counters are shared by every worker and move exactly when data changes.
+A list endpoint can then compare ETags with one primary key lookup
+instead of running its query and serializing the rows.
+"""
+import hashlib
+from functools import wraps
+from flask import request, Response
+from flask_jwt_extended import get_jwt, get_jwt_identity
+from sqlalchemy import text, bindparam
+
+# session.info key: [(table, version)] bumped in the open transaction, read
+# at the commit by EventBroker.track_commits
+BUMPED_VERSIONS = 'bumped_versions'
+
+
+def bump_versions(db, *tables):
+    """
+    Increments the version of each table in the current (uncommitted)
+    transaction; returns {table: new version}. The row stays locked until
+    the commit, so writes to the same table commit in version order: call
+    it as the last statement before the commit.
+    """
+    versions = {}
+    for table in tables:
+        version = db.session.execute(
+            text("UPDATE change_versions SET version = version + 1 WHERE table_name = :t RETURNING version"),
+            {'t': table}
+        ).scalar()
+        if version is None:
+            version = 1
+            db.session.execute(
+                text("INSERT INTO change_versions (table_name, version) VALUES (:t, 1)"),
+                {'t': table}
+            )
+        versions[table] = version
+    db.session.info.setdefault(BUMPED_VERSIONS, []).extend(versions.items())
+    return versions
+
+
+def get_versions(db, tables):
+    rows = db.session.execute(
+        text("SELECT table_name, version FROM change_versions WHERE table_name IN :tables")
+        .bindparams(bindparam('tables', expanding=True)),
+        {'tables': list(tables)}
+    )
+    versions = dict(rows.fetchall())
+    return [versions.get(t, 0) for t in tables]
+
+
+def make_etag(*parts):
+    """Strong ETag value (unquoted) from the given parts"""
+    raw = '|'.join(str(p) for p in parts).encode('utf-8')
+    return hashlib.sha1(raw).hexdigest()[:32]
+
+
+def conditional_get(get_db, *tables):
+    """
+    Decorator for JWT-protected list endpoints. The ETag covers the table
+    versions, the caller's role/department/id and the query string, so two
+    users never share a representation. Matching If-None-Match answers 304
+    without running the view.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            db = get_db()
+            if not db:
+                return f(*args, **kwargs)
+
+            try:
+                claims = get_jwt()
+                etag = make_etag(
+                    request.path, request.query_string.decode('utf-8'),
+                    claims.get('role'), claims.get('department'), get_jwt_identity(),
+                    *get_versions(db, tables)
+                )
+            except Exception as e:
+                db.session.rollback()
+                print(f"⚠️ ETag unavailable: {e}")
+                return f(*args, **kwargs)
+
+            if request.if_none_match.contains(etag):
+                response = Response(status=304)
+            else:
+                response = f(*args, **kwargs)
+                if isinstance(response, tuple) or response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return decorated
+    return decorator
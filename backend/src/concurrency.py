@@ -0,0 +1,50 @@
+"""
+Helpers for running under gevent (GUNICORN_WORKER_CLASS=gevent).
+
+Under gevent, sockets are cooperative, so pg8000, which is pure Python, yields
+to other greenlets while it waits on PostgreSQL. C extensions that block (bcrypt,
+psycopg without psycogreen) would stall the whole worker instead, so they must run
+on real OS threads or be patched.
+"""
+import sys
+
+
+def gevent_active():
+    """True when gevent has monkey-patched the socket module"""
+    if 'gevent' not in sys.modules:
+        return False
+    from gevent import monkey
+    return monkey.is_module_patched('socket')
+
+
+def patch_gevent():
+    """Monkey-patches the standard library and, if available, psycopg2 (psycogreen)"""
+    from gevent import monkey
+    if not monkey.is_module_patched('socket'):
+        monkey.patch_all()
+    try:
+        from psycogreen.gevent import patch_psycopg
+        patch_psycopg()
+    except ImportError:
+        pass
+
+
+def psycogreen_available():
+    try:
+        import psycogreen.gevent  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def native_lock():
+    """
+    A real OS-level lock, even after monkey-patching. Needed for state shared
+    between greenlets and native threads (e.g. gevent's thread pool); only use
+    it around very short critical sections.
+    """
+    if gevent_active():
+        from gevent.monkey import get_original
+        return get_original('_thread', 'allocate_lock')()
+    import threading
+    return threading.Lock()
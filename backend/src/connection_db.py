@@ -1,5 +1,10 @@
 import os
+import importlib
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from src.db_pool import TimedQueuePool, SerializedStaticPool
+from src.concurrency import gevent_active, psycogreen_available
+from src.query_diagnostics import install_query_diagnostics
 
 # Global database instance
 db = None
@@ -7,57 +12,150 @@ User = None
 TimeEntry = None
 DATABASE_TYPE = 'Mock Data'
 IS_PERSISTENT = False
+DATABASE_DRIVER = None
+# True when DATABASE_URL is unset and the app runs on SQLITE_PATH
+LOCAL_SQLITE = False
+
+# Driver module -> SQLAlchemy dialect suffix. 'auto' tries them in this order,
+# so pg8000 (pure Python, always in requirements.txt) remains the fallback.
+POSTGRES_DRIVERS = {
+    'psycopg': 'psycopg',
+    'psycopg2': 'psycopg2',
+    'pg8000': 'pg8000',
+}
+
+TRUE_VALUES = ('1', 'true', 'yes', 'on')
+
+# Used when DATABASE_URL is not set: ':memory:' (default) or a file path
+SQLITE_PATH = os.getenv('SQLITE_PATH', ':memory:')
+
+
+def select_postgres_driver(requested):
+    """Returns the first importable driver name (or raises ImportError)"""
+    candidates = list(POSTGRES_DRIVERS) if requested == 'auto' else [requested]
+    if requested == 'auto' and gevent_active():
+        # Only drivers that yield to other greenlets: psycopg2 through psycogreen, pg8000 natively
+        candidates = (['psycopg2'] if psycogreen_available() else []) + ['pg8000']
+    errors = []
+    for name in candidates:
+        if name not in POSTGRES_DRIVERS:
+            raise ImportError(f"Unknown DB_DRIVER '{name}'. Use auto, {', '.join(POSTGRES_DRIVERS)}")
+        try:
+            importlib.import_module(name)
+            return name
+        except ImportError as e:
+            errors.append(f"{name}: {e}")
+    raise ImportError('; '.join(errors))
+
+
+def get_pool_options():
+    """Pool settings from the environment (defaults keep the previous behaviour)"""
+    return {
+        'poolclass': TimedQueuePool,
+        'pool_size': int(os.getenv('DB_POOL_SIZE', '5')),
+        'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', '10')),
+        'pool_timeout': float(os.getenv('DB_POOL_TIMEOUT', '30')),
+        'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', '300')),
+        'pool_pre_ping': os.getenv('DB_POOL_PRE_PING', 'true').lower() in TRUE_VALUES,
+    }
+
+
+def get_sqlite_options(database_url):
+    """
+    Engine options for SQLite. An in-memory database only exists inside its
+    connection, so every session shares one, one session at a time
+    (SerializedStaticPool); files get a normal pool and WAL mode (see
+    _sqlite_on_connect).
+    """
+    options = {'connect_args': {'check_same_thread': False, 'timeout': 30}}
+    if database_url in ('sqlite://', 'sqlite:///:memory:'):
+        options['poolclass'] = SerializedStaticPool
+    return options
+
+
+def _sqlite_on_connect(dbapi_connection, connection_record):
+    # Same guarantees as PostgreSQL for foreign keys, readers never block the writer
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA foreign_keys=ON')
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.close()
+
 
 def init_database_connection(app):
     """Initialize database connection and models"""
-    global db, User, TimeEntry, DATABASE_TYPE, IS_PERSISTENT
-    
+    global db, User, TimeEntry, DATABASE_TYPE, IS_PERSISTENT, DATABASE_DRIVER, LOCAL_SQLITE
+
     DATABASE_URL = os.getenv('DATABASE_URL')
-    
-    if not DATABASE_URL:
-        print("⚠️ No DATABASE_URL found, using mock data")
-        return None, None, None, 'Mock Data', False
-    
-    print(f"🔍 DATABASE_URL found: {DATABASE_URL[:50]}...")
-    
+
+    local_sqlite = not DATABASE_URL
+    if local_sqlite:
+        # No PostgreSQL: run the real models on SQLite (schema and mock users from init_database)
+        DATABASE_URL = 'sqlite://' if SQLITE_PATH == ':memory:' else f'sqlite:///{os.path.abspath(SQLITE_PATH)}'
+        print(f"⚠️ No DATABASE_URL found, using SQLite ({SQLITE_PATH})")
+    else:
+        print(f"🔍 DATABASE_URL found: {DATABASE_URL[:50]}...")
+
     try:
-        # Transform postgres:// to postgresql+pg8000://
-        if DATABASE_URL.startswith('postgres://'):
-            DATABASE_URL = DATABASE_URL.replace('postgres://', 'postgresql+pg8000://', 1)
-        elif DATABASE_URL.startswith('postgresql://'):
-            DATABASE_URL = DATABASE_URL.replace('postgresql://', 'postgresql+pg8000://', 1)
-        
+        is_postgres = DATABASE_URL.startswith(('postgres://', 'postgresql'))
+        is_sqlite = DATABASE_URL.startswith('sqlite')
+        driver = None
+        engine_options = {'pool_pre_ping': True, 'pool_recycle': 300}
+
+        if is_postgres:
+            # Pick the driver, then transform postgres:// to postgresql+<driver>://
+            try:
+                driver = select_postgres_driver(os.getenv('DB_DRIVER', 'auto').lower())
+            except ImportError as e:
+                print(f"⚠️ No PostgreSQL driver available: {e}")
+                return None, None, None, 'Mock Data', False
+
+            dialect = f"postgresql+{POSTGRES_DRIVERS[driver]}://"
+            if DATABASE_URL.startswith('postgres://'):
+                DATABASE_URL = DATABASE_URL.replace('postgres://', dialect, 1)
+            elif DATABASE_URL.startswith('postgresql://'):
+                DATABASE_URL = DATABASE_URL.replace('postgresql://', dialect, 1)
+            engine_options = get_pool_options()
+        elif is_sqlite:
+            driver = 'sqlite3'
+            engine_options = get_sqlite_options(DATABASE_URL)
+
         # Configure Flask-SQLAlchemy
         app.config['SQLALCHEMY_DATABASE_URI'] = DATABASE_URL
         app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
-            'pool_pre_ping': True,
-            'pool_recycle': 300,
-        }
-        
-        # Try to import pg8000 and initialize database
-        try:
-            import pg8000
-            db = SQLAlchemy(app)
-            
-            # Initialize models
-            from src.models import init_models
-            User, TimeEntry = init_models(db)
-            
-            DATABASE_TYPE = 'PostgreSQL'
-            IS_PERSISTENT = True
-            app.DATABASE_TYPE = DATABASE_TYPE
-            
-            print("✅ PostgreSQL with pg8000 configured!")
-            
-            return db, User, TimeEntry, DATABASE_TYPE, IS_PERSISTENT
-            
-        except ImportError as e:
-            print(f"⚠️ pg8000 not available: {e}")
-            return None, None, None, 'Mock Data', False
-            
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options
+
+        db = SQLAlchemy(app)
+        if engine_options.get('poolclass') is SerializedStaticPool:
+            with app.app_context():
+                # Flask-SQLAlchemy always gives in-memory SQLite a plain StaticPool
+                db.engine.pool = SerializedStaticPool.from_pool(db.engine.pool)
+
+        # Initialize models
+        from src.models import init_models
+        User, TimeEntry = init_models(db)
+        install_query_diagnostics(app, db)
+
+        if is_sqlite:
+            with app.app_context():
+                event.listen(db.engine, 'connect', _sqlite_on_connect)
+
+        DATABASE_TYPE = 'PostgreSQL' if is_postgres else 'SQLite' if is_sqlite else DATABASE_URL.split(':', 1)[0]
+        IS_PERSISTENT = not (is_sqlite and engine_options.get('poolclass') is SerializedStaticPool)
+        DATABASE_DRIVER = driver
+        LOCAL_SQLITE = local_sqlite
+        app.DATABASE_TYPE = DATABASE_TYPE
+
+        if is_postgres:
+            print(f"✅ PostgreSQL with {driver} configured! "
+                  f"(pool_size={engine_options['pool_size']}, max_overflow={engine_options['max_overflow']}, "
+                  f"pre_ping={engine_options['pool_pre_ping']})")
+        else:
+            print(f"✅ {DATABASE_TYPE} configured ({'in memory' if not IS_PERSISTENT else DATABASE_URL})")
+
+        return db, User, TimeEntry, DATABASE_TYPE, IS_PERSISTENT
+
     except Exception as e:
-        print(f"❌ PostgreSQL setup failed: {e}")
+        print(f"❌ Database setup failed, using mock data: {e}")
         return None, None, None, 'Mock Data', False
 
 def get_database_info():
@@ -67,5 +165,7 @@ def get_database_info():
         'User': User,
         'TimeEntry': TimeEntry,
         'DATABASE_TYPE': DATABASE_TYPE,
-        'IS_PERSISTENT': IS_PERSISTENT
-    }
\ No newline at end of file
+        'DATABASE_DRIVER': DATABASE_DRIVER,
+        'IS_PERSISTENT': IS_PERSISTENT,
+        'LOCAL_SQLITE': LOCAL_SQLITE
+    }
@@ -0,0 +1,174 @@
+"""
+daily_hours: hours worked per (user_id, date), maintained incrementally.
+
+Every write to time_entries records the change of each affected day as a
+delta (entries, open entries, hours) and applies it in the same transaction
+with one INSERT ... ON CONFLICT DO UPDATE per day. Deltas add up, so two
+concurrent writes to the same day never overwrite each other: the second
+upsert waits for the first one's row lock and adds to its result. Days that
+drop to zero entries are removed.
+
+Reports and the dashboard read these rows instead of aggregating
+time_entries. `flask --app app verify-daily-hours` compares the rollup with
+time_entries and `rebuild-daily-hours` recomputes it from scratch.
+"""
+from datetime import datetime
+from sqlalchemy import (
+    MetaData, Table, Column, Integer, Float, Date, DateTime, text, bindparam, select, insert,
+    delete, func, case, literal_column
+)
+
+# Own MetaData: the table is created by src/migrations.py, not by create_all()
+daily_hours = Table(
+    'daily_hours', MetaData(),
+    Column('user_id', Integer, primary_key=True),
+    Column('date', Date, primary_key=True),
+    Column('entries', Integer, nullable=False),
+    Column('open_entries', Integer, nullable=False),
+    Column('total_hours', Float, nullable=False),
+    Column('updated_at', DateTime)
+)
+
+# Hours differences below this are float rounding, not drift
+HOURS_TOLERANCE = 0.005
+
+_UPSERT = text("""
+    INSERT INTO daily_hours (user_id, date, entries, open_entries, total_hours, updated_at)
+    VALUES (:user_id, :date, :entries, :open_entries, :total_hours, :updated_at)
+    ON CONFLICT (user_id, date) DO UPDATE SET
+        entries = daily_hours.entries + excluded.entries,
+        open_entries = daily_hours.open_entries + excluded.open_entries,
+        total_hours = daily_hours.total_hours + excluded.total_hours,
+        updated_at = excluded.updated_at
+""").bindparams(bindparam('date', type_=Date), bindparam('updated_at', type_=DateTime))
+
+_DELETE_EMPTY = text(
+    "DELETE FROM daily_hours WHERE user_id = :user_id AND date = :date AND entries <= 0"
+).bindparams(bindparam('date', type_=Date))
+
+
+def _entry_values(entry):
+    """(user_id, date, check_out, total_hours) of a TimeEntry or an inserted row dict"""
+    if isinstance(entry, dict):
+        return entry['user_id'], entry['date'], entry.get('check_out'), entry.get('total_hours')
+    return entry.user_id, entry.date, entry.check_out, entry.total_hours
+
+
+class DailyHoursChanges:
+    """
+    Collects the per-day deltas of one transaction. For an update, call
+    remove_entry() before changing the entry and add_entry() after.
+    """
+    def __init__(self):
+        self._deltas = {}
+
+    def add(self, user_id, day, entries=0, open_entries=0, total_hours=0):
+        delta = self._deltas.setdefault((user_id, day), [0, 0, 0.0])
+        delta[0] += entries
+        delta[1] += open_entries
+        delta[2] += total_hours or 0
+
+    def add_entry(self, entry, sign=1):
+        user_id, day, check_out, total_hours = _entry_values(entry)
+        self.add(user_id, day, sign, sign if check_out is None else 0, sign * (total_hours or 0))
+
+    def remove_entry(self, entry):
+        self.add_entry(entry, sign=-1)
+
+    def apply(self, db):
+        """Upserts the non-zero deltas in the session's transaction; returns the days touched"""
+        now = datetime.now()
+        rows = [
+            {'user_id': user_id, 'date': day, 'entries': entries, 'open_entries': open_entries,
+             'total_hours': hours, 'updated_at': now}
+            for (user_id, day), (entries, open_entries, hours) in self._deltas.items()
+            if entries or open_entries or hours
+        ]
+        if rows:
+            db.session.execute(_UPSERT, rows)
+            db.session.execute(_DELETE_EMPTY, [{'user_id': r['user_id'], 'date': r['date']} for r in rows])
+        self._deltas.clear()
+        return len(rows)
+
+
+def delete_user_daily_hours(db, user_id):
+    db.session.execute(delete(daily_hours).where(daily_hours.c.user_id == user_id))
+
+
+def _latest(a, b):
+    return case((a >= b, a), else_=b)
+
+
+def _aggregate_select(time_entries):
+    """Per-day totals computed from time_entries, in daily_hours column order"""
+    t = time_entries.c
+    return select(
+        t.user_id,
+        t.date,
+        func.count().label('entries'),
+        func.count(case((t.check_out.is_(None), 1))).label('open_entries'),
+        func.coalesce(func.sum(t.total_hours), 0).label('total_hours'),
+        _latest(
+            func.max(t.created_at), func.max(func.coalesce(t.check_out, t.check_in, t.created_at))
+        ).label('updated_at')
+    ).group_by(t.user_id, t.date)
+
+
+def rebuild_daily_hours(conn, time_entries, users_select=None):
+    """
+    Recomputes daily_hours from time_entries (a Table) on a Connection, for
+    every user or only for the ids returned by `users_select`. Returns the
+    number of days written.
+    """
+    clear = delete(daily_hours)
+    source = _aggregate_select(time_entries)
+    if users_select is not None:
+        clear = clear.where(daily_hours.c.user_id.in_(users_select))
+        source = source.where(time_entries.c.user_id.in_(users_select))
+    conn.execute(clear)
+    columns = ['user_id', 'date', 'entries', 'open_entries', 'total_hours', 'updated_at']
+    return conn.execute(insert(daily_hours).from_select(columns, source)).rowcount
+
+
+def verify_daily_hours(conn, time_entries, sample_size=20):
+    """
+    Compares daily_hours with time_entries. Returns (days checked, number of
+    mismatching days, up to `sample_size` mismatches as dicts).
+    """
+    expected = _aggregate_select(time_entries).subquery('expected')
+    e = expected.c
+    d = daily_hours.c
+
+    # Days that are missing or wrong in the rollup...
+    wrong = select(
+        e.user_id, e.date, e.entries, e.open_entries, e.total_hours, d.entries, d.open_entries, d.total_hours
+    ).select_from(
+        expected.outerjoin(daily_hours, (d.user_id == e.user_id) & (d.date == e.date))
+    ).where(
+        d.user_id.is_(None)
+        | (d.entries != e.entries)
+        | (d.open_entries != e.open_entries)
+        | (func.abs(d.total_hours - e.total_hours) > HOURS_TOLERANCE)
+    )
+    # ...and days in the rollup without any entry
+    t = time_entries.c
+    stale = select(
+        d.user_id, d.date, literal_column('0'), literal_column('0'), literal_column('0'),
+        d.entries, d.open_entries, d.total_hours
+    ).where(~select(t.id).where(t.user_id == d.user_id, t.date == d.date).exists())
+
+    mismatches = 0
+    samples = []
+    for statement in (wrong, stale):
+        for row in conn.execute(statement):
+            mismatches += 1
+            if len(samples) < sample_size:
+                samples.append({
+                    'user_id': row[0],
+                    'date': str(row[1])[:10],
+                    'expected': {'entries': row[2], 'open_entries': row[3], 'total_hours': float(row[4] or 0)},
+                    'rollup': {'entries': row[5], 'open_entries': row[6],
+                               'total_hours': float(row[7]) if row[7] is not None else None}
+                })
+    checked = conn.execute(select(func.count()).select_from(daily_hours)).scalar()
+    return checked, mismatches, samples
@@ -0,0 +1,116 @@
+"""
+Connection pool that records how long each checkout waits.
+
+TimedQueuePool is a QueuePool whose _do_get() is timed, so the wait
+includes queueing for a free connection and opening a new one. The
+numbers are published by /api/health to size the pool against the
+number of gunicorn workers/threads.
+
+SerializedStaticPool is the single shared connection of an in-memory
+SQLite database, handed to one checkout at a time.
+"""
+import time
+import threading
+from sqlalchemy import exc
+from sqlalchemy.pool import QueuePool, StaticPool
+
+# Upper bounds (seconds) of the checkout wait histogram
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+
+class PoolWaitStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.buckets = [0] * len(WAIT_BUCKETS)
+
+    def record(self, waited):
+        with self._lock:
+            self.checkouts += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+            for i, bound in enumerate(WAIT_BUCKETS):
+                if waited <= bound:
+                    self.buckets[i] += 1
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'checkouts': self.checkouts,
+                'timeouts': self.timeouts,
+                'wait_total_seconds': self.wait_total,
+                'wait_max_seconds': self.wait_max,
+                'wait_buckets': dict(zip(WAIT_BUCKETS, self.buckets))
+            }
+
+
+pool_wait_stats = PoolWaitStats()
+
+
+class TimedQueuePool(QueuePool):
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            pool_wait_stats.record_timeout()
+            raise
+        pool_wait_stats.record(time.perf_counter() - started)
+        return connection
+
+
+class SerializedStaticPool(StaticPool):
+    """
+    StaticPool whose connection is held by one checkout at a time: other
+    threads wait in connect() until it is returned, so they never run inside
+    each other's transaction. The holder may check it out again.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._checkout_lock = threading.RLock()
+
+    @classmethod
+    def from_pool(cls, pool):
+        """Replacement for a StaticPool with its settings and listeners (as StaticPool.recreate())"""
+        return cls(
+            creator=pool._creator, recycle=pool._recycle, reset_on_return=pool._reset_on_return,
+            pre_ping=pool._pre_ping, echo=pool.echo, logging_name=pool._orig_logging_name,
+            _dispatch=pool.dispatch, dialect=pool._dialect
+        )
+
+    def _do_get(self):
+        self._checkout_lock.acquire()
+        try:
+            return super()._do_get()
+        except BaseException:
+            self._checkout_lock.release()
+            raise
+
+    def _do_return_conn(self, record):
+        # Last step of a checkin, after the record is reset
+        super()._do_return_conn(record)
+        self._checkout_lock.release()
+
+
+def get_pool_stats(engine):
+    """Pool occupancy plus checkout wait statistics"""
+    stats = pool_wait_stats.snapshot()
+    pool = engine.pool
+    if isinstance(pool, QueuePool):
+        stats.update({
+            'size': pool.size(),
+            'checked_in': pool.checkedin(),
+            'checked_out': pool.checkedout(),
+            'overflow': pool.overflow()
+        })
+    checkouts = stats['checkouts']
+    stats['wait_avg_ms'] = round(stats['wait_total_seconds'] / checkouts * 1000, 3) if checkouts else 0.0
+    stats['wait_max_ms'] = round(stats['wait_max_seconds'] * 1000, 3)
+    return stats
@@ -0,0 +1,209 @@
+"""
+Delta sync for time entries: GET /api/time-entries?since=<sync_token>.
+
+Every write to time_entries stamps the rows it writes with the time
+(updated_at) and with the 'time_entries' change version (change_version, see
+src/change_versions.py). Deletes leave a tombstone with the same version. A
+client keeps the sync_token of its last response and asks only for the rows
+and tombstones with a higher version.
+
+The rows are written with PENDING_VERSION; stamp_pending() bumps the version
+and gives it to them as the last statements before the commit. The version
+row stays locked from the bump until the commit, so time entry writes commit
+in version order: once version V can be read, every change up to V is
+committed and none can be missed. Bumping last keeps that lock out of the
+rest of the write, so concurrent writers only queue for the stamp and the
+commit. Rows committed while a delta is read may be sent twice; applying a
+row twice is harmless.
+
+Changes that leave no stamped rows or tombstones (archived months,
+generated data, a user moving to another department, pruned tombstones)
+raise the sync horizon instead. Tokens older than the horizon are answered
+with 410 and the client fetches the full list again.
+"""
+import base64
+import os
+from datetime import datetime, timedelta
+from sqlalchemy import (
+    MetaData, Table, Column, Integer, BigInteger, String, Date, DateTime, text, select, insert, delete,
+    func, literal, bindparam
+)
+from src.change_versions import bump_versions
+
+TOMBSTONE_RETENTION_DAYS = int(os.getenv('TOMBSTONE_RETENTION_DAYS', '30'))
+SYNC_MAX_CHANGES = int(os.getenv('SYNC_MAX_CHANGES', '5000'))
+
+# Stored as a pseudo table in change_versions
+SYNC_HORIZON = 'time_entries_sync_horizon'
+
+# change_version of the entries and tombstones written by an open
+# transaction, until stamp_pending() replaces it. Rows from before
+# migration 11 have 0, so the stamp never picks them up.
+PENDING_VERSION = -1
+
+# Own MetaData: the table is created by src/migrations.py, not by create_all()
+time_entry_tombstones = Table(
+    'time_entry_tombstones', MetaData(),
+    Column('entry_id', Integer, primary_key=True),
+    Column('user_id', Integer, nullable=False),
+    Column('department', String(50)),
+    Column('date', Date, nullable=False),
+    Column('change_version', BigInteger, nullable=False),
+    Column('deleted_at', DateTime, nullable=False)
+)
+
+
+def encode_sync_token(version):
+    return base64.urlsafe_b64encode(f'v{version}'.encode('ascii')).decode('ascii').rstrip('=')
+
+
+def decode_sync_token(token):
+    """Returns the version of a token from encode_sync_token; raises ValueError if it is invalid"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode('ascii')).decode('ascii')
+        if not raw.startswith('v'):
+            raise ValueError
+        version = int(raw[1:])
+    except Exception:
+        raise ValueError('Invalid sync token')
+    if version < 0:
+        raise ValueError('Invalid sync token')
+    return version
+
+
+def sync_stamp():
+    """Column values for the time entries and tombstones a write handler writes"""
+    return {'change_version': PENDING_VERSION, 'updated_at': datetime.now()}
+
+
+def stamp_pending(db, *tables):
+    """
+    Bumps the version of `tables` and 'time_entries' and gives it to the
+    pending entries and tombstones of this transaction; returns the versions.
+    Call it last, right before the commit: the version row is locked from the
+    bump until then.
+    """
+    # Attribute changes made through the ORM must be written before they are stamped
+    db.session.flush()
+    versions = bump_versions(db, *(t for t in tables if t != 'time_entries'), 'time_entries')
+    for table in ('time_entries', 'time_entry_tombstones'):
+        db.session.execute(
+            text(f"UPDATE {table} SET change_version = :v WHERE change_version = :pending"),
+            {'v': versions['time_entries'], 'pending': PENDING_VERSION}
+        )
+    return versions
+
+
+def stamp_entry(entry, stamp):
+    for column, value in stamp.items():
+        setattr(entry, column, value)
+
+
+# An entry id can be deleted twice when an old SQLite table hands it out
+# again: the newer delete replaces the tombstone
+_UPSERT_TOMBSTONE = text("""
+    INSERT INTO time_entry_tombstones (entry_id, user_id, department, date, change_version, deleted_at)
+    VALUES (:entry_id, :user_id, :department, :date, :change_version, :deleted_at)
+    ON CONFLICT (entry_id) DO UPDATE SET
+        user_id = excluded.user_id,
+        department = excluded.department,
+        date = excluded.date,
+        change_version = excluded.change_version,
+        deleted_at = excluded.deleted_at
+""").bindparams(bindparam('date', type_=Date), bindparam('deleted_at', type_=DateTime))
+
+
+def record_tombstone(db, entry, department, stamp):
+    """Remembers a deleted TimeEntry for the next delta syncs"""
+    db.session.execute(_UPSERT_TOMBSTONE, {
+        'entry_id': entry.id, 'user_id': entry.user_id, 'department': department, 'date': entry.date,
+        'change_version': stamp['change_version'], 'deleted_at': stamp['updated_at']
+    })
+
+
+def tombstone_user_entries(db, TimeEntry, user_id, department, stamp):
+    """Tombstones every entry of a user that is about to be deleted, in one INSERT ... SELECT"""
+    source = select(
+        TimeEntry.id, TimeEntry.user_id, literal(department, String(50)), TimeEntry.date,
+        literal(stamp['change_version'], BigInteger), literal(stamp['updated_at'], DateTime)
+    ).where(TimeEntry.user_id == user_id)
+    t = time_entry_tombstones.c
+    db.session.execute(delete(time_entry_tombstones).where(
+        t.entry_id.in_(select(TimeEntry.id).where(TimeEntry.user_id == user_id))
+    ))
+    db.session.execute(insert(time_entry_tombstones).from_select(
+        ['entry_id', 'user_id', 'department', 'date', 'change_version', 'deleted_at'], source
+    ))
+
+
+def scoped_tombstones_query(since, user_role, user_dept, user_id, filters):
+    """Tombstones newer than `since` the caller's role can see, narrowed like the listing"""
+    t = time_entry_tombstones.c
+    query = select(t.entry_id, t.user_id, t.date, t.deleted_at).where(t.change_version > since)
+    department = filters['department']
+    if user_role == 'manager':
+        department = user_dept
+    elif user_role != 'admin':
+        query = query.where(t.user_id == user_id)
+        department = None
+    if department:
+        query = query.where(t.department == department)
+    if filters['date_from']:
+        query = query.where(t.date >= filters['date_from'])
+    if filters['date_to']:
+        query = query.where(t.date <= filters['date_to'])
+    if filters['user_id'] is not None:
+        query = query.where(t.user_id == filters['user_id'])
+    return query.order_by(t.change_version, t.entry_id)
+
+
+def serialize_tombstones(rows):
+    return [
+        {
+            'id': entry_id,
+            'user_id': user_id,
+            'date': day.isoformat() if day is not None else None,
+            'deleted_at': deleted_at.isoformat() if deleted_at is not None else None
+        }
+        for entry_id, user_id, day, deleted_at in rows
+    ]
+
+
+def get_sync_horizon(db):
+    return db.session.execute(
+        text("SELECT version FROM change_versions WHERE table_name = :t"), {'t': SYNC_HORIZON}
+    ).scalar() or 0
+
+
+def raise_sync_horizon(db, version):
+    """Expires every sync token older than `version` (in the current transaction)"""
+    exists = db.session.execute(
+        text("SELECT 1 FROM change_versions WHERE table_name = :t"), {'t': SYNC_HORIZON}
+    ).first()
+    if exists:
+        db.session.execute(
+            text("UPDATE change_versions SET version = :v WHERE table_name = :t AND version < :v"),
+            {'t': SYNC_HORIZON, 'v': version}
+        )
+    else:
+        db.session.execute(
+            text("INSERT INTO change_versions (table_name, version) VALUES (:t, :v)"),
+            {'t': SYNC_HORIZON, 'v': version}
+        )
+
+
+def prune_tombstones(db, retention_days=TOMBSTONE_RETENTION_DAYS):
+    """
+    Deletes tombstones older than the retention and raises the sync horizon
+    past them, so a client that missed those deletes re-fetches everything.
+    Returns the number of tombstones deleted.
+    """
+    t = time_entry_tombstones.c
+    cutoff = datetime.now() - timedelta(days=retention_days)
+    newest = db.session.execute(select(func.max(t.change_version)).where(t.deleted_at < cutoff)).scalar()
+    if newest is None:
+        return 0
+    pruned = db.session.execute(delete(time_entry_tombstones).where(t.change_version <= newest)).rowcount
+    raise_sync_horizon(db, newest)
+    return pruned
@@ -0,0 +1,227 @@
+"""
+Relays /api/events events between gunicorn workers with PostgreSQL
+LISTEN/NOTIFY, so a write handled by one worker reaches the subscribers of
+every worker as the event itself instead of a `resync`.
+
+After publishing locally, a worker sends its events with pg_notify on the
+EVENT_CHANNEL channel, together with the change versions it committed (see
+EventBroker.note_versions). Every worker that has had subscribers keeps one
+dedicated connection LISTENing (outside the pool) and republishes what the
+other workers sent. The versions tell its VersionWatcher that those changes
+were delivered, so only writes nobody published (CLI commands, manual SQL)
+still cause a resync.
+
+Workers also announce on the channel whether they have subscribers (on
+every change and every SSE_ANNOUNCE_SECONDS while they do), and every
+worker listens from its first request. A worker whose own streams are
+closed and that heard of no other worker with streams skips building and
+sending events altogether (see others_listening). A missed announcement
+costs a resync from the watcher, never a lost change.
+
+NOTIFY payloads are limited to 8000 bytes: events are packed into as few
+notifications as fit, and an event too large for one is replaced by a
+resync. Notifications are lost while the listening connection is down, so
+subscribers get a resync after it reconnects.
+
+Listening relies on pg8000's notification queue. With other drivers the
+relay is off and the change_versions watcher alone sends resync.
+"""
+import os
+import json
+import time
+import select
+import threading
+from sqlalchemy import create_engine, text, bindparam
+from sqlalchemy.pool import NullPool
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.types import Text
+
+EVENT_CHANNEL = 'timetracer_events'
+# Room left for the message envelope under PostgreSQL's 8000 byte limit
+MAX_PAYLOAD_BYTES = 7500
+RECONNECT_SECONDS = 5
+ANNOUNCE_SECONDS = float(os.getenv('SSE_ANNOUNCE_SECONDS', '10'))
+# A worker is assumed to have no streams after this many missed announcements
+ANNOUNCE_MISSES = 3
+# Until the other workers answered the question sent on connect, assume they have streams
+WARMUP_SECONDS = 3
+
+_NOTIFY = text(
+    f"SELECT pg_notify('{EVENT_CHANNEL}', payload) FROM unnest(:payloads) AS payload"
+).bindparams(bindparam('payloads', type_=ARRAY(Text)))
+
+
+def relay_supported(database_type, driver):
+    return database_type == 'PostgreSQL' and driver == 'pg8000'
+
+
+def pack_payloads(origin, events, versions, resync=False):
+    """
+    NOTIFY payloads for `events` [(type, data, user_ids, departments)]. The
+    versions and the resync flag ride on the first one.
+    """
+    versions_json = json.dumps(versions)
+    if len(versions_json) > MAX_PAYLOAD_BYTES // 2:
+        # Unknown versions make the other workers resync by themselves
+        versions_json = '{}'
+    budget = MAX_PAYLOAD_BYTES - len(versions_json)
+    batches, batch, size = [], [], 0
+    for event_type, data, user_ids, departments in events:
+        item = json.dumps([event_type, data, list(user_ids), list(departments)], default=str)
+        if len(item) > budget:
+            resync = True
+            continue
+        if batch and size + len(item) > budget:
+            batches.append(batch)
+            batch, size = [], 0
+        batch.append(item)
+        size += len(item) + 1
+    batches.append(batch)
+
+    origin_json = json.dumps(origin)
+    payloads = ['{"o":%s,"v":%s,"r":%s,"e":[%s]}' % (
+        origin_json, versions_json, json.dumps(resync), ','.join(batches[0])
+    )]
+    payloads += ['{"o":%s,"e":[%s]}' % (origin_json, ','.join(batch)) for batch in batches[1:]]
+    return payloads
+
+
+class EventRelay:
+    def __init__(self, broker, db):
+        self.broker = broker
+        self.db = db
+        self._listener = None
+        self._lock = threading.Lock()
+        # Other workers with subscribers: {stream id: monotonic expiry}
+        self._remote_streams = {}
+        self._connected_at = None
+        self._announced = False
+        self._last_announce = 0.0
+        self._announce_requested = False
+        self.sent = 0
+        self.received = 0
+
+    def others_listening(self):
+        """
+        True if another worker may have subscribers. Unknown (not listening
+        yet, reconnecting, waiting for answers) counts as True.
+        """
+        connected_at = self._connected_at
+        now = time.monotonic()
+        if connected_at is None or now - connected_at < WARMUP_SECONDS:
+            return True
+        return any(expires > now for expires in list(self._remote_streams.values()))
+
+    def remote_streams(self):
+        now = time.monotonic()
+        return sum(1 for expires in list(self._remote_streams.values()) if expires > now)
+
+    def send(self, events, versions, resync=False):
+        """Notifies the other workers; never raises (their watchers resync if this fails)"""
+        if not events and not versions and not resync:
+            return
+        payloads = pack_payloads(self.broker.stream_id, events, versions, resync)
+        try:
+            with self.db.engine.begin() as conn:
+                conn.execute(_NOTIFY, {'payloads': payloads})
+            self.sent += len(payloads)
+        except Exception as e:
+            print(f"⚠️ Event relay notify failed: {e}")
+
+    def start_listening(self, app):
+        if self._listener is not None:
+            return
+        with self._lock:
+            if self._listener is not None:
+                return
+            with app.app_context():
+                url = self.db.engine.url
+            self._listener = threading.Thread(
+                target=self._listen_forever, args=(url,), name='sse-event-relay', daemon=True
+            )
+        self._listener.start()
+
+    def _listen_forever(self, url):
+        # Its own connection: it stays checked out for the life of the worker
+        engine = create_engine(url, poolclass=NullPool)
+        while True:
+            try:
+                self._listen(engine)
+            except Exception as e:
+                print(f"⚠️ Event relay connection lost: {e}")
+            self._connected_at = None
+            self._announced = False
+            # Whatever was sent while nobody listened is gone
+            self.broker.resync_all(relay=False)
+            time.sleep(RECONNECT_SECONDS)
+
+    def _listen(self, engine, timeout=1.0):
+        connection = engine.raw_connection()
+        try:
+            driver_connection = connection.dbapi_connection
+            driver_connection.autocommit = True
+            cursor = driver_connection.cursor()
+            cursor.execute(f'LISTEN {EVENT_CHANNEL}')
+            # Workers with streams answer by announcing themselves
+            self._notify(cursor, {'o': self.broker.stream_id, 'q': True})
+            self._connected_at = time.monotonic()
+            notifications = driver_connection.notifications
+            sock = getattr(driver_connection, '_usock', None)
+            while True:
+                # Sleep until the server sends something; the timeout also
+                # catches notifications already read into pg8000's buffer
+                if sock is not None:
+                    select.select([sock], [], [], timeout)
+                else:
+                    time.sleep(timeout)
+                cursor.execute('SELECT 1')
+                overflowed = len(notifications) == notifications.maxlen
+                messages = []
+                while notifications:
+                    messages.append(notifications.popleft()[2])
+                self.deliver(messages, overflowed)
+                self._announce(cursor)
+        finally:
+            connection.close()
+
+    def _notify(self, cursor, message):
+        cursor.execute('SELECT pg_notify(%s, %s)', (EVENT_CHANNEL, json.dumps(message)))
+
+    def _announce(self, cursor):
+        """Tells the other workers whether this one has subscribers, when it changed or is due"""
+        has_streams = self.broker.subscriber_count() > 0
+        now = time.monotonic()
+        due = has_streams and (self._announce_requested or now - self._last_announce >= ANNOUNCE_SECONDS)
+        if has_streams == self._announced and not due:
+            return
+        self._notify(cursor, {'o': self.broker.stream_id, 's': has_streams})
+        self._announced = has_streams
+        self._last_announce = now
+        self._announce_requested = False
+
+    def deliver(self, payloads, overflowed=False):
+        """Republishes the events other workers sent"""
+        resync = overflowed
+        events = []
+        for payload in payloads:
+            message = json.loads(payload)
+            if message['o'] == self.broker.stream_id:
+                continue
+            if 'q' in message:
+                self._announce_requested = True
+                continue
+            if 's' in message:
+                if message['s']:
+                    self._remote_streams[message['o']] = time.monotonic() + ANNOUNCE_SECONDS * ANNOUNCE_MISSES
+                else:
+                    self._remote_streams.pop(message['o'], None)
+                continue
+            self.received += 1
+            if message.get('v'):
+                self.broker.note_versions(message['v'], relayed=True)
+            resync = resync or message.get('r', False)
+            events.extend(message['e'])
+        if events:
+            self.broker.publish_all(events, relay=False)
+        if resync:
+            self.broker.resync_all(relay=False)
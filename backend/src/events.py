@@ -0,0 +1,381 @@
+"""
+In-process fan-out of change events to Server-Sent Events subscribers
+(GET /api/events), so dashboards stop re-fetching lists to find changes.
+
+Write handlers publish after their commit. Every event carries the ids and
+departments it concerns. Each subscriber only receives what its role can see:
+admins get everything, managers get their department, workers get themselves.
+
+Bounded by design:
+- at most SSE_MAX_SUBSCRIBERS streams per process (then 503);
+- each subscriber has a queue of SSE_QUEUE_SIZE events. Publishing never
+  blocks a write. When a slow client's queue is full it is emptied and the
+  client gets a single `resync` event (re-fetch the lists) instead;
+- idle streams sleep until an event or the heartbeat (SSE_HEARTBEAT_SECONDS);
+- streams end after SSE_MAX_STREAM_SECONDS. EventSource reconnects with
+  Last-Event-ID, and missed events are replayed from a short in-memory
+  history, or answered with `resync` if it no longer has them.
+
+With several gunicorn workers on PostgreSQL, workers relay their events to
+each other with LISTEN/NOTIFY (src/event_relay.py), as long as one of them
+has subscribers. A watcher also polls
+change_versions (one query per worker, only while it has subscribers) and
+sends `resync` when a change was made that no event covered, e.g. by a CLI
+command or by another worker when there is no relay. Those resyncs are sent
+at most once every SSE_RESYNC_MIN_SECONDS.
+"""
+import os
+import json
+import time
+import uuid
+import threading
+from collections import deque
+
+SSE_MAX_SUBSCRIBERS = int(os.getenv('SSE_MAX_SUBSCRIBERS', '500'))
+SSE_QUEUE_SIZE = int(os.getenv('SSE_QUEUE_SIZE', '100'))
+SSE_HEARTBEAT_SECONDS = float(os.getenv('SSE_HEARTBEAT_SECONDS', '20'))
+SSE_MAX_STREAM_SECONDS = float(os.getenv('SSE_MAX_STREAM_SECONDS', '3600'))
+SSE_VERSION_POLL_SECONDS = float(os.getenv('SSE_VERSION_POLL_SECONDS', '5'))
+SSE_RESYNC_MIN_SECONDS = float(os.getenv('SSE_RESYNC_MIN_SECONDS', '30'))
+SSE_REPLAY_SIZE = 1000
+
+# Keep recording history this long after the last subscriber left, so a
+# reconnecting dashboard can still be replayed what it missed
+REPLAY_GRACE_SECONDS = 60
+
+RECONNECT_MILLIS = 3000
+
+WATCHED_TABLES = ('users', 'time_entries')
+
+
+class BrokerFull(Exception):
+    pass
+
+
+class Event:
+    __slots__ = ('id', 'user_ids', 'departments', 'frame')
+
+    def __init__(self, event_id, event_type, data, user_ids, departments):
+        self.id = event_id
+        self.user_ids = frozenset(user_ids)
+        self.departments = frozenset(departments)
+        # Formatted once, shared by every subscriber
+        self.frame = f"id: {event_id}\nevent: {event_type}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def resync_frame(reason):
+    return f"event: resync\ndata: {json.dumps({'reason': reason})}\n\n"
+
+
+class Subscription:
+    def __init__(self, role, department, user_id, queue_size):
+        self.role = role
+        self.department = department
+        self.user_id = user_id
+        self._queue = deque()
+        self._queue_size = queue_size
+        self._overflowed = False
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+
+    def wants(self, event):
+        if self.role == 'admin':
+            return True
+        if self.role == 'manager':
+            return self.department in event.departments
+        return self.user_id in event.user_ids
+
+    def offer(self, event):
+        """Queues the event; a full queue is dropped and replaced by a resync"""
+        with self._lock:
+            if len(self._queue) >= self._queue_size:
+                self._queue.clear()
+                self._overflowed = True
+                overflowed = True
+            else:
+                self._queue.append(event)
+                overflowed = False
+            self._wakeup.set()
+        return overflowed
+
+    def resync(self):
+        with self._lock:
+            self._queue.clear()
+            self._overflowed = True
+            self._wakeup.set()
+
+    def wait(self, timeout):
+        """Blocks until something is queued or `timeout` passes; returns (frames, overflowed)"""
+        self._wakeup.wait(timeout)
+        with self._lock:
+            frames = [event.frame for event in self._queue]
+            overflowed = self._overflowed
+            self._queue.clear()
+            self._overflowed = False
+            self._wakeup.clear()
+        return frames, overflowed
+
+
+class EventBroker:
+    def __init__(self, max_subscribers=SSE_MAX_SUBSCRIBERS, queue_size=SSE_QUEUE_SIZE,
+                 replay_size=SSE_REPLAY_SIZE):
+        self.max_subscribers = max_subscribers
+        self.queue_size = queue_size
+        # Event ids are '<stream id>-<sequence>': ids from another process
+        # (or before a restart) are recognised as unknown
+        self.stream_id = uuid.uuid4().hex[:8]
+        self._sequence = 0
+        self._history = deque(maxlen=replay_size)
+        self._subscribers = set()
+        self._last_unsubscribe = None
+        self._lock = threading.Lock()
+        # Change versions whose changes reached the subscribers (see VersionWatcher)
+        self._delivered_versions = {table: set() for table in WATCHED_TABLES}
+        # Versions this process committed and has not told the relay about yet
+        self._unrelayed_versions = {table: [] for table in WATCHED_TABLES}
+        self._watcher = None
+        # EventRelay forwarding events to the other workers, if any
+        self.relay = None
+        self.published = 0
+        self.overflows = 0
+        self.rejected = 0
+
+    def active(self):
+        """False while no worker has streams: write handlers then skip building events"""
+        if self._subscribers or self._relaying():
+            return True
+        last = self._last_unsubscribe
+        return last is not None and time.monotonic() - last < REPLAY_GRACE_SECONDS
+
+    def _relaying(self):
+        return self.relay is not None and self.relay.others_listening()
+
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+    def subscribe(self, role, department, user_id, last_event_id=None):
+        """Returns (subscription, frames to replay, or None if a resync is needed)"""
+        subscription = Subscription(role, department, user_id, self.queue_size)
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                self.rejected += 1
+                raise BrokerFull(f'{len(self._subscribers)} event streams open')
+            self._subscribers.add(subscription)
+            replay = self._replay(subscription, last_event_id) if last_event_id else []
+        return subscription, replay
+
+    def _replay(self, subscription, last_event_id):
+        stream_id, _, sequence = last_event_id.partition('-')
+        if stream_id != self.stream_id or not sequence.isdigit():
+            return None
+        sequence = int(sequence)
+        if sequence >= self._sequence:
+            return []
+        # The history must still reach back to the event after the client's last one
+        if not self._history or int(self._history[0].id.rsplit('-', 1)[1]) > sequence + 1:
+            return None
+        return [e.frame for e in self._history
+                if int(e.id.rsplit('-', 1)[1]) > sequence and subscription.wants(e)]
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+            self._last_unsubscribe = time.monotonic()
+
+    def publish(self, event_type, data, user_ids=(), departments=()):
+        self.publish_all([(event_type, data, user_ids, departments)])
+
+    def publish_all(self, events, relay=True):
+        """
+        Publishes [(type, data, user_ids, departments)] to this process's
+        subscribers, then to the other workers unless `relay` is False.
+        """
+        with self._lock:
+            for event_type, data, user_ids, departments in events:
+                self._sequence += 1
+                event = Event(f'{self.stream_id}-{self._sequence}', event_type, data, user_ids, departments)
+                self._history.append(event)
+                self.published += 1
+                for subscription in self._subscribers:
+                    if subscription.wants(event) and subscription.offer(event):
+                        self.overflows += 1
+        if relay and self._relaying():
+            self.relay.send(events, self._take_unrelayed_versions())
+
+    def resync_all(self, relay=True):
+        with self._lock:
+            for subscription in self._subscribers:
+                subscription.resync()
+        if relay and self._relaying():
+            self.relay.send([], self._take_unrelayed_versions(), resync=True)
+
+    def track_commits(self, session):
+        """
+        Notes the change versions every transaction of `session` commits.
+        bump_versions() keeps them in session.info until the commit.
+        """
+        from sqlalchemy import event
+        from src.change_versions import BUMPED_VERSIONS
+
+        @event.listens_for(session, 'after_commit')
+        def after_commit(committed):
+            bumped = committed.info.pop(BUMPED_VERSIONS, None)
+            if bumped:
+                versions = {}
+                for table, version in bumped:
+                    versions.setdefault(table, []).append(version)
+                self.note_versions(versions)
+
+        @event.listens_for(session, 'after_rollback')
+        def after_rollback(rolled_back):
+            rolled_back.info.pop(BUMPED_VERSIONS, None)
+
+    def note_versions(self, versions, relayed=False):
+        """
+        Records {table: [versions]} whose changes were published: committed
+        by this process, or received from another worker (`relayed`).
+        """
+        with self._lock:
+            for table, numbers in versions.items():
+                if table not in self._delivered_versions:
+                    continue
+                if self._watcher is not None:
+                    self._delivered_versions[table].update(numbers)
+                if not relayed and self._relaying():
+                    self._unrelayed_versions[table].extend(numbers)
+
+    def _take_unrelayed_versions(self):
+        with self._lock:
+            versions = {table: numbers for table, numbers in self._unrelayed_versions.items() if numbers}
+            self._unrelayed_versions = {table: [] for table in WATCHED_TABLES}
+        return versions
+
+    def undelivered_changes(self, previous, current):
+        """
+        True if a version in (previous, current] of some table was not noted
+        by note_versions. Forgets the versions up to `current`.
+        """
+        with self._lock:
+            undelivered = False
+            for table in WATCHED_TABLES:
+                delivered = self._delivered_versions[table]
+                in_range = sum(1 for version in delivered if previous[table] < version <= current[table])
+                if in_range < current[table] - previous[table]:
+                    undelivered = True
+                self._delivered_versions[table] = {version for version in delivered if version > current[table]}
+        return undelivered
+
+    def forget_versions(self):
+        with self._lock:
+            for versions in self._delivered_versions.values():
+                versions.clear()
+
+    def stream(self, subscription, replay, heartbeat=SSE_HEARTBEAT_SECONDS,
+               max_seconds=SSE_MAX_STREAM_SECONDS):
+        """Generator of SSE frames for one subscriber; unsubscribes when the client goes away"""
+        try:
+            yield f"retry: {RECONNECT_MILLIS}\n\n"
+            if replay is None:
+                yield resync_frame('history unavailable')
+            elif replay:
+                yield ''.join(replay)
+            deadline = time.monotonic() + max_seconds
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                frames, overflowed = subscription.wait(min(heartbeat, remaining))
+                if overflowed:
+                    yield resync_frame('too many events')
+                if frames:
+                    yield ''.join(frames)
+                elif not overflowed:
+                    # Comment line: keeps proxies from closing an idle connection
+                    yield ': ping\n\n'
+        finally:
+            self.unsubscribe(subscription)
+
+    def start_watchers(self, app, db, interval=SSE_VERSION_POLL_SECONDS):
+        """
+        Starts the per-process version watcher and relay listener on first
+        use (after gunicorn forked the worker)
+        """
+        if interval <= 0 or self._watcher is not None:
+            return
+        with self._lock:
+            if self._watcher is not None:
+                return
+            self._watcher = VersionWatcher(self, app, db, interval)
+        self._watcher.start()
+        if self.relay is not None:
+            self.relay.start_listening(app)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'subscribers': len(self._subscribers),
+                'max_subscribers': self.max_subscribers,
+                'queue_size': self.queue_size,
+                'published': self.published,
+                'overflows': self.overflows,
+                'rejected': self.rejected,
+                'relayed_out': self.relay.sent if self.relay else 0,
+                'relayed_in': self.relay.received if self.relay else 0,
+                'remote_workers_with_streams': self.relay.remote_streams() if self.relay else 0
+            }
+
+
+class VersionWatcher(threading.Thread):
+    """
+    Sends resync to this process's subscribers when change_versions moved
+    without an event for the change: a CLI command, manual SQL, or another
+    worker when there is no relay.
+
+    Writes are committed before their versions are noted, so a version read
+    now may not be noted yet. Each poll therefore checks the versions read
+    by the previous poll, whose notes have had a whole interval to arrive.
+    Resyncs are sent at most once every `resync_min_seconds`, so a stream
+    of such changes cannot make every dashboard re-fetch on every poll.
+    """
+    def __init__(self, broker, app, db, interval, resync_min_seconds=SSE_RESYNC_MIN_SECONDS):
+        super().__init__(name='sse-version-watcher', daemon=True)
+        self.broker = broker
+        self.app = app
+        self.db = db
+        self.interval = interval
+        self.resync_min_seconds = resync_min_seconds
+        self._checked = None
+        self._read = None
+        self._resync_due = False
+        self._last_resync = None
+
+    def run(self):
+        from src.change_versions import get_versions
+        while True:
+            time.sleep(self.interval)
+            if not self.broker._subscribers:
+                self._checked = self._read = None
+                self._resync_due = False
+                self.broker.forget_versions()
+                continue
+            try:
+                with self.app.app_context():
+                    versions = dict(zip(WATCHED_TABLES, get_versions(self.db, WATCHED_TABLES)))
+                    self.db.session.remove()
+            except Exception as e:
+                print(f"⚠️ Event stream version check failed: {e}")
+                continue
+            self.check(versions)
+
+    def check(self, versions, now=None):
+        """One poll: `versions` are the change_versions just read"""
+        now = time.monotonic() if now is None else now
+        if self._checked is not None and self.broker.undelivered_changes(self._checked, self._read):
+            self._resync_due = True
+        if self._read is not None:
+            self._checked = self._read
+        self._read = versions
+        if self._resync_due and (self._last_resync is None or now - self._last_resync >= self.resync_min_seconds):
+            self.broker.resync_all(relay=False)
+            self._resync_due = False
+            self._last_resync = now
@@ -0,0 +1,64 @@
+import csv
+import json
+from src.serializers import time_entry_row_to_dict
+
+# Rows fetched per round trip from the server-side cursor
+EXPORT_BATCH_SIZE = 1000
+
+EXPORT_FIELDS = ['id', 'user_id', 'date', 'check_in', 'check_out', 'total_hours', 'notes', 'created_at']
+
+# First field of the line that ends a failed export
+EXPORT_ERROR_MARKER = '#EXPORT_ERROR'
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson'
+}
+
+
+class _LineBuffer:
+    """Minimal file-like object so csv.writer hands back each line instead of buffering it"""
+    def write(self, value):
+        return value
+
+
+def generate_csv(rows):
+    """Yields the CSV header and then one line per row"""
+    writer = csv.writer(_LineBuffer())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        data = time_entry_row_to_dict(row)
+        yield writer.writerow(['' if data[f] is None else data[f] for f in EXPORT_FIELDS])
+
+
+def generate_ndjson(rows):
+    """Yields one JSON document per line"""
+    for row in rows:
+        yield json.dumps(time_entry_row_to_dict(row), ensure_ascii=False) + '\n'
+
+
+def export_error_marker(export_format, error):
+    """
+    Last line of an export that failed after streaming started (the 200
+    status is already sent), so the client can tell the file is incomplete
+    """
+    message = f'export incomplete: {error}'
+    if export_format == 'csv':
+        return csv.writer(_LineBuffer()).writerow([EXPORT_ERROR_MARKER, message])
+    return json.dumps({'error': EXPORT_ERROR_MARKER, 'message': message}, ensure_ascii=False) + '\n'
+
+
+def generate_export(export_format, rows, on_error=None):
+    """
+    Yields the export. The rows are fetched while iterating, so database
+    errors surface here: they are logged and the stream ends with
+    export_error_marker(). `on_error(exception)` runs first (e.g. a rollback).
+    """
+    lines = generate_csv(rows) if export_format == 'csv' else generate_ndjson(rows)
+    try:
+        yield from lines
+    except Exception as e:
+        print(f"❌ Export failed while streaming: {e}")
+        if on_error:
+            on_error(e)
+        yield export_error_marker(export_format, e)
@@ -1,52 +1,140 @@
-def init_database(app, db):
+import threading
+from datetime import datetime
+from sqlalchemy import text
+from src.migrations import MIGRATIONS
+from src.change_versions import bump_versions
+
+# Arbitrary key so concurrent deploys on PostgreSQL migrate one at a time
+MIGRATION_LOCK_ID = 7_210_425
+
+
+def _ensure_migrations_table(conn):
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            description VARCHAR(255) NOT NULL,
+            applied_at TIMESTAMP NOT NULL
+        )
+    """))
+
+
+def get_applied_versions(db):
+    """Returns the set of migration versions already recorded"""
+    with db.engine.begin() as conn:
+        _ensure_migrations_table(conn)
+        return {row[0] for row in conn.execute(text("SELECT version FROM schema_migrations"))}
+
+
+def get_pending_migrations(db):
+    applied = get_applied_versions(db)
+    return [m for m in MIGRATIONS if m[0] not in applied]
+
+
+def run_migrations(db):
+    """
+    Applies every pending migration in version order, each one in its own
+    transaction together with its schema_migrations row.
+    Returns the list of versions applied.
+    """
+    applied_now = []
+    with db.engine.connect() as conn:
+        is_postgres = conn.dialect.name == 'postgresql'
+        if is_postgres:
+            conn.execute(text("SELECT pg_advisory_lock(:id)"), {'id': MIGRATION_LOCK_ID})
+            conn.commit()
+        try:
+            with conn.begin():
+                _ensure_migrations_table(conn)
+                applied = {row[0] for row in conn.execute(text("SELECT version FROM schema_migrations"))}
+
+            for version, description, migrate in MIGRATIONS:
+                if version in applied:
+                    continue
+                print(f"🔄 Applying migration {version}: {description}")
+                with conn.begin():
+                    migrate(conn, db)
+                    conn.execute(
+                        text("INSERT INTO schema_migrations (version, description, applied_at) "
+                             "VALUES (:version, :description, :applied_at)"),
+                        {'version': version, 'description': description, 'applied_at': datetime.now()}
+                    )
+                applied_now.append(version)
+        finally:
+            if is_postgres:
+                conn.execute(text("SELECT pg_advisory_unlock(:id)"), {'id': MIGRATION_LOCK_ID})
+                conn.commit()
+    return applied_now
+
+
+def init_database(app, db, User=None):
+    """
+    Brings the schema up to date. Meant to run once per deploy
+    (`flask --app app migrate`), not on every worker import. With `User`,
+    an empty users table also gets the mock users (local SQLite mode).
+    Returns False if a migration failed.
+    """
     if not db:
         print("⚠️ No database, using mock data")
-        return
+        return True
     
     try:
         with app.app_context():
             print("🔄 Checking database structure...")
-            try:
-                # Check if 'users_password' column exists
-                result = db.session.execute(db.text("""
-                    SELECT column_name 
-                    FROM information_schema.columns 
-                    WHERE table_name = 'users' 
-                    AND column_name = 'users_password'
-                """))
-                has_users_password = result.fetchone() is not None
-                
-                if not has_users_password:
-                    print("⚠️  Column 'users_password' does not exist, checking alternatives...")
-                    
-                    # Check if old 'password' column exists
-                    result = db.session.execute(db.text("""
-                        SELECT column_name 
-                        FROM information_schema.columns 
-                        WHERE table_name = 'users' 
-                        AND column_name = 'password'
-                    """))
-                    has_password = result.fetchone() is not None
-                    
-                    if has_password:
-                        print("✅ Renaming 'password' to 'users_password'...")
-                        db.session.execute(db.text("ALTER TABLE users RENAME COLUMN password TO users_password"))
-                        db.session.commit()
-                        print("✅ Migration completed!")
-                    else:
-                        print("⚠️  Creating column 'users_password'...")
-                        db.session.execute(db.text("ALTER TABLE users ADD COLUMN users_password VARCHAR(255)"))
-                        db.session.commit()
-                        print("✅ Column created!")
-                else:
-                    print("✅ Column 'users_password' exists correctly")
-                    
-            except Exception as e:
-                print(f"⚠️ Error in automatic migration: {e}")
-                
-            # Get database type from app config or global variable
-            database_type = getattr(app, 'DATABASE_TYPE', 'PostgreSQL')
-            print(f"✅ Using existing {database_type} tables")
+            applied = run_migrations(db)
+            if applied:
+                print(f"✅ Applied migrations: {', '.join(str(v) for v in applied)}")
+            else:
+                print("✅ Database schema is up to date")
+            if User is not None:
+                seed_mock_users(db, User)
+        return True
                 
     except Exception as e:
-        print(f"⚠️ Database init info: {e}")
\ No newline at end of file
+        print(f"❌ Database migration failed: {e}")
+        return False
+
+
+def init_database_on_first_request(app, db, User):
+    """
+    Sets up a local SQLite database (schema and mock users) before the first
+    request of the process instead of at import. An in-memory database only
+    exists in this process, so no deploy step can do it.
+    """
+    lock = threading.Lock()
+    done = []
+
+    @app.before_request
+    def ensure_database():
+        if done:
+            return
+        with lock:
+            if not done:
+                init_database(app, db, User)
+                done.append(True)
+
+
+def seed_mock_users(db, User):
+    """
+    Inserts the mock users (same ids and credentials as mock mode) into an
+    empty users table. Used by the local SQLite mode. Returns how many were added.
+    """
+    from data.mock_data import get_mock_users
+
+    if db.session.query(User.id).first() is not None:
+        return 0
+    users = get_mock_users()
+    for user in users:
+        db.session.add(User(
+            id=user['id'],
+            name=user['name'],
+            email=user['email'],
+            users_password=user['password'],
+            role=user['role'],
+            department=user['department'],
+            status=user['status'],
+            created_at=datetime.fromisoformat(user['created_at'])
+        ))
+    bump_versions(db, 'users')
+    db.session.commit()
+    print(f"👥 Seeded {len(users)} mock users")
+    return len(users)
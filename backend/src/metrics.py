@@ -0,0 +1,234 @@
+"""
+Request instrumentation exposed in Prometheus text format on /metrics.
+
+Every request records its latency, response size, SQL statement count and
+SQL time, labelled by Flask endpoint (the view function name, so the label
+set stays bounded). SQL statements are timed with SQLAlchemy engine events.
+Pool and password hashing gauges are read when /metrics is scraped.
+
+For streamed responses (the CSV/NDJSON export) only the work done before
+the body starts streaming is measured.
+
+Values are per process: with several gunicorn workers each scrape sees the
+worker that served it.
+"""
+import time
+import threading
+from flask import g, request, has_request_context
+from sqlalchemy import event
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 10_240, 102_400, 1_048_576, 10_485_760)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _format_labels(names, values):
+    if not names:
+        return ''
+    pairs = []
+    for name, value in zip(names, values):
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{name}="{value}"')
+    return '{' + ','.join(pairs) + '}'
+
+
+def _format_value(value):
+    if isinstance(value, float):
+        return repr(value) if value != int(value) else str(int(value))
+    return str(value)
+
+
+class Counter:
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, label_values=(), amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for label_values, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_format_labels(self.labels, label_values)} {_format_value(value)}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, buckets, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = buckets
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, label_values=()):
+        with self._lock:
+            series = self._values.get(label_values)
+            if series is None:
+                series = self._values[label_values] = [[0] * len(self.buckets), 0.0, 0]
+            counts = series[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for label_values, (counts, total, count) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    labels = _format_labels(self.labels + ('le',), label_values + (_format_value(bound),))
+                    lines.append(f'{self.name}_bucket{labels} {cumulative}')
+                labels = _format_labels(self.labels + ('le',), label_values + ('+Inf',))
+                lines.append(f'{self.name}_bucket{labels} {count}')
+                labels = _format_labels(self.labels, label_values)
+                lines.append(f'{self.name}_sum{labels} {_format_value(total)}')
+                lines.append(f'{self.name}_count{labels} {count}')
+        return lines
+
+
+def gauge(name, documentation, value, labels=(), label_values=()):
+    return [
+        f'# HELP {name} {documentation}',
+        f'# TYPE {name} gauge',
+        f'{name}{_format_labels(labels, label_values)} {_format_value(value)}'
+    ]
+
+
+def counter_value(name, documentation, value):
+    """A counter whose total is kept elsewhere (pool and hashing statistics)"""
+    return [f'# HELP {name} {documentation}', f'# TYPE {name} counter', f'{name} {_format_value(value)}']
+
+
+class RequestMetrics:
+    """Flask hooks plus SQLAlchemy events feeding the request histograms"""
+    def __init__(self):
+        self.requests = Counter(
+            'http_requests_total', 'HTTP requests by endpoint, method and status',
+            ('endpoint', 'method', 'status'))
+        self.latency = Histogram(
+            'http_request_duration_seconds', 'Time spent handling the request',
+            LATENCY_BUCKETS, ('endpoint', 'method'))
+        self.response_size = Histogram(
+            'http_response_size_bytes', 'Response body size (streamed responses are not counted)',
+            SIZE_BUCKETS, ('endpoint',))
+        self.request_queries = Histogram(
+            'http_request_db_statements', 'SQL statements executed per request',
+            QUERY_COUNT_BUCKETS, ('endpoint',))
+        self.request_db_time = Histogram(
+            'http_request_db_duration_seconds', 'Time spent in SQL statements per request',
+            LATENCY_BUCKETS, ('endpoint',))
+        self.statements = Counter('db_statements_total', 'SQL statements executed (all sources)')
+        self.statement_time = Counter('db_statement_duration_seconds_total', 'Time spent in SQL statements')
+
+    def init_app(self, app, db=None):
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        if db:
+            with app.app_context():
+                event.listen(db.engine, 'before_cursor_execute', self._before_cursor_execute)
+                event.listen(db.engine, 'after_cursor_execute', self._after_cursor_execute)
+                event.listen(db.engine, 'handle_error', self._handle_error)
+
+    def _before_request(self):
+        g.metrics_started_at = time.perf_counter()
+        g.metrics_db_statements = 0
+        g.metrics_db_seconds = 0.0
+
+    def _after_request(self, response):
+        started_at = g.get('metrics_started_at')
+        if started_at is None:
+            return response
+        endpoint = request.endpoint or 'unmatched'
+        self.requests.inc((endpoint, request.method, str(response.status_code)))
+        self.latency.observe(time.perf_counter() - started_at, (endpoint, request.method))
+        if not response.is_streamed:
+            self.response_size.observe(response.calculate_content_length() or 0, (endpoint,))
+        self.request_queries.observe(g.metrics_db_statements, (endpoint,))
+        self.request_db_time.observe(g.metrics_db_seconds, (endpoint,))
+        return response
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('metrics_started_at', []).append((context, time.perf_counter()))
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['metrics_started_at'].pop()[1]
+        self.statements.inc()
+        self.statement_time.inc(amount=elapsed)
+        if has_request_context() and 'metrics_db_statements' in g:
+            g.metrics_db_statements += 1
+            g.metrics_db_seconds += elapsed
+
+    def _handle_error(self, exception_context):
+        # A failed statement never reaches after_cursor_execute: drop its start
+        # time, or it stays on the pooled connection and skews the next pops
+        conn = exception_context.connection
+        started = conn.info.get('metrics_started_at') if conn is not None else None
+        if started and started[-1][0] is exception_context.execution_context:
+            started.pop()
+
+    def render(self):
+        lines = []
+        for metric in (self.requests, self.latency, self.response_size, self.request_queries,
+                       self.request_db_time, self.statements, self.statement_time):
+            lines.extend(metric.render())
+        return lines
+
+
+def pool_metrics(pool_stats, wait_buckets):
+    """Gauges and the checkout wait histogram from db_pool.get_pool_stats()"""
+    lines = []
+    for key, documentation in (('size', 'Configured pool size'),
+                               ('checked_out', 'Connections in use'),
+                               ('checked_in', 'Idle connections in the pool'),
+                               ('overflow', 'Connections opened beyond the pool size')):
+        if key in pool_stats:
+            # QueuePool.overflow() is negative until the pool has opened `size` connections
+            lines.extend(gauge(f'db_pool_{key}', documentation, max(0, pool_stats[key])))
+    lines.extend(counter_value('db_pool_checkout_timeouts_total', 'Checkouts that hit pool_timeout',
+                               pool_stats['timeouts']))
+    name = 'db_pool_checkout_wait_seconds'
+    lines.extend([f'# HELP {name} Time waited for a pooled connection', f'# TYPE {name} histogram'])
+    # PoolWaitStats buckets are already cumulative
+    for bound in wait_buckets:
+        lines.append(f'{name}_bucket{{le="{_format_value(bound)}"}} {pool_stats["wait_buckets"][bound]}')
+    lines.append(f'{name}_bucket{{le="+Inf"}} {pool_stats["checkouts"]}')
+    lines.append(f'{name}_sum {_format_value(pool_stats["wait_total_seconds"])}')
+    lines.append(f'{name}_count {pool_stats["checkouts"]}')
+    return lines
+
+
+def password_hashing_metrics(stats):
+    return (
+        gauge('password_hash_queue_depth', 'bcrypt jobs waiting for a worker', stats['queue_depth'])
+        + gauge('password_hash_active', 'bcrypt jobs running', stats['active'])
+        + counter_value('password_hash_completed_total', 'bcrypt jobs finished', stats['completed'])
+        + counter_value('password_hash_rejected_total', 'bcrypt jobs rejected (queue full or timeout)',
+                        stats['rejected'])
+    )
+
+
+def event_stream_metrics(stats):
+    return (
+        gauge('sse_subscribers', 'Open /api/events streams', stats['subscribers'])
+        + counter_value('sse_events_published_total', 'Change events published', stats['published'])
+        + counter_value('sse_queue_overflows_total', 'Subscriber queues dropped for a resync (slow clients)',
+                        stats['overflows'])
+        + counter_value('sse_rejected_total', 'Streams refused at SSE_MAX_SUBSCRIBERS', stats['rejected'])
+        + counter_value('sse_relay_notifications_sent_total', 'NOTIFY payloads sent to the other workers',
+                        stats['relayed_out'])
+        + counter_value('sse_relay_messages_received_total', 'NOTIFY payloads received from the other workers',
+                        stats['relayed_in'])
+    )
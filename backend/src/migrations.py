@@ -0,0 +1,216 @@
+"""
+Versioned schema migrations.
+
+Each migration is (version, description, function). Versions are applied
+in order, once, and recorded in the schema_migrations table by
+src/init_db.py. Never edit a migration that has been deployed: add a new one.
+"""
+from sqlalchemy import inspect, text
+from src.partitions import is_partitioned, partition_time_entries
+from src.daily_hours import rebuild_daily_hours
+from src.presence import rebuild_presence
+
+
+def create_base_tables(conn, db):
+    """Creates users and time_entries on an empty database (no-op otherwise)"""
+    db.metadata.create_all(bind=conn, checkfirst=True)
+
+
+def rename_password_column(conn, db):
+    """Older databases stored the hash in 'password' instead of 'users_password'"""
+    columns = [c['name'] for c in inspect(conn).get_columns('users')]
+    if 'users_password' in columns:
+        return
+    if 'password' in columns:
+        print("✅ Renaming 'password' to 'users_password'...")
+        conn.execute(text("ALTER TABLE users RENAME COLUMN password TO users_password"))
+    else:
+        print("⚠️  Creating column 'users_password'...")
+        conn.execute(text("ALTER TABLE users ADD COLUMN users_password VARCHAR(255)"))
+
+
+def index_time_entries_user_check_in(conn, db):
+    """Serves per-user listings ordered by newest check-in (and keyset pagination)"""
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_time_entries_user_id_check_in "
+        "ON time_entries (user_id, check_in DESC, id DESC)"
+    ))
+
+
+def index_open_time_entries(conn, db):
+    """Partial index: only open entries (check_out IS NULL) are indexed"""
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_time_entries_open "
+        "ON time_entries (user_id) WHERE check_out IS NULL"
+    ))
+
+
+def index_users_department(conn, db):
+    """Serves manager scoping by department"""
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_users_department ON users (department)"
+    ))
+
+
+def create_change_versions(conn, db):
+    """One counter per table, bumped by every write (used for ETags)"""
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS change_versions (
+            table_name VARCHAR(64) PRIMARY KEY,
+            version BIGINT NOT NULL DEFAULT 0
+        )
+    """))
+    for table in ('users', 'time_entries'):
+        exists = conn.execute(
+            text("SELECT 1 FROM change_versions WHERE table_name = :t"), {'t': table}
+        ).first()
+        if not exists:
+            conn.execute(text("INSERT INTO change_versions (table_name, version) VALUES (:t, 0)"), {'t': table})
+
+
+def create_archive_tables(conn, db):
+    """Cold storage for archived months and their per-user monthly totals"""
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS time_entries_archive (
+            id INTEGER PRIMARY KEY,
+            user_id INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+            date DATE NOT NULL,
+            check_in TIMESTAMP,
+            check_out TIMESTAMP,
+            total_hours DOUBLE PRECISION,
+            notes TEXT,
+            created_at TIMESTAMP,
+            archived_at TIMESTAMP NOT NULL
+        )
+    """))
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_time_entries_archive_user_id_date "
+        "ON time_entries_archive (user_id, date)"
+    ))
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS time_entry_monthly_summaries (
+            user_id INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+            month DATE NOT NULL,
+            entries INTEGER NOT NULL,
+            total_hours DOUBLE PRECISION NOT NULL,
+            first_check_in TIMESTAMP,
+            last_check_out TIMESTAMP,
+            archived_at TIMESTAMP NOT NULL,
+            PRIMARY KEY (user_id, month)
+        )
+    """))
+
+
+def partition_time_entries_by_month(conn, db):
+    """PostgreSQL only: rebuild time_entries as a table partitioned by month (see src/partitions.py)"""
+    if conn.dialect.name != 'postgresql' or is_partitioned(conn):
+        return
+    print("🔄 Partitioning time_entries by month (the table is locked while rows are copied)...")
+    partition_time_entries(conn)
+
+
+def create_daily_hours(conn, db):
+    """Hours worked per user and day, kept up to date by every time entry write"""
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS daily_hours (
+            user_id INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+            date DATE NOT NULL,
+            entries INTEGER NOT NULL,
+            open_entries INTEGER NOT NULL,
+            total_hours DOUBLE PRECISION NOT NULL,
+            updated_at TIMESTAMP,
+            PRIMARY KEY (user_id, date)
+        )
+    """))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_daily_hours_date ON daily_hours (date)"))
+    days = rebuild_daily_hours(conn, db.metadata.tables['time_entries'])
+    print(f"✅ daily_hours filled with {days:,} days")
+
+
+def create_presence(conn, db):
+    """Open entry of every clocked-in user; the primary key allows one per user"""
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS presence (
+            user_id INTEGER PRIMARY KEY REFERENCES users (id) ON DELETE CASCADE,
+            entry_id INTEGER NOT NULL,
+            date DATE NOT NULL,
+            check_in TIMESTAMP
+        )
+    """))
+    conn.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS ix_presence_entry_id ON presence (entry_id)"))
+    users = rebuild_presence(conn, db.metadata.tables['time_entries'])
+    print(f"✅ presence filled with {users:,} clocked-in users")
+
+
+def add_time_entry_sync_columns(conn, db):
+    """updated_at/change_version on time_entries and tombstones of deleted entries (see src/delta_sync.py)"""
+    columns = [c['name'] for c in inspect(conn).get_columns('time_entries')]
+    # Constant defaults: no table rewrite on PostgreSQL, existing rows get version 0
+    if 'updated_at' not in columns:
+        conn.execute(text("ALTER TABLE time_entries ADD COLUMN updated_at TIMESTAMP"))
+    if 'change_version' not in columns:
+        conn.execute(text("ALTER TABLE time_entries ADD COLUMN change_version BIGINT NOT NULL DEFAULT 0"))
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_time_entries_change_version ON time_entries (change_version)"
+    ))
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS time_entry_tombstones (
+            entry_id INTEGER PRIMARY KEY,
+            user_id INTEGER NOT NULL,
+            department VARCHAR(50),
+            date DATE NOT NULL,
+            change_version BIGINT NOT NULL,
+            deleted_at TIMESTAMP NOT NULL
+        )
+    """))
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_time_entry_tombstones_change_version "
+        "ON time_entry_tombstones (change_version)"
+    ))
+
+
+def index_time_entries_listing_order(conn, db):
+    """
+    Serves the listing order (date DESC, check_in DESC, id DESC) for every
+    scope and for one user. Replaces the (user_id, check_in) index.
+    """
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_time_entries_date_check_in "
+        "ON time_entries (date DESC, check_in DESC, id DESC)"
+    ))
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_time_entries_user_id_date "
+        "ON time_entries (user_id, date DESC, check_in DESC, id DESC)"
+    ))
+    conn.execute(text("DROP INDEX IF EXISTS ix_time_entries_user_id_check_in"))
+
+
+def create_stream_tickets(conn, db):
+    """One-use tickets that open the event stream (see src/stream_tickets.py)"""
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS stream_tickets (
+            ticket_hash VARCHAR(64) PRIMARY KEY,
+            user_id INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+            role VARCHAR(20) NOT NULL,
+            department VARCHAR(50),
+            expires_at TIMESTAMP NOT NULL
+        )
+    """))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_stream_tickets_expires_at ON stream_tickets (expires_at)"))
+
+
+MIGRATIONS = [
+    (1, 'Create base tables', create_base_tables),
+    (2, 'Rename users.password to users_password', rename_password_column),
+    (3, 'Index time_entries (user_id, check_in DESC)', index_time_entries_user_check_in),
+    (4, 'Partial index on open time_entries', index_open_time_entries),
+    (5, 'Index users.department', index_users_department),
+    (6, 'Create change_versions table', create_change_versions),
+    (7, 'Create time entry archive tables', create_archive_tables),
+    (8, 'Partition time_entries by month', partition_time_entries_by_month),
+    (9, 'Create daily_hours rollup', create_daily_hours),
+    (10, 'Create presence table', create_presence),
+    (11, 'Add time entry sync columns and tombstones', add_time_entry_sync_columns),
+    (12, 'Index time_entries in listing order (date, check_in)', index_time_entries_listing_order),
+    (13, 'Create stream_tickets table', create_stream_tickets),
+]
@@ -31,6 +31,8 @@ def init_models(db):
 
     class TimeEntryModel(db.Model):
         __tablename__ = 'time_entries'
+        # Deleted ids are never handed out again, so a tombstone names one entry
+        __table_args__ = {'sqlite_autoincrement': True}
         
         id = db.Column(db.Integer, primary_key=True)
         user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -40,6 +42,11 @@ def init_models(db):
         total_hours = db.Column(db.Float, nullable=True)
         notes = db.Column(db.Text, nullable=True)
         created_at = db.Column(db.DateTime, default=datetime.now)
+        # Written by every change (see src/delta_sync.py)
+        updated_at = db.Column(db.DateTime, nullable=True)
+        change_version = db.Column(db.BigInteger, nullable=False, default=0, server_default='0')
+        
+        user = db.relationship(UserModel, lazy='select')
         
         def to_dict(self):
             return {
@@ -50,9 +57,28 @@ def init_models(db):
                 'check_out': datetime_to_string(self.check_out),
                 'total_hours': self.total_hours,
                 'notes': self.notes,
-                'created_at': self.created_at.isoformat()
+                'created_at': self.created_at.isoformat(),
+                'updated_at': (self.updated_at or self.created_at).isoformat()
             }
     
+    # Secondary indexes (also created on existing databases by src/migrations.py)
+    db.Index('ix_users_department', UserModel.department)
+    db.Index(
+        'ix_time_entries_date_check_in',
+        TimeEntryModel.date.desc(), TimeEntryModel.check_in.desc(), TimeEntryModel.id.desc()
+    )
+    db.Index(
+        'ix_time_entries_user_id_date',
+        TimeEntryModel.user_id, TimeEntryModel.date.desc(), TimeEntryModel.check_in.desc(), TimeEntryModel.id.desc()
+    )
+    db.Index(
+        'ix_time_entries_open',
+        TimeEntryModel.user_id,
+        postgresql_where=TimeEntryModel.check_out.is_(None),
+        sqlite_where=TimeEntryModel.check_out.is_(None)
+    )
+    db.Index('ix_time_entries_change_version', TimeEntryModel.change_version)
+    
     User = UserModel
     TimeEntry = TimeEntryModel
     return User, TimeEntry
\ No newline at end of file
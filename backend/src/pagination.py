@@ -0,0 +1,153 @@
+import base64
+import json
+from datetime import date, datetime
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+TRUE_VALUES = ('1', 'true', 'yes', 'on')
+
+
+def parse_bool_arg(value):
+    """Interprets a query string flag such as ?open_only=true"""
+    if value is None:
+        return False
+    return value.strip().lower() in TRUE_VALUES
+
+
+def parse_date_arg(value):
+    """
+    Parses a 'YYYY-MM-DD' query string value.
+    Raises ValueError on malformed input so the route can answer 400.
+    """
+    if not value:
+        return None
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+def parse_page_size(value):
+    """Clamps the requested page size to [1, MAX_PAGE_SIZE]"""
+    if value is None or value == '':
+        return DEFAULT_PAGE_SIZE
+    try:
+        size = int(value)
+    except (TypeError, ValueError):
+        size = 0
+    if size < 1:
+        raise ValueError('limit must be a positive integer')
+    return min(size, MAX_PAGE_SIZE)
+
+
+def encode_cursor(day, check_in, entry_id):
+    """
+    Encodes the (date, check_in, id) keyset position of the last row of a page.
+    Full isoformat is used (not datetime_to_string) so microseconds survive
+    the round trip and the keyset comparison stays exact.
+    """
+    payload = [day.isoformat(), check_in.isoformat() if check_in else None, entry_id]
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Decodes a cursor produced by encode_cursor.
+    Returns (date, check_in, id); raises ValueError if the cursor is invalid.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        day_str, check_in_str, entry_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        check_in = datetime.fromisoformat(check_in_str) if check_in_str else None
+        return date.fromisoformat(day_str), check_in, int(entry_id)
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+
+def time_entries_order(TimeEntry):
+    """
+    Stable ordering used by every time entry listing: newest day first, then
+    newest check-in, ties broken by id. The partition key (date) leads so a
+    page only needs the newest monthly partitions (see src/partitions.py).
+    NULLS FIRST matches PostgreSQL's default for DESC so the
+    (date DESC, check_in DESC, id DESC) indexes can serve the sort.
+    """
+    return (TimeEntry.date.desc(), TimeEntry.check_in.desc().nullsfirst(), TimeEntry.id.desc())
+
+
+def apply_keyset(query, TimeEntry, db, cursor):
+    """
+    Restricts the query to rows strictly after the cursor position. The
+    separate date <= cursor date lets PostgreSQL skip the newer partitions.
+    """
+    day, check_in, entry_id = cursor
+    if check_in is None:
+        # Still inside the NULL check_in block (sorted first within the day)
+        same_day = db.or_(
+            TimeEntry.check_in.isnot(None),
+            db.and_(TimeEntry.check_in.is_(None), TimeEntry.id < entry_id)
+        )
+    else:
+        same_day = db.or_(
+            TimeEntry.check_in < check_in,
+            db.and_(TimeEntry.check_in == check_in, TimeEntry.id < entry_id)
+        )
+    return query.filter(TimeEntry.date <= day, db.or_(TimeEntry.date < day, same_day))
+
+
+def fetch_in_windows(query, TimeEntry, limit, windows):
+    """
+    Up to `limit` rows of the ordered query, reading the date windows
+    (start, end) returned by src.partitions.listing_windows in turn.
+    """
+    rows = []
+    for start, end in windows:
+        window = query
+        if start is not None:
+            window = window.filter(TimeEntry.date >= start)
+        if end is not None:
+            window = window.filter(TimeEntry.date < end)
+        rows += window.limit(limit - len(rows)).all()
+        if len(rows) >= limit:
+            break
+    return rows
+
+
+def parse_time_entry_filters(args):
+    """
+    Reads the shared time entry filters from request.args.
+    Raises ValueError with a client-facing message on bad input.
+    """
+    filters = {
+        'date_from': None,
+        'date_to': None,
+        'user_id': None,
+        'department': args.get('department') or None,
+        'open_only': parse_bool_arg(args.get('open_only'))
+    }
+    try:
+        filters['date_from'] = parse_date_arg(args.get('date_from'))
+        filters['date_to'] = parse_date_arg(args.get('date_to'))
+    except ValueError:
+        raise ValueError('Dates must use the YYYY-MM-DD format')
+    if args.get('user_id'):
+        try:
+            filters['user_id'] = int(args.get('user_id'))
+        except ValueError:
+            raise ValueError('user_id must be an integer')
+    return filters
+
+
+def apply_time_entry_filters(query, TimeEntry, filters):
+    """
+    Applies the filters returned by parse_time_entry_filters.
+    'department' needs the users JOIN, so it is applied by the role scoping.
+    """
+    if filters['date_from']:
+        query = query.filter(TimeEntry.date >= filters['date_from'])
+    if filters['date_to']:
+        query = query.filter(TimeEntry.date <= filters['date_to'])
+    if filters['user_id'] is not None:
+        query = query.filter(TimeEntry.user_id == filters['user_id'])
+    if filters['open_only']:
+        query = query.filter(TimeEntry.check_out.is_(None))
+    return query
@@ -0,0 +1,253 @@
+"""
+Monthly range partitioning of time_entries by `date` (PostgreSQL) and the
+cold archive for old months (every database).
+
+On PostgreSQL time_entries is a partitioned table with one partition per
+month (time_entries_YYYY_MM) plus a DEFAULT partition for dates outside the
+created range. maintain-partitions creates the months ahead; rows that had
+landed in the DEFAULT partition for a new month are moved into it.
+
+Listing pages read the monthly ranges of listing_windows() one at a time,
+newest first, so each query touches a single partition.
+
+archive-time-entries moves every closed month (older than the kept window,
+no open entries) to time_entries_archive, adds its per-user totals to
+time_entry_monthly_summaries and removes it from time_entries (and its
+days from daily_hours): on PostgreSQL by dropping the partition, elsewhere
+with a DELETE.
+"""
+from datetime import date, datetime
+from sqlalchemy import inspect, text
+
+PARTITION_MONTHS_AHEAD = 3
+DEFAULT_PARTITION = 'time_entries_default'
+
+TIME_ENTRY_COLUMNS = 'id, user_id, date, check_in, check_out, total_hours, notes, created_at'
+
+
+def month_start(day):
+    return date(day.year, day.month, 1)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f'time_entries_{month.year:04d}_{month.month:02d}'
+
+
+def is_partitioned(conn):
+    """True if time_entries is a PostgreSQL partitioned table"""
+    if conn.dialect.name != 'postgresql':
+        return False
+    return conn.execute(text(
+        "SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass('time_entries')"
+    )).first() is not None
+
+
+def list_partitions(conn):
+    """Names of the partitions attached to time_entries"""
+    return {row[0] for row in conn.execute(text("""
+        SELECT child.relname
+        FROM pg_inherits
+        JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE parent.relname = 'time_entries'
+    """))}
+
+
+def listing_windows(conn, newest=None, oldest=None, today=None):
+    """
+    Date ranges [(start, end)], newest first, that together cover every
+    date from `oldest` to `newest` (inclusive, None = unbounded): the
+    current month onwards, then one range per older monthly partition and
+    finally everything older. A listing page queries them in turn until it
+    is full, so PostgreSQL prunes all partitions but one (plus DEFAULT for
+    the open-ended ranges). [(None, None)] when time_entries is not
+    partitioned: one query is best there.
+    """
+    if not is_partitioned(conn):
+        return [(None, None)]
+    current = month_start(today or date.today())
+    months = sorted(
+        {date(int(name[-7:-3]), int(name[-2:]), 1) for name in list_partitions(conn) if name != DEFAULT_PARTITION}
+        | {current}
+    )
+    bounds = [None] + [m for m in months if m <= current] + [None]
+    windows = []
+    for start, end in reversed(list(zip(bounds[:-1], bounds[1:]))):
+        if newest is not None and start is not None and start > newest:
+            continue
+        if oldest is not None and end is not None and end <= oldest:
+            break
+        windows.append((start, end))
+    return windows
+
+
+def create_month_partition(conn, month):
+    """
+    Creates the partition for `month`. Rows already stored in the DEFAULT
+    partition for that range are moved into it first, otherwise PostgreSQL
+    refuses to create the partition.
+    """
+    name = partition_name(month)
+    bounds = {'start': month, 'end': add_months(month, 1)}
+    in_default = conn.execute(text(
+        f"SELECT 1 FROM {DEFAULT_PARTITION} WHERE date >= :start AND date < :end LIMIT 1"
+    ), bounds).first()
+
+    if not in_default:
+        conn.execute(text(
+            f"CREATE TABLE {name} PARTITION OF time_entries "
+            f"FOR VALUES FROM ('{bounds['start']}') TO ('{bounds['end']}')"
+        ))
+        return
+
+    conn.execute(text(f"CREATE TABLE {name} (LIKE time_entries INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    # Same column order on both sides (LIKE time_entries): every column is kept
+    conn.execute(text(
+        f"INSERT INTO {name} SELECT * FROM {DEFAULT_PARTITION} "
+        f"WHERE date >= :start AND date < :end"
+    ), bounds)
+    conn.execute(text(f"DELETE FROM {DEFAULT_PARTITION} WHERE date >= :start AND date < :end"), bounds)
+    conn.execute(text(
+        f"ALTER TABLE time_entries ATTACH PARTITION {name} "
+        f"FOR VALUES FROM ('{bounds['start']}') TO ('{bounds['end']}')"
+    ))
+
+
+def ensure_partitions(conn, first_month, last_month):
+    """Creates the missing monthly partitions between both months (inclusive); returns their names"""
+    existing = list_partitions(conn)
+    created = []
+    month = first_month
+    while month <= last_month:
+        if partition_name(month) not in existing:
+            create_month_partition(conn, month)
+            created.append(partition_name(month))
+        month = add_months(month, 1)
+    return created
+
+
+def partition_time_entries(conn):
+    """
+    Rebuilds time_entries as a table partitioned by month on `date`, keeping
+    ids and the id sequence. The primary key becomes (id, date) because
+    PostgreSQL requires the partition key in every unique constraint.
+    Runs in the caller's transaction; the table is locked while rows are copied.
+    """
+    sequence = conn.execute(text("SELECT pg_get_serial_sequence('time_entries', 'id')")).scalar()
+    columns = {column['name'] for column in inspect(conn).get_columns('time_entries')}
+    # LIKE keeps every column the table has now (and the id sequence default), in the same order
+    conn.execute(text("""
+        CREATE TABLE time_entries_partitioned (LIKE time_entries INCLUDING DEFAULTS)
+        PARTITION BY RANGE (date)
+    """))
+    conn.execute(text("""
+        ALTER TABLE time_entries_partitioned
+            ADD CONSTRAINT time_entries_partitioned_pkey PRIMARY KEY (id, date),
+            ADD FOREIGN KEY (user_id) REFERENCES users (id)
+    """))
+    conn.execute(text(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF time_entries_partitioned DEFAULT"))
+
+    oldest = conn.execute(text("SELECT MIN(date) FROM time_entries")).scalar()
+    current = month_start(date.today())
+    month = month_start(oldest) if oldest and oldest < current else current
+    while month <= add_months(current, PARTITION_MONTHS_AHEAD):
+        end = add_months(month, 1)
+        conn.execute(text(
+            f"CREATE TABLE {partition_name(month)} PARTITION OF time_entries_partitioned "
+            f"FOR VALUES FROM ('{month}') TO ('{end}')"
+        ))
+        month = end
+
+    conn.execute(text("INSERT INTO time_entries_partitioned SELECT * FROM time_entries"))
+    # Keep the sequence when the old table (its owner) is dropped
+    conn.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY time_entries_partitioned.id"))
+    conn.execute(text("DROP TABLE time_entries"))
+    conn.execute(text("ALTER TABLE time_entries_partitioned RENAME TO time_entries"))
+    conn.execute(text(
+        "ALTER TABLE time_entries RENAME CONSTRAINT time_entries_partitioned_pkey TO time_entries_pkey"
+    ))
+    # Partitioned indexes: PostgreSQL creates the matching index on every partition
+    conn.execute(text(
+        "CREATE INDEX ix_time_entries_user_id_check_in ON time_entries (user_id, check_in DESC, id DESC)"
+    ))
+    conn.execute(text("CREATE INDEX ix_time_entries_open ON time_entries (user_id) WHERE check_out IS NULL"))
+    if 'change_version' in columns:
+        conn.execute(text("CREATE INDEX ix_time_entries_change_version ON time_entries (change_version)"))
+
+
+def archivable_months(conn, keep_months, today=None):
+    """
+    Months before the kept window, oldest first, split into
+    (closed months, months skipped because they still have open entries).
+    """
+    cutoff = add_months(month_start(today or date.today()), -keep_months)
+    oldest = conn.execute(text("SELECT MIN(date) FROM time_entries WHERE date < :cutoff"),
+                          {'cutoff': cutoff}).scalar()
+    if oldest is None:
+        return [], []
+    if isinstance(oldest, str):
+        oldest = date.fromisoformat(oldest)
+
+    closed, open_months = [], []
+    month = month_start(oldest)
+    while month < cutoff:
+        bounds = {'start': month, 'end': add_months(month, 1)}
+        has_rows = conn.execute(text(
+            "SELECT 1 FROM time_entries WHERE date >= :start AND date < :end LIMIT 1"
+        ), bounds).first()
+        if has_rows:
+            has_open = conn.execute(text(
+                "SELECT 1 FROM time_entries WHERE date >= :start AND date < :end "
+                "AND check_out IS NULL LIMIT 1"
+            ), bounds).first()
+            (open_months if has_open else closed).append(month)
+        month = bounds['end']
+    return closed, open_months
+
+
+def archive_month(conn, month):
+    """
+    Moves one month of time entries to the archive and adds its per-user
+    totals to the monthly summaries. Returns the number of entries moved.
+    """
+    bounds = {'start': month, 'end': add_months(month, 1), 'archived_at': datetime.now()}
+    moved = conn.execute(text(f"""
+        INSERT INTO time_entries_archive ({TIME_ENTRY_COLUMNS}, archived_at)
+        SELECT {TIME_ENTRY_COLUMNS}, :archived_at FROM time_entries
+        WHERE date >= :start AND date < :end
+    """), bounds).rowcount
+
+    # Scalar min/max of two values: MIN()/MAX() on SQLite, LEAST()/GREATEST() on PostgreSQL
+    least, greatest = ('MIN', 'MAX') if conn.dialect.name == 'sqlite' else ('LEAST', 'GREATEST')
+    conn.execute(text(f"""
+        INSERT INTO time_entry_monthly_summaries
+            (user_id, month, entries, total_hours, first_check_in, last_check_out, archived_at)
+        SELECT user_id, :start, COUNT(*), COALESCE(SUM(total_hours), 0),
+               MIN(check_in), MAX(check_out), :archived_at
+        FROM time_entries
+        WHERE date >= :start AND date < :end
+        GROUP BY user_id
+        ON CONFLICT (user_id, month) DO UPDATE SET
+            entries = time_entry_monthly_summaries.entries + excluded.entries,
+            total_hours = time_entry_monthly_summaries.total_hours + excluded.total_hours,
+            first_check_in = {least}(time_entry_monthly_summaries.first_check_in, excluded.first_check_in),
+            last_check_out = {greatest}(time_entry_monthly_summaries.last_check_out, excluded.last_check_out),
+            archived_at = excluded.archived_at
+    """), bounds)
+
+    name = partition_name(month)
+    if is_partitioned(conn) and name in list_partitions(conn):
+        # Dropping the partition is instant, unlike deleting its rows
+        conn.execute(text(f"ALTER TABLE time_entries DETACH PARTITION {name}"))
+        conn.execute(text(f"DROP TABLE {name}"))
+        conn.execute(text(f"DELETE FROM {DEFAULT_PARTITION} WHERE date >= :start AND date < :end"), bounds)
+    else:
+        conn.execute(text("DELETE FROM time_entries WHERE date >= :start AND date < :end"), bounds)
+    # The daily rollup only covers rows still in time_entries
+    conn.execute(text("DELETE FROM daily_hours WHERE date >= :start AND date < :end"), bounds)
+    return moved
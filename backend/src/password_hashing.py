@@ -0,0 +1,118 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from src.concurrency import gevent_active, native_lock
+
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', str(os.cpu_count() or 2)))
+PASSWORD_HASH_QUEUE = int(os.getenv('PASSWORD_HASH_QUEUE', '64'))
+PASSWORD_HASH_TIMEOUT = float(os.getenv('PASSWORD_HASH_TIMEOUT', '10'))
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when the hashing queue is full or a job waited too long"""
+    pass
+
+
+class PasswordHasher:
+    """
+    Bounded thread pool shared by every bcrypt operation (login, create_user, update_user).
+    The bcrypt C extension releases the GIL while hashing, so a thread pool runs
+    hashes on all cores without the pickling cost of a process pool. Requests
+    beyond `max_queue` waiting jobs are rejected instead of piling up.
+    """
+    def __init__(self, bcrypt, rounds, max_workers=PASSWORD_HASH_WORKERS,
+                 max_queue=PASSWORD_HASH_QUEUE, timeout=PASSWORD_HASH_TIMEOUT):
+        self.bcrypt = bcrypt
+        self.rounds = rounds
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._executor = None
+        # Touched from the pool threads too, so it must be a real lock under gevent
+        self._lock = native_lock()
+        self._pending = 0
+        self._active = 0
+        self._completed = 0
+        self._rejected = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def _get_executor(self):
+        # Created lazily so forked gunicorn workers each own their threads
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    if gevent_active():
+                        # Patched threads are greenlets: bcrypt would block the hub.
+                        # gevent's executor runs jobs on native threads and waits cooperatively
+                        from gevent.threadpool import ThreadPoolExecutor as GeventThreadPoolExecutor
+                        self._executor = GeventThreadPoolExecutor(max_workers=self.max_workers)
+                    else:
+                        self._executor = ThreadPoolExecutor(
+                            max_workers=self.max_workers, thread_name_prefix='bcrypt'
+                        )
+        return self._executor
+
+    def _run(self, fn, *args):
+        with self._lock:
+            if self._pending - self._active >= self.max_queue:
+                self._rejected += 1
+                raise PasswordHasherBusy('Password hashing queue is full')
+            self._pending += 1
+        enqueued_at = time.monotonic()
+
+        def job():
+            waited = time.monotonic() - enqueued_at
+            with self._lock:
+                self._active += 1
+                self._wait_total += waited
+                self._wait_max = max(self._wait_max, waited)
+            try:
+                return fn(*args)
+            finally:
+                with self._lock:
+                    self._active -= 1
+                    self._pending -= 1
+                    self._completed += 1
+
+        try:
+            future = self._get_executor().submit(job)
+        except Exception:
+            # The job will never run: give its queue slot back
+            with self._lock:
+                self._pending -= 1
+            raise
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            with self._lock:
+                self._rejected += 1
+            raise PasswordHasherBusy('Password hashing timed out')
+
+    def hash(self, password):
+        """Returns a bcrypt hash (str) using the configured work factor"""
+        return self._run(self.bcrypt.generate_password_hash, password, self.rounds).decode('utf-8')
+
+    def verify(self, pw_hash, password):
+        return self._run(self.bcrypt.check_password_hash, pw_hash, password)
+
+    def needs_rehash(self, pw_hash):
+        """True if the hash was created with a different work factor than the policy"""
+        try:
+            return int(pw_hash.split('$')[2]) != self.rounds
+        except (AttributeError, IndexError, ValueError):
+            return False
+
+    def stats(self):
+        with self._lock:
+            return {
+                'workers': self.max_workers,
+                'rounds': self.rounds,
+                'queue_depth': self._pending - self._active,
+                'max_queue': self.max_queue,
+                'active': self._active,
+                'completed': self._completed,
+                'rejected': self._rejected,
+                'avg_wait_ms': round(self._wait_total / self._completed * 1000, 2) if self._completed else 0.0,
+                'max_wait_ms': round(self._wait_max * 1000, 2)
+            }
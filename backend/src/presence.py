@@ -0,0 +1,88 @@
+"""
+presence: the open time entry of every user who is clocked in right now.
+
+One row per user (user_id is the primary key), written in the same
+transaction as the time entry it mirrors. Because the key is the user, the
+database itself refuses a second open entry for the same user, even when
+two requests race: the second INSERT fails with an IntegrityError.
+
+create_time_entry checks for an open entry with one primary key lookup here
+instead of scanning time_entries, and GET /api/presence lists who is in.
+Like the daily rollup, the table lives in the database (not in the worker
+process) so every gunicorn worker sees the same state.
+"""
+from sqlalchemy import (
+    MetaData, Table, Column, Integer, Date, DateTime, select, insert, update, delete, func
+)
+
+# Own MetaData: the table is created by src/migrations.py, not by create_all()
+presence = Table(
+    'presence', MetaData(),
+    Column('user_id', Integer, primary_key=True),
+    Column('entry_id', Integer, nullable=False),
+    Column('date', Date, nullable=False),
+    Column('check_in', DateTime)
+)
+
+
+def presence_columns(User):
+    return (presence.c.user_id, User.name, User.department, presence.c.entry_id,
+            presence.c.date, presence.c.check_in)
+
+
+def get_open_entry(db, user_id):
+    """(entry_id, date) of the user's open entry, or None"""
+    return db.session.execute(
+        select(presence.c.entry_id, presence.c.date).where(presence.c.user_id == user_id)
+    ).first()
+
+
+def add_open_entries(db, rows):
+    """Rows are dicts with user_id, entry_id, date and check_in"""
+    if rows:
+        db.session.execute(insert(presence), rows)
+
+
+def remove_open_entries(db, entry_ids):
+    if entry_ids:
+        db.session.execute(delete(presence).where(presence.c.entry_id.in_(entry_ids)))
+
+
+def track_entry(db, entry, was_open=False):
+    """
+    Brings the presence row of `entry` in line with its check_out after a
+    write. `was_open` is whether the entry was open before the write.
+    The entry must have an id (flush new entries first).
+    """
+    if entry.check_out is not None:
+        if was_open:
+            remove_open_entries(db, [entry.id])
+    elif was_open:
+        db.session.execute(
+            update(presence).where(presence.c.entry_id == entry.id)
+            .values(date=entry.date, check_in=entry.check_in)
+        )
+    else:
+        add_open_entries(db, [{
+            'user_id': entry.user_id, 'entry_id': entry.id, 'date': entry.date, 'check_in': entry.check_in
+        }])
+
+
+def rebuild_presence(conn, time_entries, users_select=None):
+    """
+    Recomputes presence from time_entries (a Table) on a Connection, for
+    every user or only for the ids returned by `users_select`. A user with
+    several open entries (older data) keeps the newest one. Returns the
+    number of users clocked in.
+    """
+    t = time_entries.c
+    newest_open = select(func.max(t.id)).where(t.check_out.is_(None)).group_by(t.user_id)
+    source = select(t.user_id, t.id, t.date, t.check_in).where(t.id.in_(newest_open))
+    clear = delete(presence)
+    if users_select is not None:
+        clear = clear.where(presence.c.user_id.in_(users_select))
+        source = source.where(t.user_id.in_(users_select))
+    conn.execute(clear)
+    return conn.execute(
+        insert(presence).from_select(['user_id', 'entry_id', 'date', 'check_in'], source)
+    ).rowcount
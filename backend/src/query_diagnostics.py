@@ -0,0 +1,167 @@
+"""
+Opt-in SQL diagnostics on the SQLAlchemy engine (development and load tests).
+
+SLOW_QUERY_MS=<ms>        log statements slower than the threshold with their
+                          bind parameters and the route that issued them
+N_PLUS_ONE_THRESHOLD=<n>  warn when one request runs the same statement n or
+                          more times (likely an N+1 query pattern)
+EXPLAIN_SLOW_QUERIES=true also log the plan of slow SELECT/UPDATE/DELETE statements
+                          (EXPLAIN on PostgreSQL, EXPLAIN QUERY PLAN on SQLite)
+
+Nothing is installed unless SLOW_QUERY_MS or N_PLUS_ONE_THRESHOLD is set.
+"""
+import os
+import re
+import time
+import threading
+from collections import Counter
+from flask import g, request, has_request_context
+from sqlalchemy import event
+
+MAX_LOGGED_SQL = 2000
+MAX_LOGGED_PARAMS = 500
+
+# Plain EXPLAIN only plans the statement, it never runs it
+EXPLAINABLE = ('SELECT', 'WITH', 'UPDATE', 'DELETE')
+
+# bcrypt hashes and JWTs must never end up in logs
+_SECRET_PATTERN = re.compile(r'^(\$2[aby]?\$|eyJ)')
+
+
+def _redact(value):
+    if isinstance(value, str) and _SECRET_PATTERN.match(value):
+        return '<redacted>'
+    return value
+
+
+def _format_params(parameters):
+    if isinstance(parameters, dict):
+        redacted = {k: _redact(v) for k, v in parameters.items()}
+    elif isinstance(parameters, (list, tuple)):
+        redacted = [_format_params(p) if isinstance(p, (dict, list, tuple)) else _redact(p) for p in parameters]
+    else:
+        redacted = parameters
+    text = repr(redacted)
+    return text if len(text) <= MAX_LOGGED_PARAMS else text[:MAX_LOGGED_PARAMS] + '...'
+
+
+def _format_sql(statement):
+    statement = ' '.join(statement.split())
+    return statement if len(statement) <= MAX_LOGGED_SQL else statement[:MAX_LOGGED_SQL] + '...'
+
+
+def _route():
+    if not has_request_context():
+        return 'no request'
+    return f"{request.method} {request.path} -> {request.endpoint or 'unmatched'}"
+
+
+class QueryDiagnostics:
+    def __init__(self, slow_query_ms=None, n_plus_one_threshold=None, explain=False):
+        self.slow_query_seconds = slow_query_ms / 1000 if slow_query_ms is not None else None
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.explain = explain
+        self._lock = threading.Lock()
+        self.slow_queries = 0
+        self.n_plus_one_warnings = 0
+
+    def init_app(self, app, db):
+        with app.app_context():
+            event.listen(db.engine, 'before_cursor_execute', self._before_cursor_execute)
+            event.listen(db.engine, 'after_cursor_execute', self._after_cursor_execute)
+            event.listen(db.engine, 'handle_error', self._handle_error)
+        if self.n_plus_one_threshold:
+            app.after_request(self._after_request)
+        app.extensions['query_diagnostics'] = self
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('diagnostics_started_at', []).append((context, time.perf_counter()))
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['diagnostics_started_at'].pop()[1]
+
+        if self.n_plus_one_threshold and has_request_context() and not executemany:
+            if 'diagnostics_statements' not in g:
+                g.diagnostics_statements = Counter()
+            g.diagnostics_statements[statement] += 1
+
+        if self.slow_query_seconds is not None and elapsed >= self.slow_query_seconds:
+            with self._lock:
+                self.slow_queries += 1
+            print(f"🐢 Slow query {elapsed * 1000:.1f}ms [{_route()}]\n"
+                  f"   SQL: {_format_sql(statement)}\n"
+                  f"   Params: {_format_params(parameters)}")
+            if self.explain and statement.split(None, 1)[0].upper() in EXPLAINABLE:
+                self._log_plan(conn, statement, parameters)
+
+    def _handle_error(self, exception_context):
+        # Failed statements skip after_cursor_execute: drop the start time
+        # pushed for them so later statements are not timed from it
+        conn = exception_context.connection
+        started = conn.info.get('diagnostics_started_at') if conn is not None else None
+        if started and started[-1][0] is exception_context.execution_context:
+            started.pop()
+
+    def _log_plan(self, conn, statement, parameters):
+        is_sqlite = conn.dialect.name == 'sqlite'
+        prefix = 'EXPLAIN QUERY PLAN ' if is_sqlite else 'EXPLAIN '
+        # A raw DBAPI cursor: the plan query must not re-enter these event hooks.
+        # On PostgreSQL a failed EXPLAIN would abort the request's transaction,
+        # so it runs inside a savepoint.
+        cursor = conn.connection.cursor()
+        try:
+            if not is_sqlite:
+                cursor.execute('SAVEPOINT query_diagnostics')
+            try:
+                cursor.execute(prefix + statement, parameters)
+                plan = '\n'.join('      ' + ' | '.join(str(col) for col in row) for row in cursor.fetchall())
+                print(f"   Plan:\n{plan}")
+            except Exception as e:
+                if not is_sqlite:
+                    cursor.execute('ROLLBACK TO SAVEPOINT query_diagnostics')
+                print(f"   Plan unavailable: {e}")
+            if not is_sqlite:
+                cursor.execute('RELEASE SAVEPOINT query_diagnostics')
+        except Exception as e:
+            print(f"   Plan unavailable: {e}")
+        finally:
+            cursor.close()
+
+    def _after_request(self, response):
+        statements = g.pop('diagnostics_statements', None)
+        if not statements:
+            return response
+        for statement, count in statements.most_common():
+            if count < self.n_plus_one_threshold:
+                break
+            with self._lock:
+                self.n_plus_one_warnings += 1
+            print(f"🔁 Possible N+1: {count}x the same statement in one request [{_route()}]\n"
+                  f"   SQL: {_format_sql(statement)}")
+        return response
+
+    def stats(self):
+        with self._lock:
+            return {
+                'slow_query_ms': self.slow_query_seconds * 1000 if self.slow_query_seconds is not None else None,
+                'n_plus_one_threshold': self.n_plus_one_threshold,
+                'explain': self.explain,
+                'slow_queries': self.slow_queries,
+                'n_plus_one_warnings': self.n_plus_one_warnings
+            }
+
+
+def install_query_diagnostics(app, db):
+    """Installs QueryDiagnostics from the environment; returns it, or None when disabled"""
+    slow_query_ms = os.getenv('SLOW_QUERY_MS')
+    n_plus_one_threshold = os.getenv('N_PLUS_ONE_THRESHOLD')
+    if not slow_query_ms and not n_plus_one_threshold:
+        return None
+    diagnostics = QueryDiagnostics(
+        slow_query_ms=float(slow_query_ms) if slow_query_ms else None,
+        n_plus_one_threshold=int(n_plus_one_threshold) if n_plus_one_threshold else None,
+        explain=os.getenv('EXPLAIN_SLOW_QUERIES', 'false').lower() in ('1', 'true', 'yes', 'on')
+    )
+    diagnostics.init_app(app, db)
+    print(f"🔬 Query diagnostics enabled ({diagnostics.stats()})")
+    return diagnostics
@@ -0,0 +1,143 @@
+BUCKETS = ('day', 'week', 'month', 'total')
+GROUP_BY = ('user', 'department')
+
+
+def bucket_expression(db, date_col, bucket):
+    """
+    SQL expression that truncates a date column to the start of its bucket.
+    Weeks start on Monday. Returns None for the 'total' bucket.
+    """
+    if bucket == 'total':
+        return None
+    if bucket == 'day':
+        return date_col
+
+    dialect = db.engine.dialect.name
+    if dialect == 'sqlite':
+        if bucket == 'month':
+            return db.func.strftime('%Y-%m-01', date_col)
+        # 'weekday 0' moves forward to Sunday, then back 6 days to Monday
+        return db.func.date(date_col, 'weekday 0', '-6 days')
+
+    # Inlined, not bound: PostgreSQL only matches the GROUP BY expression to
+    # the selected one when both use the same text ('bucket' is from BUCKETS)
+    return db.cast(db.func.date_trunc(db.literal_column(f"'{bucket}'"), date_col), db.Date)
+
+
+def bucket_to_string(value):
+    """Bucket values come back as date objects (PostgreSQL) or strings (SQLite)"""
+    if value is None:
+        return None
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()[:10]
+    return str(value)[:10]
+
+
+def _grouped_hours_query(db, User, source, columns, totals, group_by, bucket):
+    bucket_col = bucket_expression(db, columns.date, bucket)
+    if group_by == 'department':
+        group_cols = [User.department]
+    else:
+        group_cols = [columns.user_id, User.name, User.department]
+
+    select_cols = []
+    if bucket_col is not None:
+        bucket_col = bucket_col.label('bucket')
+        select_cols.append(bucket_col)
+    select_cols += group_cols + totals
+
+    grouping = ([bucket_col] if bucket_col is not None else []) + group_cols
+    query = db.session.query(*select_cols) \
+        .select_from(source) \
+        .join(User, User.id == columns.user_id) \
+        .group_by(*grouping)
+
+    return query.order_by(*grouping)
+
+
+def hours_summary_query(db, User, TimeEntry, group_by, bucket):
+    """
+    Builds the GROUP BY query over time_entries joined with users.
+    Every row returns (bucket, group columns..., total_hours, entries, open_entries).
+    """
+    totals = [
+        db.func.coalesce(db.func.sum(TimeEntry.total_hours), 0).label('total_hours'),
+        db.func.count(TimeEntry.id).label('entries'),
+        db.func.count(TimeEntry.id).filter(TimeEntry.check_out.is_(None)).label('open_entries')
+    ]
+    return _grouped_hours_query(db, User, TimeEntry, TimeEntry, totals, group_by, bucket)
+
+
+def daily_hours_summary_query(db, User, daily_hours, group_by, bucket):
+    """Same rows as hours_summary_query, summed from the daily_hours rollup"""
+    c = daily_hours.c
+    totals = [
+        db.func.coalesce(db.func.sum(c.total_hours), 0).label('total_hours'),
+        db.func.coalesce(db.func.sum(c.entries), 0).label('entries'),
+        db.func.coalesce(db.func.sum(c.open_entries), 0).label('open_entries')
+    ]
+    return _grouped_hours_query(db, User, daily_hours, c, totals, group_by, bucket)
+
+
+def summary_row_to_dict(row, group_by, bucket):
+    data = {}
+    if bucket != 'total':
+        data['bucket'] = bucket_to_string(row.bucket)
+    if group_by == 'department':
+        data['department'] = row.department
+    else:
+        data['user_id'] = row.user_id
+        data['name'] = row.name
+        data['department'] = row.department
+    data['total_hours'] = round(float(row.total_hours or 0), 2)
+    data['entries'] = row.entries
+    data['open_entries'] = row.open_entries
+    return data
+
+
+def collect_database_stats(db, User, TimeEntry, daily_hours):
+    """
+    Statistics for the root endpoint: users, time entries summed from the
+    daily_hours rollup, and the newest timestamps of the source tables.
+    daily_hours.updated_at is when the rollup was written (a rebuild moves
+    it), so last_database_change keeps reading users and time_entries.
+    """
+    users = db.session.query(
+        db.func.count(User.id).filter(User.role == 'admin'),
+        db.func.count(User.id).filter(User.role == 'manager'),
+        db.func.count(User.id).filter(User.role == 'worker'),
+        db.func.max(User.created_at)
+    ).one()
+    admins, managers, workers, last_user_change = users
+
+    c = daily_hours.c
+    entries = db.session.query(
+        db.func.coalesce(db.func.sum(c.entries), 0),
+        db.func.coalesce(db.func.sum(c.open_entries), 0),
+        db.func.coalesce(db.func.sum(c.total_hours), 0)
+    ).one()
+    total_entries, open_entries, total_hours = entries
+
+    entry_changes = db.session.query(
+        db.func.max(TimeEntry.created_at),
+        db.func.max(TimeEntry.check_in),
+        db.func.max(TimeEntry.check_out)
+    ).one()
+
+    last_changes = [c for c in (last_user_change, *entry_changes) if c]
+
+    return {
+        'users': {
+            'total': admins + managers + workers,
+            'admin': admins,
+            'manager': managers,
+            'worker': workers
+        },
+        'time_entries': {
+            'total': total_entries,
+            'open': open_entries,
+            'closed': total_entries - open_entries,
+            'total_hours_worked': round(float(total_hours or 0), 2)
+        },
+        'last_database_change': max(last_changes).isoformat() if last_changes else None
+    }
@@ -0,0 +1,136 @@
+"""
+Fast serialization path for list endpoints.
+
+Instead of building ORM objects and calling to_dict() per row, list
+endpoints select plain column tuples, format datetimes in one pass and
+encode with orjson when it is installed. The output is byte-for-byte what
+jsonify(...) returns for the same data (sorted keys, compact separators,
+ASCII-only escapes, trailing newline).
+"""
+import re
+import json
+from flask import current_app
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_NON_ASCII = re.compile(r'[^\x00-\x7f]')
+
+
+def _escape_non_ascii(match):
+    code = ord(match.group(0))
+    if code > 0xFFFF:
+        # Same surrogate pair escape as json.dumps(ensure_ascii=True)
+        code -= 0x10000
+        return '\\u%04x\\u%04x' % (0xD800 | (code >> 10), 0xDC00 | (code & 0x3FF))
+    return '\\u%04x' % code
+
+
+def dumps(obj):
+    """Compact, key-sorted, ASCII-only JSON text (same as Flask's jsonify)"""
+    if orjson is None:
+        return json.dumps(obj, sort_keys=True, separators=(',', ':'))
+    text = orjson.dumps(obj, option=orjson.OPT_SORT_KEYS).decode('utf-8')
+    if not text.isascii():
+        text = _NON_ASCII.sub(_escape_non_ascii, text)
+    return text
+
+
+def json_response(obj, status=200):
+    """Drop-in replacement for jsonify(obj) on large payloads"""
+    return current_app.response_class(f"{dumps(obj)}\n", status=status, mimetype='application/json')
+
+
+# =================== COLUMN PROJECTIONS ===================
+def user_columns(User):
+    return (User.id, User.name, User.email, User.role, User.department, User.status, User.created_at)
+
+
+def time_entry_columns(TimeEntry, User=None):
+    """Columns for a time entry row; owner columns are appended when User is given"""
+    columns = (
+        TimeEntry.id, TimeEntry.user_id, TimeEntry.date, TimeEntry.check_in,
+        TimeEntry.check_out, TimeEntry.total_hours, TimeEntry.notes, TimeEntry.created_at,
+        TimeEntry.updated_at
+    )
+    if User is not None:
+        columns += (User.name, User.department)
+    return columns
+
+
+def _isoformat(value):
+    return value.isoformat() if value is not None else None
+
+
+def _millis(value):
+    # Same result as datetime_to_string: '%Y-%m-%dT%H:%M:%S.%f'[:-3]
+    return value.isoformat(timespec='milliseconds') if value is not None else None
+
+
+# =================== ROW SERIALIZERS ===================
+def serialize_users(rows):
+    """Rows from user_columns() -> the shape of UserModel.to_dict()"""
+    return [
+        {
+            'id': user_id,
+            'name': name,
+            'email': email,
+            'role': role,
+            'department': department,
+            'status': status,
+            'created_at': _isoformat(created_at)
+        }
+        for user_id, name, email, role, department, status, created_at in rows
+    ]
+
+
+def time_entry_row_to_dict(row, date_cache=None):
+    """One row from time_entry_columns() -> the shape of TimeEntryModel.to_dict()"""
+    entry_id, user_id, date, check_in, check_out, total_hours, notes, created_at, updated_at = row[:9]
+    if date_cache is None:
+        date_str = _isoformat(date)
+    else:
+        # Many entries share a date: format each distinct date once per batch
+        date_str = date_cache.get(date)
+        if date_str is None:
+            date_str = date_cache[date] = _isoformat(date)
+    data = {
+        'id': entry_id,
+        'user_id': user_id,
+        'date': date_str,
+        'check_in': _millis(check_in),
+        'check_out': _millis(check_out),
+        'total_hours': total_hours,
+        'notes': notes,
+        'created_at': _isoformat(created_at),
+        'updated_at': _isoformat(updated_at or created_at)
+    }
+    if len(row) > 9:
+        data['user'] = {'id': user_id, 'name': row[9], 'department': row[10]}
+    return data
+
+
+def serialize_time_entries(rows):
+    """Rows from time_entry_columns() -> list of TimeEntryModel.to_dict() shapes"""
+    date_cache = {}
+    return [time_entry_row_to_dict(row, date_cache) for row in rows]
+
+
+def serialize_presence(rows):
+    """
+    Rows from presence_columns() -> who is clocked in. No elapsed time: the
+    response is cached by ETag, so clients compute it from check_in.
+    """
+    return [
+        {
+            'user_id': user_id,
+            'name': name,
+            'department': department,
+            'entry_id': entry_id,
+            'date': _isoformat(date),
+            'check_in': _millis(check_in)
+        }
+        for user_id, name, department, entry_id, date, check_in in rows
+    ]
@@ -0,0 +1,32 @@
+import time
+
+
+class StartupTimer:
+    """Records how long each phase of the app import takes (reported by /api/health)"""
+    def __init__(self, started_at=None):
+        self.started_at = started_at or time.perf_counter()
+        self._last = self.started_at
+        self.phases = {}
+        self.finished_at = None
+
+    def mark(self, phase):
+        """Closes the current phase under `phase`"""
+        now = time.perf_counter()
+        self.phases[phase] = round((now - self._last) * 1000, 1)
+        self._last = now
+
+    def finish(self):
+        self.finished_at = time.perf_counter()
+        return self.report()
+
+    def report(self):
+        end = self.finished_at or time.perf_counter()
+        return {
+            'total_ms': round((end - self.started_at) * 1000, 1),
+            'phases_ms': dict(self.phases)
+        }
+
+    def summary(self):
+        report = self.report()
+        phases = ', '.join(f"{name} {ms}ms" for name, ms in report['phases_ms'].items())
+        return f"{report['total_ms']}ms ({phases})"
@@ -0,0 +1,35 @@
+import os
+import time
+import threading
+
+STATS_CACHE_TTL = float(os.getenv('STATS_CACHE_TTL', '30'))
+
+
+class StatsCache:
+    """
+    Keeps the last computed value for `ttl` seconds.
+    Write endpoints call invalidate() so the next read recomputes.
+    The cache is per process: with several gunicorn workers the TTL
+    bounds how stale another worker's copy can be.
+    """
+    def __init__(self, ttl=STATS_CACHE_TTL):
+        self.ttl = ttl
+        self._value = None
+        self._computed_at = None
+        self._lock = threading.Lock()
+
+    def get(self, loader):
+        """Returns (value, age_in_seconds, served_from_cache)"""
+        with self._lock:
+            now = time.monotonic()
+            if self._value is not None and now - self._computed_at < self.ttl:
+                return self._value, now - self._computed_at, True
+
+            self._value = loader()
+            self._computed_at = time.monotonic()
+            return self._value, 0.0, False
+
+    def invalidate(self):
+        with self._lock:
+            self._value = None
+            self._computed_at = None
@@ -0,0 +1,83 @@
+"""
+One-use tickets that open GET /api/events.
+
+EventSource cannot send an Authorization header, and a JWT in the query
+string would be written to access logs and proxy logs for as long as it is
+valid. The client POSTs /api/events/ticket with its token and opens the
+stream with ?ticket=<ticket>. A ticket is random, expires after
+SSE_TICKET_SECONDS and is deleted by the stream that redeems it, so a
+logged ticket is useless.
+
+Tickets live in the database so any worker can redeem them. Only their
+SHA-256 is stored, with the role and department the user had when the
+ticket was issued. Without a database (mock mode) they are kept in memory.
+"""
+import os
+import hashlib
+import secrets
+import threading
+from datetime import datetime, timedelta
+from sqlalchemy import MetaData, Table, Column, Integer, String, DateTime, insert, delete
+
+SSE_TICKET_SECONDS = int(os.getenv('SSE_TICKET_SECONDS', '30'))
+
+# Own MetaData: the table is created by src/migrations.py, not by create_all()
+stream_tickets = Table(
+    'stream_tickets', MetaData(),
+    Column('ticket_hash', String(64), primary_key=True),
+    Column('user_id', Integer, nullable=False),
+    Column('role', String(20), nullable=False),
+    Column('department', String(50)),
+    Column('expires_at', DateTime, nullable=False)
+)
+
+_memory_tickets = {}
+_memory_lock = threading.Lock()
+
+
+def hash_ticket(ticket):
+    return hashlib.sha256(ticket.encode('utf-8')).hexdigest()
+
+
+def issue_ticket(db, user_id, role, department, ttl=SSE_TICKET_SECONDS):
+    """Returns a new ticket for the user; expired tickets are deleted on the way"""
+    ticket = secrets.token_urlsafe(32)
+    now = datetime.now()
+    row = {
+        'ticket_hash': hash_ticket(ticket), 'user_id': user_id, 'role': role,
+        'department': department, 'expires_at': now + timedelta(seconds=ttl)
+    }
+    if not db:
+        with _memory_lock:
+            for key in [k for k, v in _memory_tickets.items() if v['expires_at'] <= now]:
+                del _memory_tickets[key]
+            _memory_tickets[row['ticket_hash']] = row
+        return ticket
+
+    db.session.execute(delete(stream_tickets).where(stream_tickets.c.expires_at <= now))
+    db.session.execute(insert(stream_tickets), row)
+    db.session.commit()
+    return ticket
+
+
+def redeem_ticket(db, ticket):
+    """
+    Deletes the ticket and returns its {'user_id', 'role', 'department'},
+    or None if it is unknown, already used or expired.
+    """
+    ticket_hash = hash_ticket(ticket)
+    if not db:
+        with _memory_lock:
+            row = _memory_tickets.pop(ticket_hash, None)
+    else:
+        # One statement: two streams racing for the same ticket cannot both get it
+        row = db.session.execute(
+            delete(stream_tickets).where(stream_tickets.c.ticket_hash == ticket_hash).returning(
+                stream_tickets.c.user_id, stream_tickets.c.role, stream_tickets.c.department,
+                stream_tickets.c.expires_at
+            )
+        ).mappings().first()
+        db.session.commit()
+    if row is None or row['expires_at'] <= datetime.now():
+        return None
+    return {'user_id': row['user_id'], 'role': row['role'], 'department': row['department']}
@@ -0,0 +1,136 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+
+USER_CACHE_TTL = float(os.getenv('USER_CACHE_TTL', '60'))
+USER_CACHE_SIZE = int(os.getenv('USER_CACHE_SIZE', '1024'))
+
+
+class UserCache:
+    """
+    Per-process directory of users: id -> user dict and department -> member
+    ids. Entries expire after `ttl` seconds and the least recently used ones
+    are evicted past `max_size`. create_user/update_user/delete_user
+    invalidate what they changed in their worker; sync() with the 'users'
+    change version drops everything when another worker changed users, so
+    lookups made after sync() agree with the committed users.
+    """
+    def __init__(self, ttl=USER_CACHE_TTL, max_size=USER_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._users = OrderedDict()
+        self._departments = OrderedDict()
+        self._version = None
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._resets = 0
+
+    def sync(self, version):
+        """Drops every entry if the 'users' change version moved since the last call"""
+        with self._lock:
+            if version == self._version:
+                return
+            if self._users or self._departments:
+                self._resets += 1
+            self._users.clear()
+            self._departments.clear()
+            self._version = version
+
+    def _cached(self, store, key):
+        """Fresh value or None; call with the lock held"""
+        item = store.get(key)
+        if item is not None:
+            value, loaded_at = item
+            if time.monotonic() - loaded_at < self.ttl:
+                store.move_to_end(key)
+                self._hits += 1
+                return value
+            del store[key]
+        self._misses += 1
+        return None
+
+    def _store(self, store, key, value, version):
+        """Call with the lock held; values loaded before a sync() to a newer version are dropped"""
+        if version != self._version:
+            return
+        store[key] = (value, time.monotonic())
+        store.move_to_end(key)
+        while len(store) > self.max_size:
+            store.popitem(last=False)
+            self._evictions += 1
+
+    def _lookup(self, store, key, loader):
+        with self._lock:
+            value = self._cached(store, key)
+            if value is not None:
+                return value
+            version = self._version
+
+        # Loaded outside the lock so a slow query does not block other lookups
+        value = loader()
+        if value is None:
+            return None
+        with self._lock:
+            self._store(store, key, value, version)
+        return value
+
+    def get_user(self, user_id, loader):
+        """User dict (as User.to_dict()) or None; `loader` runs on a miss"""
+        user = self._lookup(self._users, user_id, loader)
+        return dict(user) if user is not None else None
+
+    def get_users(self, user_ids, loader):
+        """
+        {id: user dict} for the ids that exist; `loader(missing ids)` returns
+        {id: user dict} for all misses at once
+        """
+        users = {}
+        missing = []
+        with self._lock:
+            for user_id in set(user_ids):
+                user = self._cached(self._users, user_id)
+                if user is None:
+                    missing.append(user_id)
+                else:
+                    users[user_id] = user
+            version = self._version
+        if missing:
+            loaded = loader(missing)
+            with self._lock:
+                for user_id, user in loaded.items():
+                    self._store(self._users, user_id, user, version)
+            users.update(loaded)
+        return {user_id: dict(user) for user_id, user in users.items()}
+
+    def get_department_ids(self, department, loader):
+        """Frozen set of the member ids of a department; `loader` returns them on a miss"""
+        return self._lookup(self._departments, department, lambda: frozenset(loader()))
+
+    def invalidate(self, user_id=None, departments=()):
+        with self._lock:
+            self._users.pop(user_id, None)
+            for department in departments:
+                self._departments.pop(department, None)
+
+    def clear(self):
+        with self._lock:
+            self._users.clear()
+            self._departments.clear()
+            self._version = None
+
+    def stats(self):
+        with self._lock:
+            return {
+                'users': len(self._users),
+                'departments': len(self._departments),
+                'max_size': self.max_size,
+                'ttl_seconds': self.ttl,
+                'users_version': self._version,
+                'hits': self._hits,
+                'misses': self._misses,
+                'evictions': self._evictions,
+                'version_resets': self._resets
+            }
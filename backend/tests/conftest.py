@@ -0,0 +1,108 @@
+"""
+Shared fixtures. The app module reads DATABASE_URL when it is imported, so
+the environment is set before the first import.
+
+Tests run on a temporary SQLite file by default. Set TEST_DATABASE_URL to a
+PostgreSQL database (it is emptied before every test) to run them there.
+"""
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+_sqlite_file = os.path.join(tempfile.mkdtemp(prefix='timetracer-tests-'), 'test.db')
+os.environ['DATABASE_URL'] = os.getenv('TEST_DATABASE_URL', f'sqlite:///{_sqlite_file}')
+os.environ.setdefault('BCRYPT_LOG_ROUNDS', '4')
+os.environ.setdefault('SECRET_KEY', 'test-jwt-secret-key-long-enough-for-hs256')
+os.environ.setdefault('SSE_VERSION_POLL_SECONDS', '0')
+
+import app as app_module  # noqa: E402
+from src.init_db import run_migrations  # noqa: E402
+
+PASSWORD = 'secret'
+
+# Tables emptied before every test, children first
+DATA_TABLES = (
+    'time_entry_tombstones', 'presence', 'daily_hours', 'time_entry_monthly_summaries',
+    'time_entries_archive', 'time_entries', 'stream_tickets', 'users'
+)
+
+
+@pytest.fixture(scope='session')
+def app():
+    flask_app = app_module.app
+    flask_app.config['TESTING'] = True
+    with flask_app.app_context():
+        run_migrations(app_module.db)
+    return flask_app
+
+
+@pytest.fixture
+def db(app):
+    database = app_module.db
+    with app.app_context():
+        for table in DATA_TABLES:
+            database.session.execute(database.text(f'DELETE FROM {table}'))
+        database.session.execute(database.text('UPDATE change_versions SET version = 0'))
+        database.session.commit()
+        app_module.stats_cache.invalidate()
+        app_module.user_cache.clear()
+        yield database
+        database.session.rollback()
+        database.session.remove()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def users(db):
+    """admin (IT), manager and worker (Ops), worker2 (IT); returns {name: id}"""
+    password_hash = app_module.bcrypt.generate_password_hash(PASSWORD, 4).decode('utf-8')
+    User = app_module.User
+    rows = {
+        'admin': User(name='Admin', email='admin@test.local', role='admin', department='IT'),
+        'manager': User(name='Manager', email='manager@test.local', role='manager', department='Ops'),
+        'worker': User(name='Worker', email='worker@test.local', role='worker', department='Ops'),
+        'worker2': User(name='Worker Two', email='worker2@test.local', role='worker', department='IT'),
+    }
+    for user in rows.values():
+        user.users_password = password_hash
+        user.status = 'active'
+    db.session.add_all(rows.values())
+    db.session.commit()
+    return {name: user.id for name, user in rows.items()}
+
+
+@pytest.fixture
+def auth(client, users):
+    """Authorization headers per user name"""
+    headers = {}
+    for name in users:
+        response = client.post('/api/auth/login', json={'email': f'{name}@test.local', 'password': PASSWORD})
+        assert response.status_code == 200, response.get_json()
+        headers[name] = {'Authorization': f"Bearer {response.get_json()['access_token']}"}
+    return headers
+
+
+def create_entry(client, headers, day, hours=8, user_id=None, open_entry=False, notes=None):
+    """POSTs one entry starting at 08:00 on `day`; returns the response JSON"""
+    check_in = datetime.combine(day, datetime.min.time()) + timedelta(hours=8)
+    body = {'date': day.isoformat(), 'check_in': check_in.isoformat()}
+    if not open_entry:
+        body['check_out'] = (check_in + timedelta(hours=hours)).isoformat()
+        body['total_hours'] = hours
+    if user_id is not None:
+        body['user_id'] = user_id
+    if notes is not None:
+        body['notes'] = notes
+    response = client.post('/api/time-entries', headers=headers, json=body)
+    assert response.status_code in (200, 201), response.get_json()
+    return response.get_json()['time_entry']
@@ -0,0 +1,63 @@
+import io
+from datetime import date
+
+from conftest import create_entry
+
+
+def batch(client, headers, **body):
+    return client.post('/api/time-entries/batch', headers=headers, json=body)
+
+
+def open_user_ids(client, headers):
+    response = client.get('/api/time-entries?open_only=true', headers=headers)
+    return {entry['user_id'] for entry in response.get_json()['time_entries']}
+
+
+def test_batch_rejects_invalid_requests(client, auth, users):
+    assert batch(client, auth['admin'], action='nap', department='Ops').status_code == 400
+    assert batch(client, auth['admin'], action='clock_in', user_ids=[]).status_code == 400
+    assert batch(client, auth['admin'], action='clock_in', user_ids=['1']).status_code == 400
+    assert batch(client, auth['admin'], action='clock_in').status_code == 400
+    assert batch(client, auth['admin'], action='clock_in', department='Ops', timestamp='soon').status_code == 400
+    assert batch(client, auth['worker'], action='clock_in', department='Ops').status_code == 403
+
+
+def test_manager_batch_stays_in_the_department_and_skips_the_manager(client, auth, users):
+    response = batch(client, auth['manager'], action='clock_in', department='IT', timestamp='2025-03-03T08:00:00')
+    assert response.status_code == 200
+    assert [entry['user_id'] for entry in response.get_json()['entries']] == [users['worker']]
+    assert open_user_ids(client, auth['admin']) == {users['worker']}
+
+
+def test_clock_in_skips_users_with_an_open_entry(client, auth, users):
+    create_entry(client, auth['worker2'], date(2025, 3, 3), open_entry=True)
+    response = batch(client, auth['admin'], action='clock_in', user_ids=[users['worker'], users['worker2']])
+    assert response.get_json()['affected'] == 1
+    assert open_user_ids(client, auth['admin']) == {users['worker'], users['worker2']}
+
+
+def test_clock_out_closes_open_entries_with_their_hours(client, auth, users):
+    create_entry(client, auth['worker'], date(2025, 3, 3), open_entry=True)
+    response = batch(client, auth['admin'], action='clock_out', department='Ops', timestamp='2025-03-03T12:30:00')
+    assert response.get_json()['affected'] == 1
+    assert open_user_ids(client, auth['admin']) == set()
+
+    entry = client.get('/api/time-entries', headers=auth['worker']).get_json()['time_entries'][0]
+    assert entry['check_out'] == '2025-03-03T12:30:00.000'
+    assert entry['total_hours'] == 4.5
+
+
+def test_new_entries_are_created_and_updated_at_the_same_time(client, auth, users):
+    create_entry(client, auth['worker'], date(2025, 3, 3))
+    batch(client, auth['admin'], action='clock_in', user_ids=[users['worker2']], timestamp='2025-03-04T08:00:00')
+    body = f'user_id,date,check_in,check_out,total_hours\n{users["manager"]},2025-03-05,2025-03-05T08:00:00,2025-03-05T10:00:00,2\n'
+    response = client.post(
+        '/api/time-entries/import?format=csv', headers=auth['admin'],
+        data={'file': (io.BytesIO(body.encode()), 'entries.csv')}
+    )
+    assert response.get_json()['inserted'] == 1
+
+    entries = client.get('/api/time-entries', headers=auth['admin']).get_json()['time_entries']
+    assert len(entries) == 3
+    for entry in entries:
+        assert entry['created_at'] == entry['updated_at']
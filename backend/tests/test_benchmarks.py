@@ -0,0 +1,16 @@
+import pytest
+
+import app as app_module
+from benchmarks.api import seed, build_virtual_users, Recorder
+
+
+def test_seed_always_creates_an_admin(db):
+    accounts = seed(app_module.app, db, app_module.User, app_module.TimeEntry, 5, 8, 20, 1)
+    assert {role: len(ids) for role, ids in accounts.items()} == {'worker': 2, 'manager': 5, 'admin': 1}
+
+
+def test_missing_role_accounts_fail_loudly(db):
+    accounts = {'worker': [(1, 'user1@bench.local')], 'manager': [], 'admin': []}
+    mix = {'worker': 70, 'manager': 25, 'admin': 5}
+    with pytest.raises(SystemExit, match='no manager accounts'):
+        build_virtual_users('http://localhost', accounts, 3, mix, 1, Recorder())
@@ -0,0 +1,44 @@
+import os
+import subprocess
+import sys
+
+from conftest import BACKEND_DIR
+from src.concurrency import gevent_active, native_lock
+
+# Runs in its own interpreter: monkey-patching cannot be undone
+GEVENT_SCRIPT = """
+from src.concurrency import patch_gevent, gevent_active, native_lock
+patch_gevent()
+import threading
+import gevent
+from flask_bcrypt import Bcrypt
+from src.connection_db import select_postgres_driver
+from src.password_hashing import PasswordHasher
+
+assert gevent_active()
+assert select_postgres_driver('auto') == 'pg8000'
+assert type(native_lock()) is not type(threading.Lock())
+
+# bcrypt runs on native threads: other greenlets keep running meanwhile
+hasher = PasswordHasher(Bcrypt(), 12, max_workers=2)
+ticks = []
+ticker = gevent.spawn(lambda: [ticks.append(gevent.sleep(0.01)) for _ in range(10)])
+pw_hash = hasher.hash('secret')
+assert ticks, 'the hub was blocked while hashing'
+assert hasher.verify(pw_hash, 'secret')
+ticker.join()
+print('ok', hasher.stats()['completed'])
+"""
+
+
+def test_without_gevent_locks_are_plain():
+    assert not gevent_active()
+    with native_lock():
+        pass
+
+
+def test_gevent_mode():
+    result = subprocess.run([sys.executable, '-c', GEVENT_SCRIPT], cwd=BACKEND_DIR, env=dict(os.environ),
+                            capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip().endswith('ok 2')
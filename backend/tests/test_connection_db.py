@@ -0,0 +1,102 @@
+import threading
+
+import pytest
+from sqlalchemy import create_engine, exc, text
+from sqlalchemy.pool import StaticPool
+
+import app as app_module
+from src import connection_db
+from src.connection_db import get_pool_options, select_postgres_driver
+from src.db_pool import SerializedStaticPool, TimedQueuePool, get_pool_stats
+from src.init_db import init_database
+
+
+def memory_engine():
+    engine = create_engine('sqlite://', poolclass=StaticPool, connect_args={'check_same_thread': False})
+    engine.pool = SerializedStaticPool.from_pool(engine.pool)
+    with engine.begin() as conn:
+        conn.execute(text('CREATE TABLE items (id INTEGER PRIMARY KEY)'))
+    return engine
+
+
+def test_in_memory_connection_is_used_by_one_thread_at_a_time():
+    engine = memory_engine()
+    seen = []
+    holder = engine.connect()
+    holder.execute(text('INSERT INTO items (id) VALUES (1)'))
+
+    def reader():
+        with engine.connect() as conn:
+            seen.append(conn.execute(text('SELECT count(*) FROM items')).scalar())
+
+    thread = threading.Thread(target=reader)
+    thread.start()
+    thread.join(0.2)
+    # Waiting for the connection instead of reading the open transaction
+    assert thread.is_alive() and seen == []
+
+    holder.rollback()
+    holder.close()
+    thread.join(5)
+    assert seen == [0]
+
+
+def test_the_holding_thread_can_check_the_connection_out_again():
+    engine = memory_engine()
+    with engine.connect() as outer, engine.connect() as inner:
+        assert inner.execute(text('SELECT 1')).scalar() == 1
+        assert outer.execute(text('SELECT 1')).scalar() == 1
+
+
+def test_init_database_seeds_the_mock_users_once(db):
+    assert init_database(app_module.app, db, app_module.User)
+    assert init_database(app_module.app, db, app_module.User)
+    emails = {user.email for user in db.session.query(app_module.User)}
+    assert 'admin@timetracer.com' in emails and len(emails) == 3
+
+
+def test_auto_driver_is_the_first_importable_one(monkeypatch):
+    installed = {'psycopg2', 'pg8000'}
+
+    def import_module(name):
+        if name not in installed:
+            raise ImportError(f'No module named {name}')
+
+    monkeypatch.setattr(connection_db.importlib, 'import_module', import_module)
+    monkeypatch.setattr(connection_db, 'gevent_active', lambda: False)
+    assert select_postgres_driver('auto') == 'psycopg2'
+    assert select_postgres_driver('pg8000') == 'pg8000'
+    with pytest.raises(ImportError):
+        select_postgres_driver('psycopg')
+    with pytest.raises(ImportError, match='Unknown DB_DRIVER'):
+        select_postgres_driver('asyncpg')
+
+    # Under gevent psycopg2 needs psycogreen to yield
+    monkeypatch.setattr(connection_db, 'gevent_active', lambda: True)
+    monkeypatch.setattr(connection_db, 'psycogreen_available', lambda: False)
+    assert select_postgres_driver('auto') == 'pg8000'
+
+
+def test_pool_options_come_from_the_environment(monkeypatch):
+    monkeypatch.setenv('DB_POOL_SIZE', '20')
+    monkeypatch.setenv('DB_POOL_TIMEOUT', '2.5')
+    monkeypatch.setenv('DB_POOL_PRE_PING', 'off')
+    options = get_pool_options()
+    assert options['poolclass'] is TimedQueuePool
+    assert (options['pool_size'], options['max_overflow'], options['pool_timeout']) == (20, 10, 2.5)
+    assert options['pool_pre_ping'] is False
+
+
+def test_pool_records_checkout_waits_and_timeouts(tmp_path):
+    engine = create_engine(f'sqlite:///{tmp_path / "pool.db"}', poolclass=TimedQueuePool,
+                           pool_size=1, max_overflow=0, pool_timeout=0.05)
+    before = get_pool_stats(engine)
+    with engine.connect():
+        assert get_pool_stats(engine)['checked_out'] == 1
+        with pytest.raises(exc.TimeoutError):
+            engine.connect()
+    after = get_pool_stats(engine)
+    assert after['checkouts'] == before['checkouts'] + 1
+    assert after['timeouts'] == before['timeouts'] + 1
+    assert after['checked_out'] == 0
+    engine.dispose()
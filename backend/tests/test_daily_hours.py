@@ -0,0 +1,64 @@
+import io
+from datetime import date
+
+import app as app_module
+from conftest import create_entry
+from src.daily_hours import daily_hours, verify_daily_hours
+
+
+def assert_consistent(db):
+    checked, mismatches, samples = verify_daily_hours(db.session.connection(), app_module.TimeEntry.__table__)
+    db.session.rollback()
+    assert mismatches == 0, samples
+    return checked
+
+
+def test_every_write_path_keeps_the_rollup_consistent(client, auth, users, db):
+    day = date(2025, 3, 3)
+    closed = create_entry(client, auth['worker'], day, hours=8)
+    create_entry(client, auth['worker2'], day, open_entry=True)
+    assert assert_consistent(db) == 2
+
+    # Closing the open entry on the same date
+    create_entry(client, auth['worker2'], day, hours=6)
+    assert_consistent(db)
+
+    client.put(f"/api/time-entries/{closed['id']}", headers=auth['admin'], json={'total_hours': 7.5})
+    assert_consistent(db)
+
+    client.post('/api/time-entries/batch', headers=auth['admin'],
+                json={'action': 'clock_in', 'department': 'Ops', 'timestamp': '2025-03-04T08:00:00'})
+    assert_consistent(db)
+    client.post('/api/time-entries/batch', headers=auth['admin'],
+                json={'action': 'clock_out', 'department': 'Ops', 'timestamp': '2025-03-04T12:00:00'})
+    assert_consistent(db)
+
+    body = f"user_id,date,check_in,check_out\n{users['worker2']},2025-03-04,2025-03-04T09:00:00,2025-03-04T10:00:00\n"
+    client.post('/api/time-entries/import', headers=auth['admin'],
+                data={'file': (io.BytesIO(body.encode()), 'entries.csv')})
+    assert_consistent(db)
+
+    # Days without entries left are removed
+    assert client.delete(f"/api/time-entries/{closed['id']}", headers=auth['admin']).status_code == 200
+    assert client.delete(f"/api/users/{users['worker2']}", headers=auth['admin']).status_code == 200
+    assert_consistent(db)
+    days = db.session.execute(db.select(daily_hours.c.user_id, daily_hours.c.date)).all()
+    assert {(user_id, str(day)[:10]) for user_id, day in days} == {
+        (users['manager'], '2025-03-04'), (users['worker'], '2025-03-04')
+    }
+
+
+def test_summary_from_the_rollup_matches_the_entries(client, auth, users):
+    create_entry(client, auth['worker'], date(2025, 3, 3), hours=8)
+    create_entry(client, auth['worker'], date(2025, 3, 4), hours=4.25)
+    create_entry(client, auth['worker2'], date(2025, 3, 4), hours=6)
+    create_entry(client, auth['worker2'], date(2025, 3, 5), open_entry=True)
+
+    summary = client.get('/api/time-entries/summary?group_by=user', headers=auth['admin']).get_json()
+    totals = {row['user_id']: row['total_hours'] for row in summary['summary']}
+    entries = client.get('/api/time-entries', headers=auth['admin']).get_json()['time_entries']
+    expected = {}
+    for entry in entries:
+        expected[entry['user_id']] = expected.get(entry['user_id'], 0) + (entry['total_hours'] or 0)
+    assert totals == expected
+    assert summary['total_hours'] == 18.25
@@ -0,0 +1,143 @@
+from datetime import date, datetime
+
+from sqlalchemy import event
+
+import app as app_module
+from conftest import create_entry
+from src.change_versions import get_versions
+from src.delta_sync import sync_stamp, stamp_pending, time_entry_tombstones, PENDING_VERSION
+
+
+def sync_token(client, headers):
+    response = client.get('/api/time-entries', headers=headers)
+    assert response.status_code == 200
+    return response.get_json()['sync_token']
+
+
+def delta(client, headers, token):
+    response = client.get(f'/api/time-entries?since={token}', headers=headers)
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()
+
+
+def reinsert_entry(db, entry_id, user_id):
+    """Writes a new entry with an old id, like a SQLite table without AUTOINCREMENT"""
+    stamp = sync_stamp()
+    day = date(2025, 3, 4)
+    db.session.add(app_module.TimeEntry(
+        id=entry_id, user_id=user_id, date=day, check_in=datetime(2025, 3, 4, 8), check_out=datetime(2025, 3, 4, 12),
+        total_hours=4, created_at=stamp['updated_at'], **stamp
+    ))
+    stamp_pending(db)
+    db.session.commit()
+
+
+def test_delta_returns_changed_rows_and_tombstones(client, auth, users):
+    kept = create_entry(client, auth['worker'], date(2025, 3, 3))
+    removed = create_entry(client, auth['worker'], date(2025, 3, 4))
+    token = sync_token(client, auth['worker'])
+
+    response = client.put(f"/api/time-entries/{kept['id']}", headers=auth['manager'], json={'notes': 'edited'})
+    assert response.status_code == 200
+    assert client.delete(f"/api/time-entries/{removed['id']}", headers=auth['manager']).status_code == 200
+
+    body = delta(client, auth['worker'], token)
+    assert [entry['id'] for entry in body['time_entries']] == [kept['id']]
+    assert body['time_entries'][0]['notes'] == 'edited'
+    assert [tombstone['id'] for tombstone in body['deleted']] == [removed['id']]
+
+    # Nothing changed since the new token
+    body = delta(client, auth['worker'], body['sync_token'])
+    assert body['time_entries'] == [] and body['deleted'] == []
+
+
+def test_delta_is_scoped_like_the_listing(client, auth, users):
+    token = sync_token(client, auth['manager'])
+    create_entry(client, auth['worker'], date(2025, 3, 3))
+    create_entry(client, auth['worker2'], date(2025, 3, 3))
+
+    ops = delta(client, auth['manager'], token)
+    assert {entry['user_id'] for entry in ops['time_entries']} == {users['worker']}
+
+
+def test_expired_sync_token_answers_410(client, auth, users):
+    response = client.get('/api/time-entries?since=v999', headers=auth['worker'])
+    assert response.status_code == 400
+    create_entry(client, auth['worker'], date(2025, 3, 3))
+    future = app_module.encode_sync_token(10 ** 6)
+    response = client.get(f'/api/time-entries?since={future}', headers=auth['worker'])
+    assert response.status_code == 410
+    assert response.get_json()['resync'] is True
+
+
+def test_deleted_ids_are_not_reused(client, auth, users):
+    first = create_entry(client, auth['worker'], date(2025, 3, 3))
+    assert client.delete(f"/api/time-entries/{first['id']}", headers=auth['manager']).status_code == 200
+    second = create_entry(client, auth['worker'], date(2025, 3, 3))
+    assert second['id'] != first['id']
+    assert client.delete(f"/api/time-entries/{second['id']}", headers=auth['manager']).status_code == 200
+
+
+def test_deleting_a_reused_id_again_refreshes_its_tombstone(client, auth, users, db):
+    entry = create_entry(client, auth['worker'], date(2025, 3, 3))
+    assert client.delete(f"/api/time-entries/{entry['id']}", headers=auth['manager']).status_code == 200
+    token = sync_token(client, auth['worker'])
+
+    reinsert_entry(db, entry['id'], users['worker'])
+    # The recreated row wins over the older tombstone of the same id
+    body = delta(client, auth['worker'], token)
+    assert [row['id'] for row in body['time_entries']] == [entry['id']]
+    assert body['deleted'] == []
+
+    response = client.delete(f"/api/time-entries/{entry['id']}", headers=auth['manager'])
+    assert response.status_code == 200, response.get_json()
+    body = delta(client, auth['worker'], token)
+    assert body['time_entries'] == []
+    assert [tombstone['id'] for tombstone in body['deleted']] == [entry['id']]
+    assert body['deleted'][0]['date'] == '2025-03-04'
+    assert db.session.execute(db.select(db.func.count()).select_from(time_entry_tombstones)).scalar() == 1
+
+
+def test_deleting_a_user_with_a_reused_entry_id(client, auth, users, db):
+    entry = create_entry(client, auth['worker'], date(2025, 3, 3))
+    assert client.delete(f"/api/time-entries/{entry['id']}", headers=auth['manager']).status_code == 200
+    reinsert_entry(db, entry['id'], users['worker'])
+
+    response = client.delete(f"/api/users/{users['worker']}", headers=auth['admin'])
+    assert response.status_code == 200, response.get_json()
+    assert db.session.execute(db.select(db.func.count()).select_from(time_entry_tombstones)).scalar() == 1
+
+
+def test_the_version_is_bumped_last_and_stamped_on_the_rows(client, auth, users, db):
+    entry = create_entry(client, auth['worker'], date(2025, 3, 3))
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(' '.join(statement.split()))
+
+    def committed(conn):
+        statements.append('COMMIT')
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    event.listen(db.engine, 'commit', committed)
+    try:
+        response = client.put(f"/api/time-entries/{entry['id']}", headers=auth['manager'], json={'notes': 'edited'})
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+        event.remove(db.engine, 'commit', committed)
+    assert response.status_code == 200
+
+    # Only the stamp of the pending rows runs while the version row is locked
+    bump = next(i for i, s in enumerate(statements) if s.startswith('UPDATE change_versions'))
+    assert [s.split()[:2] for s in statements[bump + 1:bump + 4]] == [
+        ['UPDATE', 'time_entries'], ['UPDATE', 'time_entry_tombstones'], ['COMMIT']
+    ]
+
+    version = get_versions(db, ['time_entries'])[0]
+    stamped = db.session.get(app_module.TimeEntry, entry['id'])
+    assert stamped.change_version == version
+    assert db.session.execute(
+        db.select(db.func.count()).select_from(app_module.TimeEntry).where(
+            app_module.TimeEntry.change_version == PENDING_VERSION
+        )
+    ).scalar() == 0
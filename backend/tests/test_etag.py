@@ -0,0 +1,46 @@
+from datetime import date
+
+from conftest import create_entry
+
+
+def get(client, url, headers, etag=None):
+    if etag:
+        headers = dict(headers, **{'If-None-Match': etag})
+    return client.get(url, headers=headers)
+
+
+def test_unchanged_list_answers_304(client, auth, users):
+    create_entry(client, auth['worker'], date(2025, 3, 3))
+    first = get(client, '/api/time-entries', auth['worker'])
+    assert first.status_code == 200 and first.headers['ETag']
+    assert first.headers['Cache-Control'] == 'private, no-cache'
+
+    again = get(client, '/api/time-entries', auth['worker'], first.headers['ETag'])
+    assert again.status_code == 304
+    assert again.data == b''
+    assert again.headers['ETag'] == first.headers['ETag']
+
+
+def test_writes_change_the_etag(client, auth, users):
+    etag = get(client, '/api/time-entries', auth['admin']).headers['ETag']
+    users_etag = get(client, '/api/users', auth['admin']).headers['ETag']
+
+    create_entry(client, auth['worker'], date(2025, 3, 3))
+    response = get(client, '/api/time-entries', auth['admin'], etag)
+    assert response.status_code == 200 and len(response.get_json()['time_entries']) == 1
+    # Time entry writes leave the user list alone
+    assert get(client, '/api/users', auth['admin'], users_etag).status_code == 304
+
+    etag = response.headers['ETag']
+    client.put(f"/api/users/{users['worker']}", headers=auth['admin'], json={'name': 'Renamed'})
+    # Entry lists embed user data: a user change is a change for them too
+    assert get(client, '/api/time-entries', auth['admin'], etag).status_code == 200
+    assert get(client, '/api/users', auth['admin'], users_etag).status_code == 200
+
+
+def test_etags_are_per_caller_and_query(client, auth, users):
+    admin = get(client, '/api/time-entries', auth['admin']).headers['ETag']
+    manager = get(client, '/api/time-entries', auth['manager']).headers['ETag']
+    filtered = get(client, '/api/time-entries?open_only=true', auth['admin']).headers['ETag']
+    assert len({admin, manager, filtered}) == 3
+    assert get(client, '/api/time-entries', auth['manager'], admin).status_code == 200
@@ -0,0 +1,140 @@
+import time
+from datetime import date
+
+import pytest
+
+import app as app_module
+from conftest import create_entry
+from src import event_relay
+from src.event_relay import EventRelay, MAX_PAYLOAD_BYTES, pack_payloads
+from src.events import EventBroker, VersionWatcher
+
+
+def versions(time_entries):
+    return {'users': 0, 'time_entries': time_entries}
+
+
+def resynced(subscription):
+    return subscription.wait(0)[1]
+
+
+def watched_broker(resync_min_seconds=30):
+    broker = EventBroker()
+    broker._watcher = VersionWatcher(broker, None, None, 5, resync_min_seconds)
+    subscription, _ = broker.subscribe('admin', 'IT', 1)
+    return broker, broker._watcher, subscription
+
+
+def test_versions_noted_after_the_read_do_not_resync():
+    broker, watcher, subscription = watched_broker()
+    watcher.check(versions(0), now=0)
+    # Version 1 is committed before the read, noted right after it
+    watcher.check(versions(1), now=5)
+    broker.note_versions({'time_entries': [1]})
+    watcher.check(versions(1), now=10)
+    watcher.check(versions(1), now=15)
+    assert not resynced(subscription)
+
+
+def test_unpublished_changes_resync_at_most_once_per_window():
+    broker, watcher, subscription = watched_broker(resync_min_seconds=30)
+    watcher.check(versions(0), now=0)
+    watcher.check(versions(1), now=5)
+    watcher.check(versions(1), now=10)
+    assert resynced(subscription)
+
+    # Another change nobody published: deferred until the window has passed
+    watcher.check(versions(2), now=15)
+    watcher.check(versions(2), now=20)
+    assert not resynced(subscription)
+    watcher.check(versions(2), now=40)
+    assert resynced(subscription)
+
+
+def test_commits_note_their_versions(client, auth, users, monkeypatch):
+    broker = app_module.event_broker
+    monkeypatch.setattr(broker, '_watcher', VersionWatcher(broker, None, None, 5))
+    create_entry(client, auth['worker'], date(2025, 3, 3))
+    assert broker._delivered_versions['time_entries'] == {1}
+
+
+def test_payloads_fit_in_a_notification():
+    event = ('time_entry', {'notes': 'x' * 1000}, [1], ['Ops'])
+    payloads = pack_payloads('a', [event] * 20, {'time_entries': [7]})
+    assert len(payloads) > 1
+    assert all(len(payload) <= MAX_PAYLOAD_BYTES for payload in payloads)
+
+    sender, receiver = EventBroker(), EventBroker()
+    subscription, _ = receiver.subscribe('admin', 'IT', 1)
+    EventRelay(receiver, None).deliver(pack_payloads(sender.stream_id, [event] * 20, {}))
+    frames, overflowed = subscription.wait(0)
+    assert len(frames) == 20 and not overflowed
+
+    # Too large for one notification: a resync instead
+    huge = ('time_entry', {'notes': 'x' * MAX_PAYLOAD_BYTES}, [1], ['Ops'])
+    EventRelay(receiver, None).deliver(pack_payloads(sender.stream_id, [huge], {}))
+    assert subscription.wait(0) == ([], True)
+
+
+def test_workers_relay_events_over_notify(app, db, users):
+    if db.engine.dialect.name != 'postgresql':
+        pytest.skip('LISTEN/NOTIFY needs PostgreSQL')
+    sender, receiver = EventBroker(), EventBroker()
+    sender.relay, receiver.relay = EventRelay(sender, db), EventRelay(receiver, db)
+    receiver.relay.start_listening(app)
+    subscription, _ = receiver.subscribe('manager', 'Ops', users['manager'])
+    time.sleep(0.5)
+
+    sender.publish('time_entry', {'action': 'created'}, user_ids=(users['worker'],), departments=('Ops',))
+    sender.publish('time_entry', {'action': 'created'}, user_ids=(users['worker2'],), departments=('IT',))
+    frames, overflowed = subscription.wait(5)
+    assert len(frames) == 1 and 'created' in frames[0] and not overflowed
+    # The IT event gives this subscriber no frame and may still be on its way
+    deadline = time.monotonic() + 5
+    while receiver.relay.received < 2 and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert receiver.relay.received == 2
+    receiver.unsubscribe(subscription)
+
+
+def test_writes_skip_events_while_no_worker_has_streams(monkeypatch):
+    broker = EventBroker()
+    broker.relay = EventRelay(broker, None)
+    # Not listening yet: other workers may have streams
+    assert broker.active()
+
+    broker.relay._connected_at = time.monotonic() - event_relay.WARMUP_SECONDS
+    assert not broker.active()
+    broker.relay.deliver(['{"o":"other","s":true}'])
+    assert broker.active() and broker.stats()['remote_workers_with_streams'] == 1
+    broker.relay.deliver(['{"o":"other","s":false}'])
+    assert not broker.active()
+
+    # Announcements expire when a worker stops repeating them
+    broker.relay.deliver(['{"o":"other","s":true}'])
+    later = time.monotonic() + event_relay.ANNOUNCE_SECONDS * event_relay.ANNOUNCE_MISSES + 1
+    monkeypatch.setattr(event_relay.time, 'monotonic', lambda: later)
+    assert not broker.active()
+    assert broker.relay.received == 0
+
+
+def test_workers_announce_their_streams(app, db, users, monkeypatch):
+    if db.engine.dialect.name != 'postgresql':
+        pytest.skip('LISTEN/NOTIFY needs PostgreSQL')
+    monkeypatch.setattr(event_relay, 'WARMUP_SECONDS', 0.5)
+    writer, reader = EventBroker(), EventBroker()
+    writer.relay, reader.relay = EventRelay(writer, db), EventRelay(reader, db)
+    writer.relay.start_listening(app)
+    reader.relay.start_listening(app)
+
+    def wait_for(expected):
+        deadline = time.monotonic() + 5
+        while writer.active() != expected and time.monotonic() < deadline:
+            time.sleep(0.05)
+        return writer.active()
+
+    assert wait_for(False) is False
+    subscription, _ = reader.subscribe('admin', 'IT', users['admin'])
+    assert wait_for(True) is True
+    reader.unsubscribe(subscription)
+    assert wait_for(False) is False
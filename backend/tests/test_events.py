@@ -0,0 +1,95 @@
+import json
+from datetime import date
+
+import app as app_module
+from conftest import create_entry
+from src.stream_tickets import issue_ticket, stream_tickets
+
+
+def ticket(client, headers):
+    response = client.post('/api/events/ticket', headers=headers)
+    assert response.status_code == 201, response.get_json()
+    return response.get_json()['ticket']
+
+
+def open_stream(client, headers):
+    response = client.get(f'/api/events?ticket={ticket(client, headers)}', buffered=False)
+    assert response.status_code == 200, response.get_json()
+    chunks = iter(response.response)
+    assert next(chunks).startswith(b'retry:')
+    return response, chunks
+
+
+def next_events(chunks):
+    """[(event type, data)] of the next chunk the stream sends"""
+    events = []
+    for frame in next(chunks).decode('utf-8').strip().split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in frame.split('\n') if not line.startswith(':'))
+        if 'event' in fields:
+            events.append((fields['event'], json.loads(fields['data'])))
+    return events
+
+
+def test_streams_open_with_a_one_use_ticket(client, auth, users):
+    assert client.get('/api/events').status_code == 401
+    token = auth['worker']['Authorization'].split()[1]
+    # The JWT itself is no longer accepted in the URL
+    assert client.get(f'/api/events?jwt={token}').status_code == 401
+
+    value = ticket(client, auth['worker'])
+    response = client.get(f'/api/events?ticket={value}', buffered=False)
+    assert response.status_code == 200
+    response.close()
+    assert client.get(f'/api/events?ticket={value}').status_code == 401
+
+
+def test_expired_tickets_are_refused(client, users, db):
+    value = issue_ticket(db, users['worker'], 'worker', 'Ops', ttl=-1)
+    assert client.get(f'/api/events?ticket={value}').status_code == 401
+    # Issuing a ticket clears the expired ones
+    issue_ticket(db, users['worker'], 'worker', 'Ops')
+    assert db.session.execute(db.select(db.func.count()).select_from(stream_tickets)).scalar() == 1
+
+
+def test_events_are_scoped_by_role(client, auth, users):
+    streams = {name: open_stream(client, auth[name]) for name in ('admin', 'manager', 'worker')}
+    try:
+        create_entry(client, auth['worker'], date(2025, 3, 3))
+        create_entry(client, auth['worker2'], date(2025, 3, 3))
+        seen = {
+            name: {data['time_entry']['user_id'] for kind, data in next_events(chunks) if kind == 'time_entry'}
+            for name, (_, chunks) in streams.items()
+        }
+    finally:
+        for response, _ in streams.values():
+            response.close()
+    assert seen == {
+        'admin': {users['worker'], users['worker2']},
+        'manager': {users['worker']},
+        'worker': {users['worker']},
+    }
+
+
+def test_ticket_scope_comes_from_the_database(client, auth, users, db):
+    # The manager's token still says Ops
+    db.session.execute(db.update(app_module.User).where(app_module.User.id == users['manager']).values(department='IT'))
+    db.session.commit()
+    response, chunks = open_stream(client, auth['manager'])
+    try:
+        create_entry(client, auth['worker'], date(2025, 3, 3))
+        create_entry(client, auth['worker2'], date(2025, 3, 3))
+        events = next_events(chunks)
+    finally:
+        response.close()
+    assert {data['time_entry']['user_id'] for kind, data in events} == {users['worker2']}
+
+
+def test_streams_follow_the_actual_gunicorn_worker(client, monkeypatch):
+    monkeypatch.setenv('GUNICORN_WORKER_CLASS', 'gevent')
+    sync_worker = {'SERVER_SOFTWARE': 'gunicorn/21.2.0', 'wsgi.multithread': False}
+    assert client.get('/api/events', environ_overrides=sync_worker).status_code == 503
+
+    monkeypatch.setenv('GUNICORN_WORKER_CLASS', 'sync')
+    threaded_worker = dict(sync_worker, **{'wsgi.multithread': True})
+    # Accepted, then rejected for the missing ticket
+    assert client.get('/api/events', environ_overrides=threaded_worker).status_code == 401
@@ -0,0 +1,60 @@
+import csv
+import io
+import json
+from datetime import date
+
+from conftest import create_entry
+
+
+def test_csv_export_has_header_and_one_line_per_entry(client, auth, users):
+    create_entry(client, auth['worker'], date(2025, 1, 2), notes='first, "quoted"')
+    create_entry(client, auth['worker2'], date(2025, 1, 3))
+
+    response = client.get('/api/time-entries/export?format=csv', headers=auth['admin'])
+    assert response.status_code == 200
+    assert response.mimetype == 'text/csv'
+    assert 'attachment; filename="time_entries_' in response.headers['Content-Disposition']
+
+    rows = list(csv.reader(io.StringIO(response.get_data(as_text=True))))
+    assert rows[0] == ['id', 'user_id', 'date', 'check_in', 'check_out', 'total_hours', 'notes', 'created_at']
+    assert len(rows) == 3
+    assert {r[6] for r in rows[1:]} == {'first, "quoted"', ''}
+
+
+def test_ndjson_export_is_scoped_by_role(client, auth, users):
+    create_entry(client, auth['worker'], date(2025, 1, 2))
+    create_entry(client, auth['worker2'], date(2025, 1, 3))
+
+    response = client.get('/api/time-entries/export?format=ndjson', headers=auth['manager'])
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [line['user_id'] for line in lines] == [users['worker']]
+
+
+def test_export_rejects_unknown_format(client, auth):
+    assert client.get('/api/time-entries/export?format=xml', headers=auth['admin']).status_code == 400
+
+
+def test_failure_after_streaming_started_ends_with_an_error_marker(client, auth, users, monkeypatch):
+    import src.export as export
+    create_entry(client, auth['worker'], date(2025, 1, 2))
+    create_entry(client, auth['worker'], date(2025, 1, 3))
+
+    real = export.time_entry_row_to_dict
+    calls = []
+
+    def fail_on_second_row(row):
+        calls.append(row)
+        if len(calls) == 2:
+            raise RuntimeError('connection lost')
+        return real(row)
+
+    monkeypatch.setattr(export, 'time_entry_row_to_dict', fail_on_second_row)
+
+    lines = client.get('/api/time-entries/export?format=csv', headers=auth['admin']).get_data(as_text=True).splitlines()
+    assert len(lines) == 3
+    assert lines[-1].startswith(export.EXPORT_ERROR_MARKER + ',')
+    assert 'connection lost' in lines[-1]
+
+    calls.clear()
+    lines = client.get('/api/time-entries/export?format=ndjson', headers=auth['admin']).get_data(as_text=True).splitlines()
+    assert json.loads(lines[-1])['error'] == export.EXPORT_ERROR_MARKER
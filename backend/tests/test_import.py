@@ -0,0 +1,95 @@
+import io
+import json
+
+import app as app_module
+from src.bulk_import import import_time_entries, iter_records
+
+
+def upload(client, headers, body, name='entries.csv', query=''):
+    return client.post(
+        f'/api/time-entries/import{query}', headers=headers,
+        data={'file': (io.BytesIO(body.encode()), name)}
+    )
+
+
+def listed(client, headers):
+    return client.get('/api/time-entries', headers=headers).get_json()['time_entries']
+
+
+def test_csv_import_inserts_valid_rows_and_reports_the_rest(client, auth, users):
+    worker = users['worker']
+    body = (
+        'user_id,date,check_in,check_out,total_hours,notes\n'
+        f'{worker},2025-03-03,2025-03-03T08:00:00,2025-03-03T12:30:00,,first\n'
+        f'{worker},03/04/2025,2025-03-04T08:00:00,,,\n'
+        f'999999,2025-03-05,2025-03-05T08:00:00,,,\n'
+        f'{worker},2025-03-06,2025-03-06T08:00:00,2025-03-06T07:00:00,,\n'
+        f'{worker},2025-03-07,2025-03-07T08:00:00,,,\n'
+    )
+    response = upload(client, auth['admin'], body)
+    assert response.status_code == 200
+    result = response.get_json()
+    assert (result['inserted'], result['rejected']) == (2, 3)
+    assert [error['line'] for error in result['errors']] == [3, 4, 5]
+    assert result['errors'][2]['errors'] == ['check_out is before check_in']
+
+    entries = {entry['date']: entry for entry in listed(client, auth['worker'])}
+    assert entries['2025-03-03']['total_hours'] == 4.5
+    assert entries['2025-03-03']['notes'] == 'first'
+    # The open entry is in the presence table
+    presence = client.get('/api/presence', headers=auth['admin']).get_json()
+    assert [row['entry_id'] for row in presence['clocked_in']] == [entries['2025-03-07']['id']]
+
+
+def test_ndjson_body_and_dry_run(client, auth, users):
+    rows = [
+        {'user_id': users['worker'], 'date': '2025-03-03', 'check_in': '2025-03-03T08:00:00',
+         'check_out': '2025-03-03T16:00:00'},
+        'not an object',
+    ]
+    body = '\n'.join(json.dumps(row) for row in rows) + '\n{broken\n'
+    headers = dict(auth['admin'], **{'Content-Type': 'application/x-ndjson'})
+
+    response = client.post('/api/time-entries/import?dry_run=true', headers=headers, data=body)
+    result = response.get_json()
+    assert result['dry_run'] is True and (result['inserted'], result['rejected']) == (1, 2)
+    assert listed(client, auth['admin']) == []
+
+    result = client.post('/api/time-entries/import', headers=headers, data=body).get_json()
+    assert result['inserted'] == 1
+    assert [entry['total_hours'] for entry in listed(client, auth['admin'])] == [8.0]
+
+
+def test_one_open_entry_per_user_across_chunks(db, users):
+    worker = users['worker']
+    lines = ['user_id,date,check_in,check_out'] + [
+        f'{worker},2025-03-0{day},2025-03-0{day}T08:00:00,' for day in (3, 4, 5)
+    ]
+    records = iter_records(io.StringIO('\n'.join(lines) + '\n'), 'csv')
+    result = import_time_entries(db, app_module.User, app_module.TimeEntry, records, chunk_size=1)
+    assert (result.inserted, result.rejected) == (1, 2)
+    assert all('already has an open entry' in error['errors'][0] for error in result.errors)
+
+
+def test_import_is_admin_only_and_checks_the_format(client, auth, users):
+    assert upload(client, auth['manager'], 'user_id\n').status_code == 403
+    assert upload(client, auth['admin'], '', query='?format=xml').status_code == 400
+
+
+def test_a_failure_partway_reports_the_committed_chunks(client, auth, users, db):
+    worker = users['worker']
+    lines = ['user_id,date,check_in,check_out'] + [
+        f'{worker},2025-03-03,2025-03-03T08:00:00,2025-03-03T09:00:00' for _ in range(1500)
+    ]
+    body = ('\n'.join(lines) + '\n').encode() + b'\xff\xfe\n'
+    subscription, _ = app_module.event_broker.subscribe('admin', 'IT', users['admin'])
+    try:
+        response = client.post('/api/time-entries/import', headers=auth['admin'],
+                               data={'file': (io.BytesIO(body), 'entries.csv')})
+        assert response.status_code == 400
+        result = response.get_json()
+        assert result['message'] == 'File must be UTF-8 encoded' and result['inserted'] == 1000
+        assert subscription.wait(0)[1], 'subscribers must re-fetch the committed rows'
+    finally:
+        app_module.event_broker.unsubscribe(subscription)
+    assert db.session.query(app_module.TimeEntry).count() == 1000
@@ -0,0 +1,72 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+from conftest import create_entry
+from src.metrics import Counter, Histogram
+
+
+def scrape(client, headers=None):
+    response = client.get('/metrics', headers=headers)
+    assert response.status_code == 200
+    assert response.content_type.startswith('text/plain; version=0.0.4')
+    samples = {}
+    for line in response.get_data(as_text=True).splitlines():
+        if line and not line.startswith('#'):
+            name, value = line.rsplit(' ', 1)
+            samples[name] = float(value)
+    return samples
+
+
+def test_requests_are_counted_per_endpoint(client, auth, users):
+    create_entry(client, auth['worker'], date(2025, 3, 3))
+    before = scrape(client)
+    for _ in range(3):
+        client.get('/api/time-entries', headers=auth['worker'])
+    client.get('/api/time-entries?limit=0', headers=auth['worker'])
+    after = scrape(client)
+
+    def delta(name):
+        return after.get(name, 0) - before.get(name, 0)
+
+    assert delta('http_requests_total{endpoint="get_time_entries",method="GET",status="200"}') == 3
+    assert delta('http_requests_total{endpoint="get_time_entries",method="GET",status="400"}') == 1
+    assert delta('http_request_duration_seconds_count{endpoint="get_time_entries",method="GET"}') == 4
+    assert delta('http_request_duration_seconds_bucket{endpoint="get_time_entries",method="GET",le="+Inf"}') == 4
+    # Every listing ran SQL, and the statements are also counted globally
+    assert delta('http_request_db_statements_sum{endpoint="get_time_entries"}') >= 3
+    assert delta('db_statements_total') >= delta('http_request_db_statements_sum{endpoint="get_time_entries"}')
+
+
+def test_metrics_token(client, monkeypatch):
+    monkeypatch.setenv('METRICS_TOKEN', 'scrape-me')
+    assert client.get('/metrics').status_code == 401
+    assert 'sse_subscribers' in scrape(client, {'Authorization': 'Bearer scrape-me'})
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram('h', 'doc', (1, 5), ('endpoint',))
+    for value in (0.5, 2, 7):
+        histogram.observe(value, ('a"b',))
+    lines = histogram.render()
+    assert 'h_bucket{endpoint="a\\"b",le="1"} 1' in lines
+    assert 'h_bucket{endpoint="a\\"b",le="5"} 2' in lines
+    assert 'h_bucket{endpoint="a\\"b",le="+Inf"} 3' in lines
+    assert 'h_sum{endpoint="a\\"b"} 9.5' in lines
+
+    counter = Counter('c', 'doc')
+    counter.inc(amount=2.0)
+    assert counter.render()[-1] == 'c 2'
+
+
+def test_failed_statements_leave_no_start_time_behind(app, db):
+    with db.engine.connect() as conn:
+        for _ in range(3):
+            with pytest.raises(DBAPIError):
+                conn.execute(text('SELECT missing_column FROM users'))
+            conn.rollback()
+        assert conn.info.get('metrics_started_at') == []
+        assert conn.execute(text('SELECT 1')).scalar() == 1
+        assert conn.info['metrics_started_at'] == []
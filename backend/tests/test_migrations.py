@@ -0,0 +1,76 @@
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine, inspect, text
+
+import app as app_module
+from src import init_db
+from src.init_db import get_applied_versions, get_pending_migrations, run_migrations
+from src.migrations import MIGRATIONS
+
+LEGACY_SCHEMA = (
+    "CREATE TABLE users (id INTEGER PRIMARY KEY, name VARCHAR(100) NOT NULL, email VARCHAR(120) UNIQUE NOT NULL, "
+    "password VARCHAR(255) NOT NULL, role VARCHAR(20) NOT NULL, department VARCHAR(50) NOT NULL, "
+    "status VARCHAR(20) NOT NULL, created_at DATETIME)",
+    "CREATE TABLE time_entries (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL REFERENCES users (id), "
+    "date DATE NOT NULL, check_in DATETIME, check_out DATETIME, total_hours FLOAT, notes TEXT, created_at DATETIME)",
+    "INSERT INTO users VALUES (1, 'Old', 'old@example.com', 'old-hash', 'worker', 'Ops', 'active', '2024-01-01 00:00:00')",
+    "INSERT INTO time_entries VALUES (1, 1, '2024-05-02', '2024-05-02 08:00:00', '2024-05-02 16:00:00', 8, NULL, NULL)",
+    "INSERT INTO time_entries VALUES (2, 1, '2024-05-03', '2024-05-03 08:00:00', NULL, NULL, NULL, NULL)",
+)
+
+
+@pytest.fixture
+def legacy_db(tmp_path):
+    """A database created before the migrations existed, with some data"""
+    engine = create_engine(f'sqlite:///{tmp_path / "legacy.db"}')
+    with engine.begin() as conn:
+        for statement in LEGACY_SCHEMA:
+            conn.execute(text(statement))
+    yield SimpleNamespace(engine=engine, metadata=app_module.db.metadata)
+    engine.dispose()
+
+
+def test_migrations_are_applied_once(db):
+    assert run_migrations(db) == []
+    assert get_pending_migrations(db) == []
+    assert get_applied_versions(db) == {version for version, _, _ in MIGRATIONS}
+
+
+def test_legacy_database_is_migrated_in_place(legacy_db):
+    assert run_migrations(legacy_db) == [version for version, _, _ in MIGRATIONS]
+    assert run_migrations(legacy_db) == []
+
+    with legacy_db.engine.connect() as conn:
+        assert conn.execute(text("SELECT users_password FROM users")).scalar() == 'old-hash'
+        columns = {c['name'] for c in inspect(conn).get_columns('time_entries')}
+        assert {'updated_at', 'change_version'} <= columns
+        indexes = {index['name'] for index in inspect(conn).get_indexes('time_entries')}
+        assert 'ix_time_entries_user_id_date' in indexes and 'ix_time_entries_user_id_check_in' not in indexes
+        # The rollups are built from the entries already there
+        assert conn.execute(text("SELECT total_hours, entries, open_entries FROM daily_hours ORDER BY date")).all() == [
+            (8, 1, 0), (0, 1, 1)
+        ]
+        assert conn.execute(text("SELECT user_id, entry_id FROM presence")).all() == [(1, 2)]
+
+
+def test_failed_migration_is_retried(legacy_db, monkeypatch):
+    attempts = []
+
+    def flaky(conn, db):
+        attempts.append(1)
+        conn.execute(text("INSERT INTO users (id, name, email, password, role, department, status) "
+                          "VALUES (2, 'New', 'new@example.com', 'x', 'worker', 'IT', 'active')"))
+        if len(attempts) == 1:
+            raise RuntimeError('boom')
+
+    monkeypatch.setattr(init_db, 'MIGRATIONS', [MIGRATIONS[0], (999, 'Flaky', flaky)])
+    with pytest.raises(RuntimeError):
+        run_migrations(legacy_db)
+    assert get_applied_versions(legacy_db) == {1}
+    with legacy_db.engine.connect() as conn:
+        # Rolled back together with its schema_migrations row
+        assert conn.execute(text("SELECT count(*) FROM users")).scalar() == 1
+
+    assert run_migrations(legacy_db) == [999]
+    assert get_applied_versions(legacy_db) == {1, 999}
@@ -0,0 +1,62 @@
+from datetime import date, timedelta
+
+from conftest import create_entry
+
+
+def fetch_all_pages(client, headers, query, limit):
+    ids, cursor = [], None
+    while True:
+        url = f'/api/time-entries?limit={limit}{query}' + (f'&cursor={cursor}' if cursor else '')
+        body = client.get(url, headers=headers).get_json()
+        ids.extend(e['id'] for e in body['time_entries'])
+        cursor = body['next_cursor']
+        if not cursor:
+            return ids
+
+
+def test_keyset_pages_cover_the_full_list_once(client, auth, users):
+    for i in range(7):
+        create_entry(client, auth['admin'], date(2025, 1, 1) + timedelta(days=i), user_id=users['worker'])
+    # Same check_in as an existing entry: the id breaks the tie
+    create_entry(client, auth['admin'], date(2025, 1, 3), user_id=users['worker2'])
+
+    full = client.get('/api/time-entries', headers=auth['admin']).get_json()
+    assert full['next_cursor'] is None
+    expected = [e['id'] for e in full['time_entries']]
+    assert len(expected) == 8
+
+    assert fetch_all_pages(client, auth['admin'], '', 3) == expected
+
+
+def test_filters(client, auth, users):
+    for i in range(5):
+        create_entry(client, auth['admin'], date(2025, 2, 1) + timedelta(days=i), user_id=users['worker'])
+    create_entry(client, auth['admin'], date(2025, 2, 2), user_id=users['worker2'], open_entry=True)
+
+    def dates(query):
+        body = client.get(f'/api/time-entries?{query}', headers=auth['admin']).get_json()
+        return sorted(e['date'] for e in body['time_entries'])
+
+    assert dates('date_from=2025-02-02&date_to=2025-02-03') == ['2025-02-02', '2025-02-02', '2025-02-03']
+    assert dates(f"user_id={users['worker2']}") == ['2025-02-02']
+    assert dates('open_only=true') == ['2025-02-02']
+    assert dates('department=IT') == ['2025-02-02']
+
+
+def test_include_user_embeds_the_owner(client, auth, users):
+    create_entry(client, auth['worker'], date(2025, 3, 1))
+    entry = client.get('/api/time-entries?include=user', headers=auth['worker']).get_json()['time_entries'][0]
+    assert entry['user'] == {'id': users['worker'], 'name': 'Worker', 'department': 'Ops'}
+
+
+def test_invalid_arguments_answer_400(client, auth):
+    for query in ('cursor=not-a-cursor', 'limit=0', 'date_from=01-02-2025', 'user_id=abc'):
+        assert client.get(f'/api/time-entries?{query}', headers=auth['admin']).status_code == 400, query
+    for limit in ('0', 'abc'):
+        response = client.get(f'/api/time-entries?limit={limit}', headers=auth['admin'])
+        assert response.get_json()['message'] == 'limit must be a positive integer'
+
+
+def test_page_size_is_capped(client, auth):
+    body = client.get('/api/time-entries?limit=100000', headers=auth['admin']).get_json()
+    assert body['time_entries'] == [] and body['next_cursor'] is None
@@ -0,0 +1,86 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import inspect, text
+
+import app as app_module
+from conftest import create_entry
+from src.partitions import ensure_partitions, is_partitioned, listing_windows
+from test_pagination import fetch_all_pages
+
+MONTHLY_WINDOWS = [(date(2025, 3, 1), None), (date(2025, 2, 1), date(2025, 3, 1)), (None, date(2025, 2, 1))]
+
+
+@pytest.fixture
+def pg_conn(db):
+    """A connection to the partitioned table; everything it does is rolled back"""
+    if db.engine.dialect.name != 'postgresql':
+        pytest.skip('time_entries is only partitioned on PostgreSQL')
+    with db.engine.connect() as conn:
+        yield conn
+        conn.rollback()
+
+
+def test_windowed_pages_match_the_unwindowed_listing(client, auth, users, monkeypatch):
+    for day in (date(2025, 1, 30), date(2025, 2, 1), date(2025, 2, 14), date(2025, 3, 2), date(2025, 3, 9)):
+        create_entry(client, auth['admin'], day, user_id=users['worker'])
+    create_entry(client, auth['admin'], date(2025, 2, 14), user_id=users['worker2'])
+    expected = fetch_all_pages(client, auth['admin'], '', 100)
+    assert len(expected) == 6
+
+    monkeypatch.setattr(app_module, 'listing_windows', lambda conn, newest=None, oldest=None: MONTHLY_WINDOWS)
+    # Pages that end inside a window and pages that span several
+    for limit in (1, 2, 4):
+        assert fetch_all_pages(client, auth['admin'], '', limit) == expected
+
+
+def test_unpartitioned_tables_are_read_in_one_window(db):
+    if db.engine.dialect.name == 'postgresql':
+        pytest.skip('time_entries is partitioned on PostgreSQL')
+    with db.engine.connect() as conn:
+        assert listing_windows(conn) == [(None, None)]
+
+
+def test_partitioned_table_keeps_every_column(pg_conn):
+    assert is_partitioned(pg_conn)
+    columns = {column['name'] for column in inspect(pg_conn).get_columns('time_entries')}
+    assert {'updated_at', 'change_version', 'notes', 'created_at'} <= columns
+
+
+def test_listing_windows_follow_the_partitions(pg_conn):
+    ensure_partitions(pg_conn, date(2025, 1, 1), date(2025, 4, 1))
+    windows = listing_windows(pg_conn, newest=date(2025, 3, 20), oldest=date(2025, 2, 10), today=date(2025, 4, 15))
+    assert windows == [(date(2025, 3, 1), date(2025, 4, 1)), (date(2025, 2, 1), date(2025, 3, 1))]
+
+    plan = '\n'.join(row[0] for row in pg_conn.execute(text(
+        "EXPLAIN SELECT id FROM time_entries WHERE date >= '2025-02-01' AND date < '2025-03-01' "
+        "ORDER BY date DESC, check_in DESC NULLS FIRST, id DESC LIMIT 101"
+    )))
+    assert 'time_entries_2025_02' in plan
+    assert 'time_entries_2025_03' not in plan and 'time_entries_default' not in plan
+
+
+def test_archiving_moves_closed_months_and_merges_their_summaries(app, client, auth, users, db):
+    create_entry(client, auth['worker'], date(2025, 1, 6), hours=8)
+    create_entry(client, auth['worker'], date(2025, 1, 7), hours=7.5)
+    create_entry(client, auth['worker'], date(2025, 2, 3), open_entry=True)
+    recent = create_entry(client, auth['worker'], date.today())
+
+    def archive():
+        result = app.test_cli_runner().invoke(args=['archive-time-entries', '--keep-months', '3'])
+        assert result.exit_code == 0, result.output
+        return result.output
+
+    output = archive()
+    assert '2025-01: 2 entries archived' in output and '2025-02 still has open entries' in output
+    listed = client.get('/api/time-entries', headers=auth['worker']).get_json()['time_entries']
+    assert sorted(entry['date'] for entry in listed) == ['2025-02-03', recent['date']]
+
+    # A late entry for an archived month is added to its summary
+    create_entry(client, auth['worker'], date(2025, 1, 8), hours=4)
+    archive()
+    with db.engine.connect() as conn:
+        assert conn.execute(text("SELECT count(*) FROM time_entries_archive")).scalar() == 3
+        summaries = conn.execute(text("SELECT user_id, entries, total_hours FROM time_entry_monthly_summaries")).all()
+        assert summaries == [(users['worker'], 3, 19.5)]
+        assert conn.execute(text("SELECT count(*) FROM daily_hours WHERE date < '2025-02-01'")).scalar() == 0
@@ -0,0 +1,73 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import app as app_module
+from conftest import PASSWORD
+from src.password_hashing import PasswordHasher, PasswordHasherBusy
+
+
+class BarrierBcrypt:
+    """Each check waits until `parties` checks run at the same time"""
+    def __init__(self, parties):
+        self.barrier = threading.Barrier(parties, timeout=5)
+
+    def check_password_hash(self, pw_hash, password):
+        self.barrier.wait()
+        return pw_hash == password
+
+
+def login(client, password=PASSWORD):
+    return client.post('/api/auth/login', json={'email': 'worker@test.local', 'password': password})
+
+
+def test_login_checks_the_password(client, users):
+    assert login(client).status_code == 200
+    assert login(client, 'wrong').status_code == 401
+
+
+def test_login_upgrades_hashes_with_another_work_factor(client, users, db):
+    user = db.session.get(app_module.User, users['worker'])
+    user.users_password = app_module.bcrypt.generate_password_hash(PASSWORD, 5).decode('utf-8')
+    db.session.commit()
+
+    assert login(client).status_code == 200
+    db.session.expire_all()
+    new_hash = db.session.get(app_module.User, users['worker']).users_password
+    assert new_hash.startswith('$2b$04$') and app_module.bcrypt.check_password_hash(new_hash, PASSWORD)
+
+
+def test_full_queue_answers_503(client, users, monkeypatch):
+    monkeypatch.setattr(app_module.password_hasher, 'max_queue', 0)
+    response = login(client)
+    assert response.status_code == 503 and response.headers['Retry-After'] == '1'
+
+
+def test_hashes_run_in_parallel():
+    hasher = PasswordHasher(BarrierBcrypt(3), 4, max_workers=3)
+    with ThreadPoolExecutor(3) as callers:
+        results = list(callers.map(lambda i: hasher.verify('pw', 'pw'), range(3)))
+    assert results == [True] * 3
+    assert hasher.stats()['completed'] == 3 and hasher.stats()['queue_depth'] == 0
+
+
+def test_slow_hashes_time_out():
+    hasher = PasswordHasher(BarrierBcrypt(2), 4, max_workers=2, timeout=0.1)
+    with pytest.raises(PasswordHasherBusy):
+        hasher.verify('pw', 'pw')
+    assert hasher.stats()['rejected'] == 1
+    # Lets the stuck job finish
+    hasher.bcrypt.barrier.abort()
+
+
+def test_a_failed_submit_frees_its_queue_slot():
+    hasher = PasswordHasher(BarrierBcrypt(1), 4, max_workers=1, max_queue=1)
+    hasher._get_executor().shutdown()
+    for _ in range(3):
+        with pytest.raises(RuntimeError):
+            hasher.verify('pw', 'pw')
+    assert hasher.stats()['queue_depth'] == 0
+
+    hasher._executor = None
+    assert hasher.verify('pw', 'pw')
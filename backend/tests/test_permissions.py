@@ -0,0 +1,56 @@
+from datetime import date
+
+import app as app_module
+from conftest import create_entry
+from src.change_versions import bump_versions
+
+
+def listed_user_ids(client, headers, query=''):
+    response = client.get(f'/api/time-entries{query}', headers=headers)
+    assert response.status_code == 200
+    return {entry['user_id'] for entry in response.get_json()['time_entries']}
+
+
+def move_user(db, user_id, department):
+    """Changes a department like update_user in another worker, which leaves this worker's cache alone"""
+    db.session.execute(db.update(app_module.User).where(app_module.User.id == user_id).values(department=department))
+    bump_versions(db, 'users')
+    db.session.commit()
+
+
+def test_listing_is_scoped_by_role(client, auth, users):
+    for name in ('manager', 'worker', 'worker2'):
+        create_entry(client, auth[name], date(2025, 3, 3))
+
+    assert listed_user_ids(client, auth['worker']) == {users['worker']}
+    assert listed_user_ids(client, auth['manager']) == {users['manager'], users['worker']}
+    assert listed_user_ids(client, auth['admin']) == {users['manager'], users['worker'], users['worker2']}
+    assert listed_user_ids(client, auth['admin'], '?department=IT') == {users['worker2']}
+    # Only admins can pick another department
+    assert listed_user_ids(client, auth['manager'], '?department=IT') == {users['manager'], users['worker']}
+
+
+def test_manager_can_only_change_entries_of_others_in_the_department(client, auth, users):
+    own = create_entry(client, auth['manager'], date(2025, 3, 3))
+    ops = create_entry(client, auth['worker'], date(2025, 3, 3))
+    it = create_entry(client, auth['worker2'], date(2025, 3, 3))
+
+    assert client.put(f"/api/time-entries/{own['id']}", headers=auth['manager'], json={'notes': 'x'}).status_code == 403
+    assert client.put(f"/api/time-entries/{it['id']}", headers=auth['manager'], json={'notes': 'x'}).status_code == 403
+    assert client.delete(f"/api/time-entries/{it['id']}", headers=auth['manager']).status_code == 403
+    assert client.put(f"/api/time-entries/{ops['id']}", headers=auth['manager'], json={'notes': 'x'}).status_code == 200
+    assert client.delete(f"/api/time-entries/{ops['id']}", headers=auth['manager']).status_code == 200
+    assert client.put(f"/api/time-entries/{it['id']}", headers=auth['worker'], json={'notes': 'x'}).status_code == 403
+
+
+def test_permissions_follow_user_changes_made_by_other_workers(client, auth, users, db):
+    entry = create_entry(client, auth['worker'], date(2025, 3, 3))
+    # Warm this worker's cache, then move the user elsewhere
+    assert client.get('/api/auth/me', headers=auth['worker']).get_json()['user']['department'] == 'Ops'
+    assert client.put(f"/api/time-entries/{entry['id']}", headers=auth['manager'], json={'notes': 'x'}).status_code == 200
+    listed_user_ids(client, auth['manager'])
+    move_user(db, users['worker'], 'Sales')
+
+    assert users['worker'] not in listed_user_ids(client, auth['manager'])
+    assert client.put(f"/api/time-entries/{entry['id']}", headers=auth['manager'], json={'notes': 'x'}).status_code == 403
+    assert client.delete(f"/api/time-entries/{entry['id']}", headers=auth['manager']).status_code == 403
@@ -0,0 +1,71 @@
+from datetime import date
+
+import app as app_module
+from conftest import create_entry
+from src.presence import presence, rebuild_presence
+
+
+def clocked_in(client, headers, query=''):
+    response = client.get(f'/api/presence{query}', headers=headers)
+    assert response.status_code == 200
+    return {row['user_id']: row['entry_id'] for row in response.get_json()['clocked_in']}
+
+
+def test_clocking_in_and_out(client, auth, users):
+    entry = create_entry(client, auth['worker'], date(2025, 3, 3), open_entry=True)
+    assert clocked_in(client, auth['worker']) == {users['worker']: entry['id']}
+
+    response = client.post('/api/time-entries', headers=auth['worker'],
+                           json={'date': '2025-03-04', 'check_in': '2025-03-04T08:00:00'})
+    assert response.status_code == 400
+    assert response.get_json()['open_entry']['id'] == entry['id']
+
+    # Checking out on the same date closes the open entry
+    closed = create_entry(client, auth['worker'], date(2025, 3, 3))
+    assert closed['id'] == entry['id']
+    assert clocked_in(client, auth['worker']) == {}
+    create_entry(client, auth['worker'], date(2025, 3, 4), open_entry=True)
+
+
+def test_presence_is_scoped_by_role(client, auth, users):
+    for name in ('manager', 'worker', 'worker2'):
+        create_entry(client, auth[name], date(2025, 3, 3), open_entry=True)
+
+    assert set(clocked_in(client, auth['admin'])) == {users['manager'], users['worker'], users['worker2']}
+    assert set(clocked_in(client, auth['admin'], '?department=IT')) == {users['worker2']}
+    assert set(clocked_in(client, auth['manager'])) == {users['manager'], users['worker']}
+    assert set(clocked_in(client, auth['worker'])) == {users['worker']}
+
+
+def test_deleting_or_closing_an_open_entry_clocks_the_user_out(client, auth, users):
+    first = create_entry(client, auth['worker'], date(2025, 3, 3), open_entry=True)
+    assert client.delete(f"/api/time-entries/{first['id']}", headers=auth['manager']).status_code == 200
+    assert clocked_in(client, auth['admin']) == {}
+
+    second = create_entry(client, auth['worker'], date(2025, 3, 4), open_entry=True)
+    response = client.put(f"/api/time-entries/{second['id']}", headers=auth['manager'],
+                          json={'check_out': '2025-03-04T12:00:00'})
+    assert response.status_code == 200
+    assert clocked_in(client, auth['admin']) == {}
+
+
+def test_rebuild_matches_the_maintained_table(client, auth, users, db):
+    for name in ('worker', 'worker2'):
+        create_entry(client, auth[name], date(2025, 3, 3), open_entry=True)
+    create_entry(client, auth['manager'], date(2025, 3, 3))
+    maintained = clocked_in(client, auth['admin'])
+
+    db.session.execute(presence.delete())
+    rebuild_presence(db.session.connection(), app_module.TimeEntry.__table__)
+    db.session.commit()
+    assert clocked_in(client, auth['admin']) == maintained
+
+
+def test_revalidated_presence_carries_nothing_time_dependent(client, auth, users):
+    create_entry(client, auth['worker'], date(2025, 3, 3), open_entry=True)
+    response = client.get('/api/presence', headers=auth['worker'])
+    assert set(response.get_json()['clocked_in'][0]) == {
+        'user_id', 'name', 'department', 'entry_id', 'date', 'check_in'
+    }
+    headers = dict(auth['worker'], **{'If-None-Match': response.headers['ETag']})
+    assert client.get('/api/presence', headers=headers).status_code == 304
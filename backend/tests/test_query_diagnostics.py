@@ -0,0 +1,61 @@
+from types import SimpleNamespace
+
+import pytest
+from flask import Flask
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import DBAPIError
+
+from src.query_diagnostics import QueryDiagnostics
+
+HASH = '$2b$04$abcdefghijklmnopqrstuuTfJ0vQ0bS8j1o1fS0rYxq1cA5m2Zy3e'
+
+
+def diagnostics_app(**options):
+    engine = create_engine('sqlite://')
+    with engine.begin() as conn:
+        conn.execute(text('CREATE TABLE users (id INTEGER PRIMARY KEY, users_password VARCHAR(255))'))
+        conn.execute(text('INSERT INTO users VALUES (1, :hash), (2, :hash), (3, :hash)'), {'hash': HASH})
+    app = Flask(__name__)
+
+    @app.route('/users')
+    def list_users():
+        with engine.connect() as conn:
+            for user_id in (1, 2, 3):
+                conn.execute(text('SELECT id FROM users WHERE id = :id'), {'id': user_id})
+            conn.execute(text('SELECT id FROM users WHERE users_password = :hash'), {'hash': HASH})
+        return 'ok'
+
+    diagnostics = QueryDiagnostics(**options)
+    diagnostics.init_app(app, SimpleNamespace(engine=engine))
+    return app, diagnostics
+
+
+def test_repeated_statements_are_reported(capsys):
+    app, diagnostics = diagnostics_app(n_plus_one_threshold=3)
+    assert app.test_client().get('/users').status_code == 200
+    out = capsys.readouterr().out
+    assert '3x the same statement' in out and 'GET /users -> list_users' in out
+    assert 'users_password' not in out
+    assert diagnostics.stats()['n_plus_one_warnings'] == 1 and diagnostics.stats()['slow_queries'] == 0
+
+
+def test_slow_queries_are_logged_with_redacted_params_and_plan(capsys):
+    app, diagnostics = diagnostics_app(slow_query_ms=0, explain=True)
+    app.test_client().get('/users')
+    out = capsys.readouterr().out
+    assert diagnostics.stats()['slow_queries'] == 4
+    assert 'Params: [1]' in out
+    assert '<redacted>' in out and HASH not in out
+    assert 'Plan:' in out and 'SEARCH users' in out and 'Plan unavailable' not in out
+    # The plans do not count as queries of their own
+    assert out.count('Slow query') == 4
+
+
+def test_failed_statements_leave_no_start_time_behind():
+    engine = create_engine('sqlite://')
+    QueryDiagnostics(slow_query_ms=1000).init_app(Flask(__name__), SimpleNamespace(engine=engine))
+    with engine.connect() as conn:
+        for _ in range(3):
+            with pytest.raises(DBAPIError):
+                conn.execute(text('SELECT * FROM missing_table'))
+        assert conn.info['diagnostics_started_at'] == []
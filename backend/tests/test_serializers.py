@@ -0,0 +1,39 @@
+from datetime import date
+
+import pytest
+from flask import jsonify
+
+import app as app_module
+from conftest import create_entry
+from src import serializers
+from src.serializers import dumps, serialize_time_entries, serialize_users, time_entry_columns, user_columns
+
+PAYLOAD = {'notes': 'Café ☕ 𝄞 "quoted"\n', 'hours': 7.25, 'none': None, 'nested': [{'b': 1, 'a': True}]}
+
+
+def test_rows_serialize_like_to_dict(client, auth, users, db):
+    create_entry(client, auth['worker'], date(2025, 3, 3), hours=7.5, notes='Réunion')
+    create_entry(client, auth['worker2'], date(2025, 3, 4), open_entry=True)
+    User, TimeEntry = app_module.User, app_module.TimeEntry
+
+    entries = TimeEntry.query.order_by(TimeEntry.id).all()
+    rows = db.session.query(*time_entry_columns(TimeEntry)).order_by(TimeEntry.id).all()
+    assert serialize_time_entries(rows) == [entry.to_dict() for entry in entries]
+
+    owned = db.session.query(*time_entry_columns(TimeEntry, User)).join(User).order_by(TimeEntry.id).all()
+    for data, entry in zip(serialize_time_entries(owned), entries):
+        assert data['user'] == {'id': entry.user_id, 'name': entry.user.name, 'department': entry.user.department}
+
+    rows = db.session.query(*user_columns(User)).order_by(User.id).all()
+    assert serialize_users(rows) == [user.to_dict() for user in User.query.order_by(User.id)]
+
+
+@pytest.mark.parametrize('use_orjson', [True, False])
+def test_dumps_matches_jsonify(app, monkeypatch, use_orjson):
+    if not use_orjson:
+        monkeypatch.setattr(serializers, 'orjson', None)
+    elif serializers.orjson is None:
+        pytest.skip('orjson is not installed')
+    with app.test_request_context():
+        assert serializers.json_response(PAYLOAD).get_data() == jsonify(PAYLOAD).get_data()
+    assert dumps(PAYLOAD).isascii()
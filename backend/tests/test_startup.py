@@ -0,0 +1,39 @@
+import os
+import subprocess
+import sys
+
+from conftest import BACKEND_DIR
+from data import mock_data
+
+
+def test_import_does_not_touch_the_database_or_hash_passwords():
+    # Nothing listens on port 1: any connection attempt during import would fail
+    env = dict(os.environ, DATABASE_URL='postgresql://postgres@127.0.0.1:1/nowhere')
+    script = (
+        "import app, data.mock_data as mock_data\n"
+        "assert mock_data.MOCK_USERS is None\n"
+        "phases = app.startup.report()['phases_ms']\n"
+        "assert list(phases) == ['imports', 'app_config', 'database_setup', 'routes'], phases\n"
+    )
+    result = subprocess.run([sys.executable, '-c', script], cwd=BACKEND_DIR, env=env,
+                            capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+
+
+def test_precomputed_mock_password_hashes_skip_bcrypt(monkeypatch):
+    def no_hashing(*args):
+        raise AssertionError('bcrypt should not run')
+
+    monkeypatch.setattr(mock_data, 'MOCK_USERS', None)
+    monkeypatch.setattr(mock_data.bcrypt, 'generate_password_hash', no_hashing)
+    for role in ('ADMIN', 'MANAGER', 'WORKER'):
+        monkeypatch.setenv(f'{role}_PASSWORD_HASH', f'$2b$12${role.lower()}')
+    users = mock_data.get_mock_users()
+    assert [user['password'] for user in users] == ['$2b$12$admin', '$2b$12$manager', '$2b$12$worker']
+    assert mock_data.get_mock_users() is users
+
+
+def test_health_reports_the_startup_phases(client):
+    startup = client.get('/api/health').get_json()['startup']
+    assert startup['total_ms'] >= sum(startup['phases_ms'].values()) - 1
+    assert 'database_setup' in startup['phases_ms']
@@ -0,0 +1,40 @@
+from datetime import date, datetime
+
+from conftest import create_entry
+
+
+def stats(client):
+    return client.get('/').get_json()['database']
+
+
+def test_statistics_count_users_and_entries(client, auth, users):
+    create_entry(client, auth['worker'], date(2025, 1, 2), hours=8)
+    create_entry(client, auth['worker2'], date(2025, 1, 3), hours=4)
+    create_entry(client, auth['worker'], date(2025, 1, 4), open_entry=True)
+
+    database = stats(client)
+    assert database['users'] == {'total': 4, 'admin': 1, 'manager': 1, 'worker': 2}
+    assert database['time_entries'] == {'total': 3, 'open': 1, 'closed': 2, 'total_hours_worked': 12.0}
+
+
+def test_writes_invalidate_the_cached_statistics(client, auth, users):
+    assert stats(client)['time_entries']['total'] == 0
+    assert stats(client)['stats_cached'] is True
+
+    create_entry(client, auth['worker'], date(2025, 1, 2))
+    database = stats(client)
+    assert database['stats_cached'] is False
+    assert database['time_entries']['total'] == 1
+
+
+def test_last_database_change_comes_from_the_source_tables(app, client, auth, users, db):
+    import app as app_module
+    entry = create_entry(client, auth['worker'], date(2025, 1, 2), hours=8)
+    old = datetime(2025, 1, 2, 7, 0)
+    db.session.execute(db.update(app_module.TimeEntry).where(app_module.TimeEntry.id == entry['id']).values(created_at=old))
+    db.session.execute(db.update(app_module.User).values(created_at=old))
+    db.session.commit()
+    app_module.stats_cache.invalidate()
+
+    # The rollup row was written just now; the newest data timestamp is the check-out
+    assert stats(client)['last_database_change'] == '2025-01-02T16:00:00'
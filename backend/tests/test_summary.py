@@ -0,0 +1,61 @@
+from datetime import date
+
+from conftest import create_entry
+
+
+def summary(client, headers, query=''):
+    response = client.get(f'/api/time-entries/summary{query}', headers=headers)
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()
+
+
+def seed(client, auth, users):
+    create_entry(client, auth['worker'], date(2025, 2, 27), hours=8)
+    create_entry(client, auth['worker'], date(2025, 3, 3), hours=7.5)
+    create_entry(client, auth['manager'], date(2025, 3, 4), hours=6)
+    create_entry(client, auth['worker2'], date(2025, 3, 4), hours=5)
+    create_entry(client, auth['worker2'], date(2025, 3, 5), open_entry=True)
+
+
+def test_summary_is_scoped_by_role(client, auth, users):
+    seed(client, auth, users)
+
+    own = summary(client, auth['worker'])['summary']
+    assert [(row['user_id'], row['total_hours'], row['entries']) for row in own] == [(users['worker'], 15.5, 2)]
+
+    department = summary(client, auth['manager'], '?group_by=department')['summary']
+    assert [(row['department'], row['total_hours']) for row in department] == [('Ops', 21.5)]
+
+    everyone = summary(client, auth['admin'], '?group_by=department')
+    assert {row['department']: row['total_hours'] for row in everyone['summary']} == {'Ops': 21.5, 'IT': 5}
+    assert everyone['total_hours'] == 26.5
+    it_only = summary(client, auth['admin'], '?group_by=department&department=IT')['summary']
+    assert [(row['department'], row['entries'], row['open_entries']) for row in it_only] == [('IT', 2, 1)]
+
+
+def test_summary_buckets_and_date_range(client, auth, users):
+    seed(client, auth, users)
+
+    months = summary(client, auth['worker'], '?bucket=month')['summary']
+    assert {row['bucket']: row['total_hours'] for row in months} == {'2025-02-01': 8, '2025-03-01': 7.5}
+
+    days = summary(client, auth['admin'], '?group_by=department&bucket=day&date_from=2025-03-04&date_to=2025-03-04')
+    assert sorted((row['bucket'], row['department'], row['total_hours']) for row in days['summary']) == [
+        ('2025-03-04', 'IT', 5), ('2025-03-04', 'Ops', 6)
+    ]
+
+    weeks = summary(client, auth['worker'], '?bucket=week')['summary']
+    # Thursday 27 Feb falls in the week starting Monday 24 Feb
+    assert {row['bucket']: row['total_hours'] for row in weeks} == {'2025-02-24': 8, '2025-03-03': 7.5}
+
+
+def test_open_only_summary_reads_the_entries(client, auth, users):
+    seed(client, auth, users)
+    rows = summary(client, auth['admin'], '?open_only=true')['summary']
+    assert [(row['user_id'], row['entries'], row['open_entries']) for row in rows] == [(users['worker2'], 1, 1)]
+
+
+def test_invalid_grouping_is_rejected(client, auth, users):
+    assert client.get('/api/time-entries/summary?group_by=team', headers=auth['admin']).status_code == 400
+    assert client.get('/api/time-entries/summary?bucket=year', headers=auth['admin']).status_code == 400
+    assert client.get('/api/time-entries/summary?date_from=march', headers=auth['admin']).status_code == 400
@@ -0,0 +1,36 @@
+from datetime import datetime
+
+import app as app_module
+from data.synthetic import SYNTHETIC_EMAIL_DOMAIN, generate_dataset, delete_synthetic_data
+from src.delta_sync import time_entry_tombstones
+
+
+def generate(db, users=3):
+    result = generate_dataset(
+        db, app_module.User, app_module.TimeEntry, 2, users, 0.05, 7, 'hash', end=datetime(2025, 3, 31, 18)
+    )
+    db.session.commit()
+    return result
+
+
+def test_generate_dataset_replaces_the_previous_one(db, users):
+    user_count, entry_count = generate(db)
+    assert user_count == 3 and entry_count > 0
+    assert generate(db) == (user_count, entry_count)
+    synthetic = db.session.query(app_module.User).filter(app_module.User.email.like(f'%@{SYNTHETIC_EMAIL_DOMAIN}'))
+    assert synthetic.count() == 3
+    # The regular users are left alone
+    assert db.session.query(app_module.User).count() == 3 + len(users)
+
+
+def test_delete_synthetic_data_removes_their_tombstones(client, auth, db, users):
+    generate(db)
+    entry = db.session.query(app_module.TimeEntry).join(app_module.TimeEntry.user) \
+        .filter(app_module.User.email.like(f'%@{SYNTHETIC_EMAIL_DOMAIN}')).first()
+    assert client.delete(f'/api/time-entries/{entry.id}', headers=auth['admin']).status_code == 200
+    assert db.session.execute(db.select(db.func.count()).select_from(time_entry_tombstones)).scalar() == 1
+
+    delete_synthetic_data(db, app_module.User, app_module.TimeEntry)
+    db.session.commit()
+    assert db.session.execute(db.select(db.func.count()).select_from(time_entry_tombstones)).scalar() == 0
+    assert db.session.query(app_module.TimeEntry).count() == 0
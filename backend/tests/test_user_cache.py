@@ -0,0 +1,79 @@
+from datetime import date
+
+from sqlalchemy import event
+
+import app as app_module
+from conftest import create_entry
+from src.user_cache import UserCache
+
+
+def test_entries_expire_and_the_least_recently_used_are_evicted(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr('src.user_cache.time.monotonic', lambda: now[0])
+    cache = UserCache(ttl=10, max_size=2)
+    loads = []
+
+    def get(user_id):
+        return cache.get_user(user_id, lambda: loads.append(user_id) or {'id': user_id})
+
+    get(1), get(2), get(1)
+    get(3)  # evicts 2, the least recently used
+    get(1), get(2)
+    assert loads == [1, 2, 3, 2]
+    assert cache.stats()['evictions'] == 2
+
+    now[0] += 10
+    get(2)
+    assert loads[-1] == 2 and cache.stats()['hits'] == 2
+
+    # Callers get copies and unknown users are not cached
+    get(2)['name'] = 'changed'
+    assert 'name' not in get(2)
+    assert cache.get_user(9, lambda: None) is None and cache.stats()['users'] == 2
+
+
+def test_a_new_users_version_drops_everything():
+    cache = UserCache()
+    cache.sync(1)
+    cache.get_user(1, lambda: {'id': 1, 'department': 'Ops'})
+    assert cache.get_department_ids('Ops', lambda: [1]) == {1}
+    cache.sync(1)
+    assert cache.stats()['users'] == 1 and cache.stats()['departments'] == 1
+
+    cache.sync(2)
+    assert cache.stats()['users'] == 0 and cache.stats()['departments'] == 0
+    assert cache.get_department_ids('Ops', lambda: [1, 2]) == {1, 2}
+
+    # Only the misses are loaded, in one call
+    loads = []
+    cache.get_users([1], lambda ids: loads.append(sorted(ids)) or {1: {'id': 1}})
+    users = cache.get_users([1, 2, 3], lambda ids: loads.append(sorted(ids)) or {2: {'id': 2}})
+    assert loads == [[1], [2, 3]] and sorted(users) == [1, 2]
+
+
+def test_me_is_served_from_the_cache_until_the_user_changes(client, auth, users):
+    assert client.get('/api/auth/me', headers=auth['worker']).get_json()['user']['name'] == 'Worker'
+    misses = app_module.user_cache.stats()['misses']
+    client.get('/api/auth/me', headers=auth['worker'])
+    assert app_module.user_cache.stats()['misses'] == misses
+
+    response = client.put(f"/api/users/{users['worker']}", headers=auth['admin'], json={'name': 'Renamed'})
+    assert response.status_code == 200
+    assert client.get('/api/auth/me', headers=auth['worker']).get_json()['user']['name'] == 'Renamed'
+
+
+def test_permission_checks_are_served_from_the_cache(client, auth, users, db):
+    entry = create_entry(client, auth['worker'], date(2025, 3, 3))
+    client.put(f"/api/time-entries/{entry['id']}", headers=auth['manager'], json={'notes': 'warm'})
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        response = client.put(f"/api/time-entries/{entry['id']}", headers=auth['manager'], json={'notes': 'x'})
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    assert response.status_code == 200
+    assert not [s for s in statements if 'FROM users' in s]
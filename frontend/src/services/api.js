@@ -83,4 +83,57 @@ export const timeEntriesAPI = {
   delete: (entryId) => api.delete(`/api/time-entries/${entryId}`),
 };
 
-export default api;
\ No newline at end of file
+// Live changes (Server-Sent Events). EventSource cannot send headers, and a
+// token in the URL would end up in access logs, so every connection uses a
+// one-use ticket from /api/events/ticket. Returns a function that closes the stream.
+const RECONNECT_DELAY = 3000;
+
+export const eventsAPI = {
+  subscribe: ({ onTimeEntry, onUser, onResync }) => {
+    let source = null;
+    let retryTimer = null;
+    let lastEventId = "";
+    let closed = false;
+
+    const onEvent = (handler) => (e) => {
+      if (e.lastEventId) lastEventId = e.lastEventId;
+      handler?.(JSON.parse(e.data));
+    };
+
+    const reconnect = () => {
+      if (!closed) retryTimer = setTimeout(connect, RECONNECT_DELAY);
+    };
+
+    const connect = async () => {
+      let ticket;
+      try {
+        ticket = (await api.post("/api/events/ticket")).data.ticket;
+      } catch (error) {
+        reconnect();
+        return;
+      }
+      if (closed) return;
+      const params = new URLSearchParams({ ticket });
+      // A new EventSource does not send Last-Event-ID: pass it along
+      if (lastEventId) params.set("last_event_id", lastEventId);
+      source = new EventSource(`${API_URL}/api/events?${params}`);
+      source.addEventListener("time_entry", onEvent(onTimeEntry));
+      source.addEventListener("user", onEvent(onUser));
+      source.addEventListener("resync", () => onResync?.());
+      // The browser would retry with the used ticket: reconnect with a new one
+      source.onerror = () => {
+        source.close();
+        reconnect();
+      };
+    };
+
+    connect();
+    return () => {
+      closed = true;
+      clearTimeout(retryTimer);
+      source?.close();
+    };
+  },
+};
+
+export default api;
\ No newline at end of file
@@ -0,0 +1,16 @@
+// Apply /api/events changes to the lists already in state
+
+const byNewestCheckIn = (a, b) => new Date(b.check_in) - new Date(a.check_in);
+
+export const applyTimeEntryEvent = (entries, { action, time_entry }) => {
+  const others = entries.filter((e) => e.id !== time_entry.id);
+  if (action === "deleted") return others;
+  return [time_entry, ...others].sort(byNewestCheckIn);
+};
+
+export const applyUserEvent = (users, { action, user }) => {
+  const others = users.filter((u) => u.id !== user.id);
+  if (action === "deleted") return others;
+  if (action === "updated" && others.length === users.length) return users;
+  return action === "created" ? [...others, user] : users.map((u) => (u.id === user.id ? user : u));
+};
@@ -1,6 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import { useAuth } from '../context/AuthContext';
-import { usersAPI, timeEntriesAPI } from '../services/api'; 
+import { usersAPI, timeEntriesAPI, eventsAPI } from '../services/api';
+import { applyTimeEntryEvent, applyUserEvent } from '../utils/liveUpdates';
 import {
 	formatLocalDateTime,
 	calculateDuration,
@@ -41,6 +42,17 @@ function AdminDashboard() {
 
 	useEffect(() => {
 		loadData();
+		// Pushed changes keep the lists current without re-fetching them
+		return eventsAPI.subscribe({
+			onTimeEntry: (event) => setTimeEntries((entries) => applyTimeEntryEvent(entries, event)),
+			onUser: (event) => {
+				setUsers((current) => applyUserEvent(current, event));
+				if (event.action === 'deleted') {
+					setTimeEntries((entries) => entries.filter((e) => e.user_id !== event.user.id));
+				}
+			},
+			onResync: () => loadData()
+		});
 	}, []);
 
 	const loadData = async () => {
@@ -596,4 +608,4 @@ function AdminDashboard() {
 	);
 }
 
-export default AdminDashboard;
\ No newline at end of file
+export default AdminDashboard;
\ No newline at end of file
@@ -1,6 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import { useAuth } from '../context/AuthContext';
-import { usersAPI, timeEntriesAPI } from '../services/api';
+import { usersAPI, timeEntriesAPI, eventsAPI } from '../services/api';
+import { applyTimeEntryEvent, applyUserEvent } from '../utils/liveUpdates';
 import {
 	formatLocalDateTime,
 	calculateDuration,
@@ -27,6 +28,17 @@ function ManagerDashboard() {
 
 	useEffect(() => {
 		loadData();
+		// Pushed changes keep the lists current without re-fetching them
+		return eventsAPI.subscribe({
+			onTimeEntry: (event) => setTimeEntries((entries) => applyTimeEntryEvent(entries, event)),
+			onUser: (event) => {
+				setUsers((current) => applyUserEvent(current, event));
+				if (event.action === 'deleted') {
+					setTimeEntries((entries) => entries.filter((e) => e.user_id !== event.user.id));
+				}
+			},
+			onResync: () => loadData()
+		});
 	}, []);
 
 	const loadData = async () => {
@@ -460,4 +472,4 @@ function ManagerDashboard() {
 	);
 }
 
-export default ManagerDashboard;
\ No newline at end of file
+export default ManagerDashboard;
\ No newline at end of file